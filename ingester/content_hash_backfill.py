@@ -0,0 +1,35 @@
+import logging
+import os
+
+from dotenv import load_dotenv
+
+from ingester.database import GraphDB
+
+load_dotenv()
+
+
+def main():
+    """
+    One-off backfill of the content hash for model cards ingested before de-duplication moved to the
+    `modelcard_content_hash` constraint. Run with `python -m ingester.content_hash_backfill`.
+    """
+    logging.basicConfig(level=logging.INFO)
+    NEO4J_URI = os.getenv("NEO4J_URI")
+    NEO4J_USERNAME = os.getenv("NEO4J_USER")
+    NEO4J_PWD = os.getenv("NEO4J_PWD")
+    batch_size = int(os.getenv("BACKFILL_BATCH_SIZE", "500"))
+
+    db = GraphDB(NEO4J_URI, NEO4J_USERNAME, NEO4J_PWD)
+    try:
+        hashed, duplicates = db.backfill_content_hashes(batch_size)
+    finally:
+        db.close()
+
+    logging.info(f"Computed the content hash for {hashed} model cards.")
+    if duplicates:
+        logging.warning(f"{len(duplicates)} model cards duplicate an existing model card and were left without a "
+                        f"content hash: {', '.join(duplicates)}")
+
+
+if __name__ == "__main__":
+    main()
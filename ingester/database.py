@@ -1,6 +1,181 @@
+import hashlib
+import json
+import re
+
 from neo4j import GraphDatabase
 import time
 
+_INVALID_PROPERTY_CHARS = re.compile(r"[^0-9A-Za-z_]")
+
+# model card fields that identify a model card's content, used for de-duplication
+CONTENT_HASH_FIELDS = ['name', 'version', 'short_description', 'full_description', 'keywords', 'author',
+                       'input_data', 'output_data', 'input_type', 'category']
+
+# number of nearest neighbours first requested from the vector index when inferring versioning, grown only when
+# every returned neighbour is above the similarity threshold
+VERSIONING_TOP_K = 10
+# minimum vector index score, (1 + cosine) / 2, for two model cards to be revisions of each other
+VERSIONING_THRESHOLD = 0.95
+
+# properties indexed by the mcFullIndex full-text index
+FULL_TEXT_FIELDS = ['name', 'short_description', 'full_description', 'keywords', 'author']
+# model card properties that full-text search results can be projected to
+SEARCH_RESULT_FIELDS = ['name', 'version', 'short_description', 'full_description', 'keywords', 'author',
+                        'input_type', 'categories', 'input_data', 'output_data', 'citation', 'documentation']
+DEFAULT_SEARCH_RESULT_FIELDS = ['name', 'version', 'short_description']
+FULL_TEXT_MATCH_MODES = ['fuzzy', 'prefix']
+# embedding model of the embeddings written before model cards were tagged with their embedding_model
+LEGACY_EMBEDDING_MODEL = "text-embedding-3-small"
+
+_LUCENE_SPECIAL_CHARS = re.compile(r'([+\-!(){}\[\]^"~*?:\\/&|])')
+
+
+def lucene_query(prompt, boosts=None, match=None, escape=False):
+    """
+    Builds the Lucene query string of a full-text search. Without boosts, a match mode or escape the prompt is used
+    as is, so it can hold Lucene syntax. Otherwise the prompt is split into plain terms, which are escaped, made
+    fuzzy (`term~`) or prefix (`term*`) matches, and searched in every indexed field with the field's boost.
+    :param prompt: search prompt
+    :param boosts: dictionary of FULL_TEXT_FIELDS field to boost, fields left out have boost 1
+    :param match: None for exact terms, 'fuzzy' or 'prefix'
+    :param escape: treat the prompt as plain terms even without boosts or a match mode
+    :return: Lucene query string
+    """
+    if not boosts and match is None and not escape:
+        return prompt
+    terms = [_LUCENE_SPECIAL_CHARS.sub(r"\\\1", term) for term in prompt.split()]
+    if match == 'fuzzy':
+        terms = [term + "~" for term in terms]
+    elif match == 'prefix':
+        terms = [term + "*" for term in terms]
+    if not boosts:
+        return " ".join(terms)
+    terms = " ".join(terms)
+    return " ".join(f"{field}:({terms})^{boosts.get(field, 1)}" for field in FULL_TEXT_FIELDS)
+
+
+def mc_content_hash(model_card):
+    """
+    Computes the canonical content hash of a model card over CONTENT_HASH_FIELDS. Two model cards with the same
+    values for these fields are duplicates.
+    :param model_card:
+    :return: hex encoded sha256 digest
+    """
+    content = {field: model_card.get(field) for field in CONTENT_HASH_FIELDS}
+    canonical = json.dumps(content, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _sanitize_properties(properties):
+    """
+    Returns a copy of the given properties keyed by valid Neo4j property names, so that dynamic metadata can be
+    written with a single `SET n += $props` statement instead of one statement per key.
+    :param properties:
+    :return:
+    """
+    sanitized = {}
+    for key, value in properties.items():
+        name = _INVALID_PROPERTY_CHARS.sub("_", str(key))
+        # keys that only differ in invalid characters (e.g. "f1-score" and "f1 score") get a numbered suffix
+        # instead of overwriting each other
+        candidate, suffix = name, 2
+        while candidate in sanitized:
+            candidate, suffix = f"{name}_{suffix}", suffix + 1
+        sanitized[candidate] = value
+    return sanitized
+
+
+def _requirement_properties(model_req_metadata):
+    """
+    Converts a list of `package==version` requirements into a property map.
+    :param model_req_metadata:
+    :return:
+    """
+    requirements = {}
+    for requirement in model_req_metadata:
+        key, _, value = requirement.partition("==")
+        requirements[key] = value
+    return _sanitize_properties(requirements)
+
+
+def _model_card_rows(model_cards, similarity_support=False):
+    """
+    Flattens model cards into the per-label row lists written by the UNWIND statements in
+    GraphDB.insert_model_cards.
+    :param model_cards:
+    :param similarity_support:
+    :return: dictionary of row lists keyed by node kind
+    """
+    rows = {'model_cards': [], 'datasheets': [], 'models': [], 'bias_analyses': [], 'xai_analyses': [],
+            'requirements': [], 'foundational_models': []}
+
+    for model_card in model_cards:
+        mc_id = model_card['id']
+        rows['model_cards'].append({
+            'id': mc_id,
+            'content_hash': mc_content_hash(model_card),
+            'props': {
+                'name': model_card['name'],
+                'version': model_card['version'],
+                'short_description': model_card['short_description'],
+                'full_description': model_card['full_description'],
+                'keywords': model_card['keywords'],
+                'author': model_card['author'],
+                'input_data': model_card['input_data'],
+                'output_data': model_card['output_data'],
+                'input_type': model_card['input_type'],
+                'categories': model_card['category'],
+                'citation': model_card.get('citation'),
+                'embedding': model_card.get('embedding') if similarity_support else None,
+                'embedding_model': model_card.get('embedding_model') if similarity_support else None,
+            }
+        })
+        rows['datasheets'].append({'mc_id': mc_id, 'datasheet_id': model_card['input_data']})
+
+        ai_model = model_card['ai_model']
+        rows['models'].append({
+            'mc_id': mc_id,
+            'id': mc_id + "-model",
+            'props': {
+                'name': ai_model.get('name'),
+                'version': ai_model.get('version'),
+                'description': ai_model.get('description'),
+                'owner': ai_model.get('owner'),
+                'location': ai_model.get('location'),
+                'license': ai_model.get('license'),
+                'framework': ai_model.get('framework'),
+                'model_type': ai_model.get('model_type'),
+                'test_accuracy': ai_model.get('test_accuracy'),
+                'inference_labels': ai_model.get('inference_labels', []),
+                'deployment_strategy': ai_model.get('deployment_strategy', 'unknown'),
+                'deployment_tested': ai_model.get('deployment_tested', False),
+            },
+            'metrics': _sanitize_properties(ai_model.get('metrics') or {})
+        })
+
+        bias_analysis = model_card.get('bias_analysis')
+        if bias_analysis is not None:
+            rows['bias_analyses'].append({'mc_id': mc_id, 'id': mc_id + "-bias", 'name': mc_id + "bias_analysis",
+                                          'props': _sanitize_properties(bias_analysis)})
+
+        xai_analysis = model_card.get('xai_analysis')
+        if xai_analysis is not None:
+            rows['xai_analyses'].append({'mc_id': mc_id, 'id': mc_id + "-xai", 'name': mc_id + "-xai_analysis",
+                                         'props': _sanitize_properties(xai_analysis)})
+
+        model_requirements = model_card.get('model_requirements')
+        if model_requirements is not None:
+            requirements_id = mc_id + "-requirements"
+            rows['requirements'].append({'mc_id': mc_id, 'id': requirements_id, 'name': requirements_id,
+                                         'props': _requirement_properties(model_requirements)})
+
+        foundational_mc_id = model_card.get('foundational_model')
+        if foundational_mc_id:
+            rows['foundational_models'].append({'mc_id': mc_id, 'foundational_id': foundational_mc_id})
+
+    return rows
+
+
 class GraphDB:
     _instance = None
 
@@ -14,38 +189,431 @@ class GraphDB:
         if self.driver:
             self.driver.close()
 
+    def insert_model_card(self, model_card, similarity_support=False):
+        """
+        Writes the model card and all of its satellite nodes (model, bias and xai analysis, requirements, datasheet
+        and foundational model links) in a single managed transaction, so a failure never leaves a partial card.
+        :param model_card:
+        :param similarity_support:
+        :return: id of the existing model card if an identical one was stored concurrently, None otherwise
+        """
+        return self.insert_model_cards([model_card], similarity_support).get(model_card['id'])
+
+    def insert_model_cards(self, model_cards, similarity_support=False):
+        """
+        Writes a batch of model cards in a single managed transaction. Each kind of node is written with one
+        UNWIND statement, so the number of statements is fixed regardless of the batch size.
+        :param model_cards: model cards with their 'id' already assigned
+        :param similarity_support:
+        :return: dictionary of the ids of model cards that already existed to the id of the existing model card
+        """
+        rows = _model_card_rows(model_cards, similarity_support)
+        with self.driver.session() as session:
+            return session.execute_write(self._write_model_cards, rows)
+
+    @staticmethod
+    def _write_model_cards(tx, rows):
+        # The content hash is the MERGE key, so a concurrent upload of the same card matches the existing node
+        # instead of creating a duplicate. Its satellites are then skipped, as no card exists under the new id.
+        result = tx.run("""
+            UNWIND $rows AS row
+            MERGE (mc:ModelCard {content_hash: row.content_hash})
+            ON CREATE SET mc.external_id = row.id, mc.family_id = row.id, mc += row.props,
+                          mc.embedding_updated_at = CASE WHEN row.props.embedding IS NULL THEN null ELSE timestamp() END,
+                          mc.embedding_hash = CASE WHEN row.props.embedding IS NULL THEN null ELSE row.content_hash END
+            WITH mc, row
+            WHERE mc.external_id <> row.id
+            RETURN row.id AS id, mc.external_id AS existing_id
+            """, rows=rows['model_cards'])
+        duplicates = {record['id']: record['existing_id'] for record in result}
+
+        tx.run("""
+            UNWIND $rows AS row
+            MATCH (mc:ModelCard {external_id: row.mc_id})
+            MERGE (ds:Datasheet {external_id: row.datasheet_id})
+            ON CREATE SET ds.name = 'Default Datasheet'
+            CREATE (mc)-[:TRAINED_ON]->(ds)
+            """, rows=rows['datasheets'])
+
+        tx.run("""
+            UNWIND $rows AS row
+            MATCH (mc:ModelCard {external_id: row.mc_id})
+            CREATE (model:Model {model_id: row.id})<-[:USED]-(mc)
+            SET model += row.props
+            SET model += row.metrics
+            """, rows=rows['models'])
+
+        if rows['bias_analyses']:
+            tx.run("""
+                UNWIND $rows AS row
+                MATCH (mc:ModelCard {external_id: row.mc_id})
+                CREATE (ba:BiasAnalysis {external_id: row.id, name: row.name})<-[:BIAS_ANALYSIS]-(mc)
+                SET ba += row.props
+                """, rows=rows['bias_analyses'])
+
+        if rows['xai_analyses']:
+            tx.run("""
+                UNWIND $rows AS row
+                MATCH (mc:ModelCard {external_id: row.mc_id})
+                CREATE (xai:ExplainabilityAnalysis {external_id: row.id, name: row.name})<-[:XAI_ANALYSIS]-(mc)
+                SET xai += row.props
+                """, rows=rows['xai_analyses'])
+
+        if rows['requirements']:
+            tx.run("""
+                UNWIND $rows AS row
+                MATCH (mc:ModelCard {external_id: row.mc_id})
+                CREATE (req:ModelRequirements {external_id: row.id, name: row.name})<-[:REQUIREMENTS]-(mc)
+                SET req += row.props
+                """, rows=rows['requirements'])
+
+        if rows['foundational_models']:
+            tx.run("""
+                UNWIND $rows AS row
+                MATCH (mc:ModelCard {external_id: row.mc_id}), (foundational_mc:ModelCard {external_id: row.foundational_id})
+                CREATE (mc)-[:TRANSFORMATIVE_USE_OF]->(foundational_mc)
+                """, rows=rows['foundational_models'])
+
+        return duplicates
+
     def check_mc_exists(self, metadata):
         """
-        Check existing model card
+        Check existing model card using the content hash index
         :param metadata:
         :return:
         """
 
         with self.driver.session() as session:
             check_query = """
-                      MATCH (mc:ModelCard)
-                      WHERE mc.name = $name AND 
-                            mc.version = $version AND 
-                            mc.short_description = $short_description AND 
-                            mc.full_description = $full_description AND 
-                            mc.keywords = $keywords AND 
-                            mc.author = $author AND 
-                            mc.input_data = $input_data AND 
-                            mc.output_data = $output_data AND 
-                            mc.input_type = $input_type AND 
-                            mc.categories = $category
-                      RETURN mc
+                      MATCH (mc:ModelCard {content_hash: $content_hash})
+                      RETURN mc.external_id AS external_id
                       LIMIT 1
                       """
 
-            result = session.run(check_query, metadata)
+            result = session.run(check_query, content_hash=mc_content_hash(metadata))
             matched_node = result.single()
 
-            if matched_node and matched_node.get('mc'):
-                return True, matched_node.get('mc')['external_id']
+            if matched_node and matched_node.get('external_id'):
+                return True, matched_node.get('external_id')
             else:
                return False, None
 
+    def check_mcs_exist(self, model_cards):
+        """
+        Check a batch of model cards against the existing model cards in one query.
+        :param model_cards:
+        :return: dictionary of the batch position to the external id of the matching model card
+        """
+        cards = [{'idx': idx, 'content_hash': mc_content_hash(mc)} for idx, mc in enumerate(model_cards)]
+
+        with self.driver.session() as session:
+            check_query = """
+                      UNWIND $cards AS card
+                      MATCH (mc:ModelCard {content_hash: card.content_hash})
+                      RETURN card.idx AS idx, mc.external_id AS external_id
+                      """
+            result = session.run(check_query, cards=cards)
+            return {record['idx']: record['external_id'] for record in result}
+
+    def backfill_content_hashes(self, batch_size=500):
+        """
+        Computes the content hash of model cards ingested before the hash existed. Cards whose hash is already
+        taken by another model card are duplicates and are left without a hash so the uniqueness constraint holds.
+        :param batch_size: number of model cards hashed per transaction
+        :return: tuple of (number of hashed model cards, list of duplicate model card ids)
+        """
+        scan_query = """
+                MATCH (mc:ModelCard)
+                WHERE mc.content_hash IS NULL AND mc.external_id > $after
+                RETURN mc.external_id AS id, mc.name AS name, mc.version AS version,
+                       mc.short_description AS short_description, mc.full_description AS full_description,
+                       mc.keywords AS keywords, mc.author AS author, mc.input_data AS input_data,
+                       mc.output_data AS output_data, mc.input_type AS input_type, mc.categories AS category
+                ORDER BY mc.external_id
+                LIMIT $batch_size
+                """
+        taken_query = """
+                UNWIND $hashes AS hash
+                MATCH (mc:ModelCard {content_hash: hash})
+                RETURN hash
+                """
+        update_query = """
+                UNWIND $rows AS row
+                MATCH (mc:ModelCard {external_id: row.id})
+                SET mc.content_hash = row.content_hash
+                """
+
+        hashed, duplicates, after = 0, [], ""
+        with self.driver.session() as session:
+            while True:
+                records = list(session.run(scan_query, after=after, batch_size=batch_size))
+                if not records:
+                    break
+                after = records[-1]['id']
+
+                rows = [{'id': record['id'], 'content_hash': mc_content_hash(record.data())} for record in records]
+                taken = {record['hash'] for record in
+                         session.run(taken_query, hashes=[row['content_hash'] for row in rows])}
+                unique_rows = []
+                for row in rows:
+                    if row['content_hash'] in taken:
+                        duplicates.append(row['id'])
+                    else:
+                        taken.add(row['content_hash'])
+                        unique_rows.append(row)
+
+                session.execute_write(lambda tx: tx.run(update_query, rows=unique_rows).consume())
+                hashed += len(unique_rows)
+        return hashed, duplicates
+
+    def get_mcs_to_embed(self, embedding_model, after="", limit=500):
+        """
+        Get the next model cards, in external id order, that have no embedding, were embedded by another model, or
+        were updated since they were embedded, i.e. their content hash differs from the one their embedding was
+        built from. Embeddings without an embedding_model tag were written by LEGACY_EMBEDDING_MODEL.
+        :param embedding_model: name of the current embedding model
+        :param after: external id to start after
+        :param limit: maximum number of model cards to return
+        :return: list of model card dictionaries with the fields used for embedding
+        """
+        query = """
+                MATCH (mc:ModelCard)
+                WHERE mc.external_id > $after
+                  AND (mc.embedding IS NULL OR coalesce(mc.embedding_model, $legacy_model) <> $embedding_model
+                       OR mc.embedding_hash <> mc.content_hash)
+                RETURN mc.external_id AS id, mc.content_hash AS content_hash, mc.author AS author,
+                       mc.short_description AS short_description, mc.full_description AS full_description,
+                       mc.version AS version, mc.input_type AS input_type, mc.keywords AS keywords,
+                       mc.categories AS category, mc.input_data AS input_data
+                ORDER BY mc.external_id
+                LIMIT $limit
+                """
+        with self.driver.session() as session:
+            return [record.data() for record in
+                    session.run(query, embedding_model=embedding_model, legacy_model=LEGACY_EMBEDDING_MODEL,
+                                after=after, limit=limit)]
+
+    def set_embeddings(self, rows, embedding_model):
+        """
+        Write embeddings back to their model cards in one transaction.
+        :param rows: list of {'id': model card id, 'embedding': embedding, 'content_hash': content hash of the
+        model card the embedding was built from}
+        :param embedding_model: name of the embedding model that produced the embeddings
+        """
+        query = """
+                UNWIND $rows AS row
+                MATCH (mc:ModelCard {external_id: row.id})
+                SET mc.embedding = row.embedding, mc.embedding_model = $embedding_model,
+                    mc.embedding_updated_at = timestamp(), mc.embedding_hash = row.content_hash
+                """
+        with self.driver.session() as session:
+            session.execute_write(lambda tx: tx.run(query, rows=rows, embedding_model=embedding_model).consume())
+
+    def get_embeddings(self, since=None, batch_size=1000):
+        """
+        Read model card embeddings in pages, in external id order.
+        :param since: only read embeddings written at or after this database timestamp (ms), or None for all
+        :param batch_size: number of embeddings per page
+        :return: generator of pages, lists of {'id', 'embedding', 'updated_at'}
+        """
+        # the since filter is only written when given, so the embedding_updated_at index can serve it
+        since_filter = "" if since is None else "AND mc.embedding_updated_at >= $since"
+        query = f"""
+                MATCH (mc:ModelCard)
+                WHERE mc.external_id > $after AND mc.embedding IS NOT NULL {since_filter}
+                RETURN mc.external_id AS id, mc.embedding AS embedding, mc.embedding_updated_at AS updated_at
+                ORDER BY mc.external_id
+                LIMIT $batch_size
+                """
+        after = ""
+        with self.driver.session() as session:
+            while True:
+                page = [record.data() for record in
+                        session.run(query, after=after, since=since, batch_size=batch_size)]
+                if not page:
+                    break
+                yield page
+                after = page[-1]['id']
+
+    def get_embedded_mc_ids(self):
+        """
+        Stream the ids of all model cards that have an embedding.
+        :return: generator of model card ids
+        """
+        query = """
+                MATCH (mc:ModelCard)
+                WHERE mc.embedding IS NOT NULL
+                RETURN mc.external_id AS id
+                """
+        with self.driver.session() as session:
+            for record in session.run(query):
+                yield record['id']
+
+    def merge_revisions(self, revisions):
+        """
+        Merge REVISION_OF edges in both directions between model cards in one statement.
+        :param revisions: list of {'mc_id', 'model_id', 'score'}
+        """
+        query = """
+                UNWIND $rows AS row
+                MATCH (mc:ModelCard {external_id: row.mc_id}), (other:ModelCard {external_id: row.model_id})
+                MERGE (mc)-[r1:REVISION_OF]->(other)
+                SET r1.confidence = row.score
+                MERGE (other)-[r2:REVISION_OF]->(mc)
+                SET r2.confidence = row.score
+                """
+        with self.driver.session() as session:
+            session.execute_write(lambda tx: tx.run(query, rows=revisions).consume())
+
+    def get_revision_pairs(self):
+        """
+        Stream the REVISION_OF edges between model cards, once per pair of model cards.
+        :return: generator of {'mc_id', 'model_id', 'score'} with mc_id < model_id
+        """
+        query = """
+                MATCH (mc:ModelCard)-[r:REVISION_OF]->(other:ModelCard)
+                WHERE mc.external_id < other.external_id
+                RETURN mc.external_id AS mc_id, other.external_id AS model_id, max(r.confidence) AS score
+                """
+        with self.driver.session() as session:
+            for record in session.run(query):
+                yield record.data()
+
+    def delete_revisions(self, revisions):
+        """
+        Delete the REVISION_OF edges, in both directions, between pairs of model cards in one statement.
+        :param revisions: list of {'mc_id', 'model_id'}
+        """
+        query = """
+                UNWIND $rows AS row
+                MATCH (:ModelCard {external_id: row.mc_id})-[r:REVISION_OF]-(:ModelCard {external_id: row.model_id})
+                DELETE r
+                """
+        with self.driver.session() as session:
+            session.execute_write(lambda tx: tx.run(query, rows=revisions).consume())
+
+    def assign_families(self, mc_ids):
+        """
+        Update the family ids after versioning inferred new revisions. A model card joins the family of its
+        revisions, and families connected by the new model card are merged into the one with the smallest id.
+        Model cards are processed one statement at a time, in one transaction, so each sees the merges before it.
+        :param mc_ids: ids of the model cards with new revisions
+        """
+        query = """
+                MATCH (mc:ModelCard {external_id: $mc_id})
+                OPTIONAL MATCH (mc)-[:REVISION_OF]->(other:ModelCard)
+                WITH mc, collect(other) AS others
+                WITH mc, others, [other IN others WHERE other.family_id IS NOT NULL | other.family_id] +
+                     [coalesce(mc.family_id, mc.external_id)] AS families
+                WITH mc, others, families,
+                     reduce(family = head(families), f IN families | CASE WHEN f < family THEN f ELSE family END)
+                     AS family
+                SET mc.family_id = family
+                FOREACH (other IN [other IN others WHERE other.family_id IS NULL] | SET other.family_id = family)
+                WITH family, [f IN families WHERE f <> family] AS merged
+                UNWIND merged AS old_family
+                MATCH (member:ModelCard {family_id: old_family})
+                SET member.family_id = family
+                """
+
+        def assign(tx):
+            for mc_id in mc_ids:
+                tx.run(query, mc_id=mc_id).consume()
+
+        with self.driver.session() as session:
+            session.execute_write(assign)
+
+    def get_family(self, mc_id):
+        """
+        Get the model cards in the family of a model card.
+        :param mc_id: id of the model card
+        :return: list of family members ordered by id, empty if the model card does not exist
+        """
+        query = """
+                MATCH (mc:ModelCard {external_id: $mc_id})
+                OPTIONAL MATCH (member:ModelCard {family_id: mc.family_id})
+                WITH mc, collect(member) AS members
+                UNWIND CASE WHEN size(members) = 0 THEN [mc] ELSE members END AS member
+                RETURN coalesce(mc.family_id, mc.external_id) AS family_id, member.external_id AS mc_id,
+                       member.name AS name, member.version AS version, member.short_description AS short_description
+                ORDER BY member.external_id
+                """
+        with self.driver.session() as session:
+            return [record.data() for record in session.run(query, mc_id=mc_id)]
+
+    def get_mc_families(self):
+        """
+        Stream the id and family id of every model card.
+        :return: generator of {'id', 'family_id'}
+        """
+        query = """
+                MATCH (mc:ModelCard)
+                RETURN mc.external_id AS id, mc.family_id AS family_id
+                """
+        with self.driver.session() as session:
+            for record in session.run(query):
+                yield record.data()
+
+    def set_families(self, rows):
+        """
+        Set the family id of model cards in one statement.
+        :param rows: list of {'id', 'family_id'}
+        """
+        query = """
+                UNWIND $rows AS row
+                MATCH (mc:ModelCard {external_id: row.id})
+                SET mc.family_id = row.family_id
+                """
+        with self.driver.session() as session:
+            session.execute_write(lambda tx: tx.run(query, rows=rows).consume())
+
+    def get_mc_summaries(self, mc_ids):
+        """
+        Get the name, version and short description of several model cards in one query.
+        :param mc_ids: ids of the model cards
+        :return: dictionary of model card id to summary, without the model cards that do not exist
+        """
+        query = """
+                UNWIND $mc_ids AS mc_id
+                MATCH (mc:ModelCard {external_id: mc_id})
+                RETURN mc.external_id AS mc_id, mc.name AS name, mc.version AS version,
+                       mc.short_description AS short_description
+                """
+        with self.driver.session() as session:
+            return {record['mc_id']: record.data() for record in session.run(query, mc_ids=mc_ids)}
+
+    def get_suggest_terms(self, mc_ids=None):
+        """
+        Get the name, author and keywords of model cards, the projection the typeahead index is built from.
+        :param mc_ids: ids of the model cards, or None for every model card
+        :return: list of dictionaries with id, name, author and keywords
+        """
+        query = """
+                MATCH (mc:ModelCard)
+                WHERE $mc_ids IS NULL OR mc.external_id IN $mc_ids
+                RETURN mc.external_id AS id, mc.name AS name, mc.author AS author, mc.keywords AS keywords
+                """
+        with self.driver.session() as session:
+            return [record.data() for record in session.run(query, mc_ids=mc_ids)]
+
+    def get_facet_values(self, mc_ids=None):
+        """
+        Get the categories, input type, author, framework and license of model cards, the projection the facet
+        counters are built from.
+        :param mc_ids: ids of the model cards, or None for every model card
+        :return: list of dictionaries with id and the facet values
+        """
+        query = """
+                MATCH (mc:ModelCard)
+                WHERE $mc_ids IS NULL OR mc.external_id IN $mc_ids
+                OPTIONAL MATCH (mc)-[:USED]->(model:Model)
+                WITH mc, head(collect(model)) AS model
+                RETURN mc.external_id AS id, mc.categories AS categories, mc.input_type AS input_type,
+                       mc.author AS author, model.framework AS framework, model.license AS license
+                """
+        with self.driver.session() as session:
+            return [record.data() for record in session.run(query, mc_ids=mc_ids)]
+
     def check_update_mc(self, metadata):
         """
         Check if the model card exists in the system
@@ -72,80 +640,50 @@ class GraphDB:
             else:
                return None
 
-    def insert_base_mc(self, metadata, similarity_support=False):
-        with self.driver.session() as session:
-            if similarity_support:
-                query = """
-                   CREATE (mc:ModelCard {external_id: $id, name: $name, version: $version, short_description: $short_description,
-                                              full_description: $full_description, keywords: $keywords, author: $author,
-                                              input_data: $input_data, output_data: $output_data, input_type: $input_type,
-                                              categories: $category, embedding: $embedding, citation: $citation})
-                   """
-                session.run(query, metadata)
-            else:
-                query = """
-                   CREATE (mc:ModelCard {external_id: $id, name: $name, version: $version, short_description: $short_description,
-                                              full_description: $full_description, keywords: $keywords, author: $author,
-                                              input_data: $input_data, output_data: $output_data, input_type: $input_type,
-                                              categories: $category, citation: $citation})
-                   """
-            session.run(query, metadata)
-
     def update_base_mc(self, model_card_id, metadata):
         """
-        update existing model card
+        update existing model card, unless the update would make it identical to another model card
         :param model_card_id:
         :param metadata:
-        :return:
+        :return: id of the other model card with the same content, None if the model card was updated
         """
         external_id = str(model_card_id)
-        with self.driver.session() as session:
-            query = """
-                MATCH (mc:ModelCard {external_id: $id})
-                SET mc.name = $name,
-                    mc.version = $version,
-                    mc.short_description = $short_description,
-                    mc.full_description = $full_description,
-                    mc.keywords = $keywords,
-                    mc.author = $author,
-                    mc.input_data = $input_data,
-                    mc.output_data = $output_data,
-                    mc.input_type = $input_type,
-                    mc.categories = $category,
-                    mc.foundational_model = $foundational_model
-            """
-            session.run(query, metadata, id=external_id)
+        content_hash = mc_content_hash(metadata)
+        check_query = """
+            MATCH (other:ModelCard {content_hash: $content_hash})
+            WHERE other.external_id <> $id
+            RETURN other.external_id AS external_id
+            LIMIT 1
+        """
+        # the embedding is left in place until it is rebuilt; cards embedded before their embedding hash was
+        # recorded keep their previous content hash, so the change still marks their embedding as stale
+        update_query = """
+            MATCH (mc:ModelCard {external_id: $id})
+            SET mc.embedding_hash = CASE WHEN mc.embedding IS NULL THEN null
+                                         ELSE coalesce(mc.embedding_hash, mc.content_hash, '') END
+            SET mc.name = $name,
+                mc.version = $version,
+                mc.short_description = $short_description,
+                mc.full_description = $full_description,
+                mc.keywords = $keywords,
+                mc.author = $author,
+                mc.input_data = $input_data,
+                mc.output_data = $output_data,
+                mc.input_type = $input_type,
+                mc.categories = $category,
+                mc.foundational_model = $foundational_model,
+                mc.content_hash = $content_hash
+        """
 
-    def insert_ai_model(self, model_card_id, ai_model_metadata):
-        model_id = str(model_card_id + "-model")
-        ai_model_metadata.setdefault('inference_labels', [])
-        ai_model_metadata.setdefault('deployment_strategy', 'unknown')
-        ai_model_metadata.setdefault('deployment_tested', False)
-        ai_model_metadata.setdefault('metrics', {})
+        def update(tx):
+            duplicate = tx.run(check_query, id=external_id, content_hash=content_hash).single()
+            if duplicate:
+                return duplicate['external_id']
+            tx.run(update_query, metadata, id=external_id, content_hash=content_hash)
+            return None
 
         with self.driver.session() as session:
-            query = """
-               CREATE (model:Model {model_id: $id, name: $name, version: $version, description: $description,
-                                   owner: $owner, location: $location, license: $license, framework: $framework, 
-                                   model_type: $model_type, test_accuracy: $test_accuracy, inference_labels: $inference_labels,
-                                   deployment_strategy: $deployment_strategy, deployment_tested: $deployment_tested})
-            """
-            session.run(query, ai_model_metadata, id=model_id)
-
-            metrics = ai_model_metadata.get('metrics', {})
-            for key, value in metrics.items():
-                key = key.replace(" ", "_")
-                query = f"""
-                            MATCH (model:Model {{model_id: $model_id}})
-                            SET model.{key} = $value
-                            """
-                session.run(query, model_id=model_id, value=value)
-
-            query = """
-                MATCH (model:Model {model_id: $model_id}), (mc:ModelCard {external_id: $mc_id})
-                CREATE (model)<-[:USED]-(mc)
-                """
-            session.run(query, model_id=model_id, mc_id=model_card_id)
+            return session.execute_write(update)
 
     def update_ai_model(self, model_card_id, ai_model_metadata):
         """
@@ -178,14 +716,11 @@ class GraphDB:
             session.run(query, ai_model_metadata, id=model_id)
 
             # Update the metrics properties on the model node
-            metrics = ai_model_metadata.get('metrics', {})
-            for key, value in metrics.items():
-                key = key.replace(" ", "_")
-                query = f"""
-                    MATCH (model:Model {{model_id: $model_id}})
-                    SET model.{key} = $value
-                """
-                session.run(query, model_id=model_id, value=value)
+            query = """
+                MATCH (model:Model {model_id: $model_id})
+                SET model += $metrics
+            """
+            session.run(query, model_id=model_id, metrics=_sanitize_properties(ai_model_metadata['metrics']))
 
             # query = """
             #     MATCH (model:Model {model_id: $model_id}), (mc:ModelCard {external_id: $mc_id})
@@ -201,28 +736,6 @@ class GraphDB:
             #                     """
             #     session.run(query, fc_id=foundational_model, mc_id=model_card_id)
 
-    def insert_bias_analysis_metadata(self, model_card_id, bias_id, bias_analysis_metadata):
-        bias_name = model_card_id + "bias_analysis"
-        with self.driver.session() as session:
-            query = """
-            CREATE (bias_analysis:BiasAnalysis {external_id: $id, name: $name})
-            """
-            session.run(query, name=bias_name, id=bias_id)
-
-            for key, value in bias_analysis_metadata.items():
-                key = key.replace(" ", "_")
-                query = f"""
-                            MATCH (ba:BiasAnalysis {{external_id: $bias_id}})
-                            SET ba.{key} = $value
-                            """
-                session.run(query, bias_id=bias_id, value=value)
-
-            query = """
-                    MATCH (ba:BiasAnalysis {external_id: $bias_id}), (mc:ModelCard {external_id: $mc_id})
-                    CREATE (ba)<-[:BIAS_ANALYSIS]-(mc)
-                    """
-            session.run(query, bias_id=bias_id, mc_id=model_card_id)
-
     def update_bias_analysis_metadata(self, model_card_id, bias_id, bias_analysis_metadata):
         """
         Update bias analysis metadata
@@ -236,17 +749,9 @@ class GraphDB:
             query = """
             MERGE (bias_analysis:BiasAnalysis {external_id: $id})
             ON CREATE SET bias_analysis.name = $name
+            SET bias_analysis += $props
             """
-            session.run(query, name=bias_name, id=bias_id)
-
-            # Update the bias_analysis properties from bias_analysis_metadata
-            for key, value in bias_analysis_metadata.items():
-                key = key.replace(" ", "_")
-                query = f"""
-                            MATCH (ba:BiasAnalysis {{external_id: $bias_id}})
-                            SET ba.{key} = $value
-                            """
-                session.run(query, bias_id=bias_id, value=value)
+            session.run(query, name=bias_name, id=bias_id, props=_sanitize_properties(bias_analysis_metadata))
 
             # query = """
             #         MATCH (ba:BiasAnalysis {external_id: $bias_id}), (mc:ModelCard {external_id: $mc_id})
@@ -254,59 +759,6 @@ class GraphDB:
             #         """
             # session.run(query, bias_id=bias_id, mc_id=model_card_id)
 
-    def insert_xai_analysis_metadata(self, model_card_id, xai_id, xai_analysis_metadata):
-        xai_name = model_card_id + "-xai_analysis"
-
-        with self.driver.session() as session:
-            query = """
-            CREATE (xai:ExplainabilityAnalysis {external_id: $id, name: $name})
-            """
-            session.run(query, name=xai_name, id=xai_id)
-
-            for key, value in xai_analysis_metadata.items():
-                key = key.replace(" ", "_")
-                query = f"""
-                            MATCH (xai:ExplainabilityAnalysis {{external_id: $xai_id}})
-                            SET xai.{key} = $value
-                            """
-                session.run(query, xai_id=xai_id, value=value)
-
-            query = """
-                    MATCH (xai:ExplainabilityAnalysis {external_id: $xai_id}), (mc:ModelCard {external_id: $mc_id})
-                    CREATE (xai)<-[:XAI_ANALYSIS]-(mc)
-                    """
-            session.run(query, xai_id=xai_id, mc_id=model_card_id)
-
-    def insert_model_requirements_metadata(self, model_card_id, requirement_id, model_req_metadata):
-        """
-        Insert model requirements metadata
-        :param model_card_id:
-        :param requirement_id:
-        :param model_req_metadata:
-        :return:
-        """
-
-        with self.driver.session() as session:
-            query = """
-              CREATE (req:ModelRequirements {external_id: $id, name: $name})
-              """
-            session.run(query, name=requirement_id, id=requirement_id)
-
-            for requirement in model_req_metadata:
-                key, value = requirement.split("==")
-                key = key.replace("-", "_").replace(" ", "_").replace(".", "_")
-                query = f"""
-                              MATCH (req:ModelRequirements {{external_id: $requirement_id}})
-                              SET req.{key} = $value
-                              """
-                session.run(query, requirement_id=requirement_id, value=value)
-
-            query = """
-                      MATCH (req:ModelRequirements {external_id: $requirement_id}), (mc:ModelCard {external_id: $mc_id})
-                      CREATE (req)<-[:REQUIREMENTS]-(mc)
-                      """
-            session.run(query, requirement_id=requirement_id, mc_id=model_card_id)
-
     def update_model_requirements_metadata(self, requirement_id, model_req_metadata):
         """
         Update model requirements metadata
@@ -316,14 +768,11 @@ class GraphDB:
         """
 
         with self.driver.session() as session:
-            for requirement in model_req_metadata:
-                key, value = requirement.split("==")
-                key = key.replace("-", "_").replace(" ", "_")
-                query = f"""
-                              MATCH (req:ModelRequirements {{external_id: $requirement_id}})
-                              SET req.{key} = $value
-                              """
-                session.run(query, requirement_id=requirement_id, value=value)
+            query = """
+                    MATCH (req:ModelRequirements {external_id: $requirement_id})
+                    SET req += $props
+                    """
+            session.run(query, requirement_id=requirement_id, props=_requirement_properties(model_req_metadata))
 
     def update_xai_analysis_metadata(self, model_card_id, xai_id, xai_analysis_metadata):
         """
@@ -339,17 +788,9 @@ class GraphDB:
             query = """
             MATCH (xai:ExplainabilityAnalysis {external_id: $id})
             SET xai.name = $name
+            SET xai += $props
             """
-            session.run(query, name=xai_name, id=xai_id)
-
-            # Update existing node properties
-            for key, value in xai_analysis_metadata.items():
-                key = key.replace(" ", "_")
-                query = f"""
-                            MATCH (xai:ExplainabilityAnalysis {{external_id: $xai_id}})
-                            SET xai.{key} = $value
-                            """
-                session.run(query, xai_id=xai_id, value=value)
+            session.run(query, name=xai_name, id=xai_id, props=_sanitize_properties(xai_analysis_metadata))
 
             # query = """
             #         MATCH (xai:ExplainabilityAnalysis {external_id: $xai_id}), (mc:ModelCard {external_id: $mc_id})
@@ -357,72 +798,6 @@ class GraphDB:
             #         """
             # session.run(query, xai_id=xai_id, mc_id=model_card_id)
 
-    def connect_datasheet_mc(self, datasheet_id, mc_id):
-        """
-        Connects the datasheet and the Model Card.
-        :param datasheet_id:
-        :param mc_id:
-        :return:
-        """
-        with self.driver.session() as session:
-            query = """
-                                MATCH (ds:Datasheet {external_id: $data_id}), (mc:ModelCard {external_id: $mc_id})
-                                CREATE (mc)-[:TRAINED_ON]->(ds)
-                                RETURN ds
-                                LIMIT 1
-                      """
-
-            result =  session.run(query, data_id=datasheet_id, mc_id=mc_id)
-            matched_node = result.single()
-
-            if not matched_node or not matched_node.get('ds'):
-                query = """
-                                   MATCH (mc:ModelCard {external_id: $mc_id})
-                                   CREATE (d:Datasheet {
-                                       external_id: $data_id,
-                                       name: 'Default Datasheet'
-                                   })
-                                   CREATE (mc)-[:TRAINED_ON]->(d)
-                               """
-                session.run(query, data_id=datasheet_id, mc_id=mc_id)
-
-    def connect_foundational_model(self, retrain_mc_id, foundational_mc_id):
-        """
-        Connects the foundational model.
-        :param retrain_mc_id:
-        :param foundational_mc_id:
-        :return:
-        """
-        with self.driver.session() as session:
-
-            model_card = self.check_model_card_exists(foundational_mc_id)
-            if model_card:
-                query = """
-                               MATCH (retrain_mc:ModelCard {external_id: $retrain_mc_id}) , (foundational_mc:ModelCard {external_id: $foundational_mc_id})
-                               CREATE (retrain_mc)-[:TRANSFORMATIVE_USE_OF]->(foundational_mc)
-                               """
-                session.run(query, retrain_mc_id = retrain_mc_id, foundational_mc_id = foundational_mc_id)
-
-    def check_model_card_exists(self, mc_id):
-        """
-        Check if the model card exists in the system
-        :param mc_id
-        :return model_card_node
-        """
-        with self.driver.session() as session:
-            check_query = """
-                            MATCH (model_card:ModelCard)
-                            WHERE model_card.external_id = $mc_id
-                            RETURN model_card
-                            LIMIT 1
-                              """
-            result = session.run(check_query, mc_id = mc_id)
-            record = result.single()
-            if record:
-                model_card_node = record["model_card"]
-                return model_card_node
-            return None
-
     def insert_deployment(self, deployment):
         """
         Add deployment information
@@ -469,18 +844,9 @@ class GraphDB:
                    CREATE (d:Datasheet {external_id: $id, name: $name, description: $description, source: $source, download_url: $download_url,
                             version: $version, license: $license, doi: $doi, target_variable: $target_variable, categories: $categories, 
                             datapoints: $datapoints, missing_values: $missing_values, attribute_types: $attribute_types})
+                   SET d += $additional_metadata
                    """
-            session.run(query, datasheet)
-
-            additional_metadata = datasheet['additional_metadata']
-            for key in additional_metadata.keys():
-                value = additional_metadata[key]
-                key = key.replace(" ", "_")
-                query = f"""
-                                            MATCH (d:Datasheet {{external_id: $data_id}})
-                                            SET d.{key} = $value
-                                            """
-                session.run(query, data_id=datasheet["id"], value=value)
+            session.run(query, datasheet, additional_metadata=_sanitize_properties(datasheet['additional_metadata']))
 
     def check_device_exists(self, device_id):
         """
@@ -526,20 +892,15 @@ class GraphDB:
             if 'full_name' not in user_data:
                 user_data['full_name'] = user_data.get('user_id', 'Unknown User')
             
+            # Add optional fields
+            optional_fields = {key: value for key, value in user.items()
+                               if key not in ["user_id", "full_name"] and value is not None}
             query = """
                 CREATE (u:User {user_id: $user_id, full_name: $full_name})
+                SET u += $optional_fields
             """
-            session.run(query, user_data)
+            session.run(query, user_data, optional_fields=_sanitize_properties(optional_fields))
 
-            # Add optional fields
-            for key, value in user.items():
-                if key not in ["user_id", "full_name"] and value is not None:
-                    key = key.replace(" ", "_")
-                    query = f"""
-                        MATCH (u:User {{user_id: $user_id}})
-                        SET u.{key} = $value
-                    """
-                    session.run(query, user_id=user["user_id"], value=value)
     def insert_device(self, device):
         """
         Adds the device information into the graph.
@@ -554,81 +915,120 @@ class GraphDB:
             if 'description' not in device_data:
                 device_data['description'] = f"Device {device_data.get('device_id', 'Unknown')}"
             
+            additional_fields = {key: value for key, value in device.items()
+                                 if key not in ["id", "name", "description"]}
             query = """
                        CREATE (d:EdgeDevice {device_id: $device_id, name: $name, description: $description})
+                       SET d += $additional_fields
                        """
-            session.run(query, device_data)
-
-            for key, value in device.items():
-                if key not in ["id", "name", "description"]:
-                    key = key.replace(" ", "_")
-                    query = f"""
-                                                MATCH (d:EdgeDevice {{device_id: $device_id}})
-                                                SET d.{key} = $value
-                                                """
-                    session.run(query, device_id=device["device_id"], value=value)
+            session.run(query, device_data, additional_fields=_sanitize_properties(additional_fields))
 
-    def infer_versioning(self, model_card, threshold=0.95, max_nodes=1000):
+    def infer_versioning(self, model_card, threshold=VERSIONING_THRESHOLD, max_nodes=1000):
         """
         Compare the inserting model with the existing models for version inferencing using cosine similarity analysis
         on the NLP processed vectors
         :param model_card:
         :param threshold: threshold for similarity for it to be a version
-        :return:
+        :param max_nodes: maximum number of neighbours requested from the vector index
+        :return: list of inferred revisions ({'model_id', 'score'})
         """
-        query = """        
-                        MATCH (mc:ModelCard{external_id: $mc_id})
-                        WITH mc.external_id AS model_id, mc.embedding AS given_embedding
-                        CALL db.index.vector.queryNodes('modelEmbeddings', $num_nodes, given_embedding) yield node, score 
-                        WHERE score > $threshold
-                        RETURN score, node.external_id AS model_id
-                """
+        return self.infer_versioning_many([model_card['id']], threshold, max_nodes).get(model_card['id'], [])
 
-        version_search_start_time = time.time()
-        with self.driver.session() as session:
-            result = session.run(query, mc_id=model_card['id'], threshold=threshold, num_nodes=max_nodes)
-            records = list(result)
-
-        version_search_total_time = time.time() - version_search_start_time
-
-        version_query = """
-        MATCH (mc1:ModelCard {external_id: $mc1_id}), (mc2:ModelCard {external_id: $mc2_id})
-        CREATE (mc1)-[r1:REVISION_OF {confidence: $similarity}]->(mc2)
-        CREATE (mc2)-[r2:REVISION_OF {confidence: $similarity}]->(mc1)
-        RETURN r1
+    def infer_versioning_many(self, mc_ids, threshold=VERSIONING_THRESHOLD, max_nodes=1000):
         """
-        version_ingest_start_time = time.time()
-
-        for record in records:
-            model_id = record['model_id']
-            similarity = record['score']
-            if model_id == model_card['id']:
-                continue
-            with self.driver.session() as session:
-                session.run(version_query, mc1_id=model_card['id'], mc2_id=model_id, similarity=similarity)
-
-        version_ingest_total_time = time.time() - version_ingest_start_time
-
-        return version_ingest_total_time, version_search_total_time
-
-    def get_all_modelcards(self, limit=1000):
+        Infer versioning for several model cards. The vector search and the REVISION_OF edges are written in one
+        statement per round, and edges are merged so re-processing a model card does not duplicate them. The
+        vector index is first asked for VERSIONING_TOP_K neighbours; only model cards whose neighbours are all
+        above the threshold are searched again with a larger top-k, up to max_nodes.
+        :param mc_ids: ids of the model cards
+        :param threshold: threshold for similarity for it to be a version
+        :param max_nodes: maximum number of neighbours requested from the vector index
+        :return: dictionary of model card id to list of inferred revisions ({'model_id', 'score'})
+        """
+        revisions = {}
+        pending, num_nodes = list(mc_ids), min(VERSIONING_TOP_K, max_nodes)
+        with self.driver.session() as session:
+            while pending:
+                records = session.execute_write(self._write_revisions, pending, threshold, num_nodes)
+                saturated = []
+                for record in records:
+                    revisions[record['mc_id']] = record['revisions']
+                    if record['returned'] == num_nodes and record['min_score'] > threshold:
+                        saturated.append(record['mc_id'])
+                if num_nodes >= max_nodes:
+                    break
+                pending, num_nodes = saturated, min(num_nodes * 4, max_nodes)
+        return revisions
+
+    @staticmethod
+    def _write_revisions(tx, mc_ids, threshold, num_nodes):
+        result = tx.run("""
+            UNWIND $mc_ids AS mc_id
+            MATCH (mc:ModelCard {external_id: mc_id})
+            WHERE mc.embedding IS NOT NULL
+            CALL {
+                WITH mc
+                CALL db.index.vector.queryNodes('modelEmbeddings', $num_nodes, mc.embedding) YIELD node, score
+                RETURN collect({node: node, score: score}) AS hits
+            }
+            WITH mc, hits, [hit IN hits WHERE hit.score > $threshold AND hit.node <> mc] AS matches
+            CALL {
+                WITH mc, matches
+                UNWIND matches AS match
+                WITH mc, match.node AS other, match.score AS score
+                MERGE (mc)-[r1:REVISION_OF]->(other)
+                SET r1.confidence = score
+                MERGE (other)-[r2:REVISION_OF]->(mc)
+                SET r2.confidence = score
+                RETURN count(other) AS merged
+            }
+            RETURN mc.external_id AS mc_id, size(hits) AS returned,
+                   CASE WHEN size(hits) = 0 THEN null ELSE hits[-1].score END AS min_score,
+                   [match IN matches | {model_id: match.node.external_id, score: match.score}] AS revisions
+            """, mc_ids=mc_ids, threshold=threshold, num_nodes=num_nodes)
+        return [record.data() for record in result]
+
+    def get_all_modelcards(self, limit=1000, after=None):
         """
-        Retrieve all the model cards.
+        Retrieve a page of model cards ordered by their external id. Pages are read with keyset pagination on the
+        indexed external id, so deep pages cost the same as the first one.
+        :param limit: maximum number of model cards to return
+        :param after: external id of the last model card of the previous page
         :return:
         """
         query = """
             MATCH (mc:ModelCard)
+            WHERE mc.external_id > $after
             RETURN mc.external_id as mc_id, mc.name as name, mc.version as version, 
             mc.short_description as short_description
+            ORDER BY mc.external_id
             LIMIT $limit
         """
 
         records = []
         with self.driver.session() as session:
-            result = session.run(query, query_embedding=query, limit=limit)
+            result = session.run(query, after=after or "", limit=limit)
             records = list(result)
         return records
 
+    def stream_modelcards(self, after=None):
+        """
+        Stream model cards ordered by their external id straight from the result cursor, without materializing them.
+        :param after: external id to start after
+        :return: generator of model card dictionaries
+        """
+        query = """
+            MATCH (mc:ModelCard)
+            WHERE mc.external_id > $after
+            RETURN mc.external_id as mc_id, mc.name as name, mc.version as version, 
+            mc.short_description as short_description
+            ORDER BY mc.external_id
+        """
+        with self.driver.session() as session:
+            result = session.run(query, after=after or "")
+            for record in result:
+                yield record.data()
+
     def get_model_location(self, model_id):
         """
         Retrieve download location for a given model
@@ -656,7 +1056,8 @@ class GraphDB:
         query = """        
                             CALL db.index.vector.queryNodes('modelEmbeddings', $num_nodes, $query_embedding) yield node, score 
                             WHERE score > $threshold
-                            RETURN score, node.external_id AS model_id
+                            RETURN score, node.external_id AS model_id, node.name AS name, node.version AS version,
+                            node.short_description AS short_description
                     """
 
         version_search_start_time = time.time()
@@ -666,23 +1067,77 @@ class GraphDB:
             records = list(result)
         return records
 
-    def full_text_search(self, prompt, max_nodes=10):
+    def full_text_search(self, prompt, max_nodes=10, offset=0, boosts=None, match=None, fields=None):
         """
-        Searches the knowledge graph using the full text indexes on Model Cards.
-        :return: list of model cards
+        Searches the knowledge graph using the full text indexes on Model Cards. The page is cut by SKIP and LIMIT
+        before any property is read, so only the model cards of the page are loaded.
+        :param prompt: search prompt, in Lucene syntax unless boosts or match are given
+        :param max_nodes: maximum number of model cards returned
+        :param offset: number of best matching model cards skipped
+        :param boosts: dictionary of FULL_TEXT_FIELDS field to boost
+        :param match: None for exact terms, 'fuzzy' or 'prefix'
+        :param fields: SEARCH_RESULT_FIELDS properties returned, defaults to DEFAULT_SEARCH_RESULT_FIELDS
+        :return: list of model cards with mc_id, score, family_id and the requested fields, best match first
         """
-        query = """        
-                 CALL db.index.fulltext.queryNodes("mcFullIndex", $prompt) YIELD node, score
-                RETURN node.external_id as mc_id, node.name as name, node.version as version, 
-                node.short_description as short_description, score as score
+        fields = fields or DEFAULT_SEARCH_RESULT_FIELDS
+        query = """
+                CALL db.index.fulltext.queryNodes("mcFullIndex", $prompt) YIELD node, score
+                WITH node, score
+                SKIP $offset
                 LIMIT $num_nodes
+                RETURN node.external_id as mc_id, score as score, node.family_id as family_id,
+                [field IN $fields | node[field]] as values
                 """
-        version_search_start_time = time.time()
-        records = []
         with self.driver.session() as session:
-            result = session.run(query, prompt=prompt, num_nodes=max_nodes)
-            records = list(result)
-        return records
+            result = session.run(query, prompt=lucene_query(prompt, boosts, match), offset=offset,
+                                 num_nodes=max_nodes, fields=fields)
+            return [dict(zip(fields, record['values']), mc_id=record['mc_id'], score=record['score'],
+                         family_id=record['family_id']) for record in result]
+
+    def full_text_search_families(self, prompt, max_nodes=10, offset=0, boosts=None, match=None, fields=None):
+        """
+        Searches the full text index like full_text_search, keeping only the best matching model card of each
+        model family. Families are collapsed and paged with SKIP and LIMIT in the query, so a page never depends
+        on how many versions of the earlier families matched.
+        :param prompt: search prompt, in Lucene syntax unless boosts or match are given
+        :param max_nodes: maximum number of families returned
+        :param offset: number of best matching families skipped
+        :param boosts: dictionary of FULL_TEXT_FIELDS field to boost
+        :param match: None for exact terms, 'fuzzy' or 'prefix'
+        :param fields: SEARCH_RESULT_FIELDS properties returned, defaults to DEFAULT_SEARCH_RESULT_FIELDS
+        :return: list of the best model card of each family with mc_id, score, family_id, the number of matching
+        model cards of the family as family_hits and the requested fields, best match first
+        """
+        fields = fields or DEFAULT_SEARCH_RESULT_FIELDS
+        query = """
+                CALL db.index.fulltext.queryNodes("mcFullIndex", $prompt) YIELD node, score
+                WITH node, score, coalesce(node.family_id, node.external_id) AS family_id
+                ORDER BY score DESC
+                WITH family_id, head(collect(node)) AS node, max(score) AS score, count(*) AS family_hits
+                ORDER BY score DESC, family_id
+                SKIP $offset
+                LIMIT $num_nodes
+                RETURN node.external_id as mc_id, score as score, family_id, family_hits,
+                [field IN $fields | node[field]] as values
+                """
+        with self.driver.session() as session:
+            result = session.run(query, prompt=lucene_query(prompt, boosts, match), offset=offset,
+                                 num_nodes=max_nodes, fields=fields)
+            return [dict(zip(fields, record['values']), mc_id=record['mc_id'], score=record['score'],
+                         family_id=record['family_id'], family_hits=record['family_hits']) for record in result]
+
+    def full_text_search_ids(self, prompt):
+        """
+        Gets the ids of every model card matching a full-text search, without reading any other property.
+        :param prompt: search prompt, in Lucene syntax
+        :return: list of model card ids
+        """
+        query = """
+                CALL db.index.fulltext.queryNodes("mcFullIndex", $prompt) YIELD node
+                RETURN node.external_id as mc_id
+                """
+        with self.driver.session() as session:
+            return [record['mc_id'] for record in session.run(query, prompt=lucene_query(prompt))]
 
     def versioning_perf_test(self, model_card, threshold=0.95, max_nodes=3000):
         """
@@ -729,6 +1184,53 @@ class GraphDB:
 
         return version_index_total_time, version_search_total_time
 
+    def get_model_card(self, mc_id):
+        """
+        Retrieve a model card together with its AI model, bias and xai analysis, requirements and datasheet in a
+        single query by traversing the model card's relationships.
+        :param mc_id:
+        :return: record with the model card and satellite node properties, None if the model card does not exist
+        """
+        records = self.get_model_cards([mc_id])
+        return records[0] if records else None
+
+    def get_model_cards(self, mc_ids):
+        """
+        Retrieve a batch of model cards together with their satellite nodes in a single query.
+        :param mc_ids: list of model card ids
+        :return: list of records for the model cards that exist, each with the requested id as 'mc_id'
+        """
+        query = """
+            UNWIND $mc_ids AS mc_id
+            MATCH (mc:ModelCard {external_id: mc_id})
+            RETURN mc_id,
+                   properties(mc) AS model_card,
+                   head([(mc)-[:USED]->(ai:Model) | properties(ai)]) AS ai_model,
+                   head([(mc)-[:BIAS_ANALYSIS]->(ba:BiasAnalysis) | properties(ba)]) AS bias_analysis,
+                   head([(mc)-[:XAI_ANALYSIS]->(xai:ExplainabilityAnalysis) | properties(xai)]) AS xai_analysis,
+                   head([(mc)-[:REQUIREMENTS]->(req:ModelRequirements) | properties(req)]) AS requirements,
+                   head([(mc)-[:TRAINED_ON]->(ds:Datasheet) | properties(ds)]) AS datasheet
+        """
+        with self.driver.session() as session:
+            result = session.run(query, mc_ids=list(mc_ids))
+            return list(result)
+
+    def get_link_fields(self, mc_id):
+        """
+        Retrieve only the model card fields used for the linkset relations (external id, author, input data and the
+        AI model's location and inference labels).
+        :param mc_id:
+        :return: record with the link fields, None if the model card does not exist
+        """
+        query = """
+            MATCH (mc:ModelCard {external_id: $mc_id})
+            RETURN mc.external_id AS external_id, mc.author AS author, mc.input_data AS input_data,
+                   head([(mc)-[:USED]->(ai:Model) | ai {.location, .inference_labels}]) AS ai_model
+        """
+        with self.driver.session() as session:
+            result = session.run(query, mc_id=mc_id)
+            return result.single()
+
     def get_result_query(self, query, parameters):
         with self.driver.session() as session:
             result = session.run(query, parameters).single()
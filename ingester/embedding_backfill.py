@@ -0,0 +1,127 @@
+import itertools
+import json
+import logging
+import os
+
+from dotenv import load_dotenv
+
+from ingester.database import GraphDB
+from ingester.graph_embedder import embed_texts, embedding_text, get_embedding_provider
+
+load_dotenv()
+
+
+def load_checkpoint(path, embedding_model):
+    """
+    Load the backfill checkpoint. A new backfill is started if there is no checkpoint, the last backfill finished,
+    or it was run for another embedding model.
+    """
+    if os.path.exists(path):
+        with open(path) as file:
+            checkpoint = json.load(file)
+        if checkpoint.get('embedding_model') == embedding_model and checkpoint.get('phase') != 'done':
+            return checkpoint
+    if os.path.exists(path + ".ids"):
+        os.remove(path + ".ids")
+    return {'embedding_model': embedding_model, 'phase': 'embed', 'after': "", 'embedded': 0, 'versioned': 0,
+            'ids_size': 0}
+
+
+def save_checkpoint(path, checkpoint):
+    """
+    Atomically replace the checkpoint file.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(checkpoint, file)
+    os.replace(tmp_path, path)
+
+
+def backfill_embeddings(db, checkpoint_path, batch_size=500):
+    """
+    Embed model cards that have no embedding, were embedded by another model or were updated since they were
+    embedded, then infer versioning for them.
+
+    Model cards are read in external id order a batch at a time, and the last embedded id is checkpointed after
+    every batch, so the job can be stopped and resumed at any point. The ids of embedded model cards are appended
+    to `<checkpoint>.ids` for the versioning pass, which is checkpointed the same way.
+    :param db: GraphDB to backfill
+    :param checkpoint_path: path of the checkpoint file
+    :param batch_size: number of model cards embedded and written per transaction
+    :return: checkpoint with the number of embedded and versioned model cards
+    """
+    embedding_model = get_embedding_provider().name
+    checkpoint = load_checkpoint(checkpoint_path, embedding_model)
+    ids_path = checkpoint_path + ".ids"
+
+    if checkpoint['phase'] == 'embed' and os.path.exists(ids_path):
+        # drop ids recorded by a batch that was interrupted before its checkpoint
+        with open(ids_path, "r+") as file:
+            file.truncate(checkpoint['ids_size'])
+
+    while checkpoint['phase'] == 'embed':
+        model_cards = db.get_mcs_to_embed(embedding_model, checkpoint['after'], batch_size)
+        if not model_cards:
+            checkpoint['phase'] = 'version'
+            save_checkpoint(checkpoint_path, checkpoint)
+            break
+
+        embeddings = embed_texts([embedding_text(model_card) for model_card in model_cards])
+        # ids are recorded before the write, so a card is never embedded without being versioned later
+        with open(ids_path, "a") as file:
+            file.writelines(model_card['id'] + "\n" for model_card in model_cards)
+            checkpoint['ids_size'] = file.tell()
+        db.set_embeddings([{'id': model_card['id'], 'embedding': embedding, 'content_hash': model_card['content_hash']}
+                           for model_card, embedding in zip(model_cards, embeddings)], embedding_model)
+
+        checkpoint['after'] = model_cards[-1]['id']
+        checkpoint['embedded'] += len(model_cards)
+        save_checkpoint(checkpoint_path, checkpoint)
+        logging.info(f"Embedded {checkpoint['embedded']} model cards, up to {checkpoint['after']}.")
+
+    if checkpoint['phase'] == 'version':
+        if os.path.exists(ids_path):
+            with open(ids_path) as file:
+                mc_ids = (line.strip() for line in itertools.islice(file, checkpoint['versioned'], None))
+                while True:
+                    batch = list(itertools.islice(mc_ids, batch_size))
+                    if not batch:
+                        break
+                    revisions = db.infer_versioning_many(batch)
+                    versioned = [mc_id for mc_id, card_revisions in revisions.items() if card_revisions]
+                    if versioned:
+                        db.assign_families(versioned)
+                    checkpoint['versioned'] += len(batch)
+                    save_checkpoint(checkpoint_path, checkpoint)
+                    logging.info(f"Inferred versioning for {checkpoint['versioned']} model cards.")
+        checkpoint['phase'] = 'done'
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    return checkpoint
+
+
+def main():
+    """
+    Resumable backfill of embeddings for model cards ingested while similarity was disabled, or embedded by an
+    older embedding model. Run with `python -m ingester.embedding_backfill`; rerun after an interruption to resume
+    from the checkpoint.
+    """
+    logging.basicConfig(level=logging.INFO)
+    NEO4J_URI = os.getenv("NEO4J_URI")
+    NEO4J_USERNAME = os.getenv("NEO4J_USER")
+    NEO4J_PWD = os.getenv("NEO4J_PWD")
+    batch_size = int(os.getenv("BACKFILL_BATCH_SIZE", "500"))
+    checkpoint_path = os.getenv("EMBEDDING_BACKFILL_CHECKPOINT", "embedding_backfill.json")
+
+    db = GraphDB(NEO4J_URI, NEO4J_USERNAME, NEO4J_PWD)
+    try:
+        checkpoint = backfill_embeddings(db, checkpoint_path, batch_size)
+    finally:
+        db.close()
+
+    logging.info(f"Embedded {checkpoint['embedded']} model cards with {checkpoint['embedding_model']} and inferred "
+                 f"versioning for {checkpoint['versioned']} of them.")
+
+
+if __name__ == "__main__":
+    main()
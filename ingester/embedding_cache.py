@@ -0,0 +1,169 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+
+
+def embedding_cache_key(text, model, dimensions):
+    """
+    Key of an embedding in the cache.
+    :param text: text that was embedded
+    :param model: name of the embedding model
+    :param dimensions: number of dimensions of the embedding
+    :return: sha256 hex digest of the model, dimensions and text
+    """
+    return hashlib.sha256(f"{model}|{dimensions}|{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache backed by a local SQLite database.
+
+    Embeddings are stored as packed doubles keyed by `embedding_cache_key`. The number of entries is counted once
+    when the database is opened and then tracked in memory. When the cache grows past `max_entries`, the least
+    recently used embeddings are evicted in one batch down to `evict_to * max_entries`, so eviction is amortized
+    over many inserts. Hits only record the access time in memory; the times are written in batches of
+    `touch_batch_size` and before every eviction. The database is opened on first use.
+    """
+
+    def __init__(self, path, max_entries=100000, evict_to=0.9, touch_batch_size=1000):
+        """
+        :param path: path of the SQLite database
+        :param max_entries: maximum number of cached embeddings
+        :param evict_to: fraction of max_entries kept after an eviction
+        :param touch_batch_size: number of pending access times that triggers a write
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.evict_to = evict_to
+        self.touch_batch_size = touch_batch_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = None
+        self._size = 0
+        self._touched = {}
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._size = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                   [(last_used, key) for key, last_used in self._touched.items()])
+            self._touched = {}
+
+    def get(self, key):
+        """
+        Get a cached embedding.
+        :param key: cache key of the embedding
+        :return: the embedding as a list of floats, or None if it is not cached
+        """
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        """
+        Get several cached embeddings in one query.
+        :param keys: cache keys of the embeddings
+        :return: list with the embedding, or None if it is not cached, of each key
+        """
+        if not keys:
+            return []
+        with self._lock:
+            conn = self._connect()
+            vectors = {}
+            # stay below SQLite's limit on the number of query parameters
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                vectors.update(conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN "
+                                            f"({', '.join('?' * len(chunk))})", chunk).fetchall())
+            now = time.time()
+            for key in vectors:
+                self._touched[key] = now
+            self.hits += sum(key in vectors for key in keys)
+            self.misses += sum(key not in vectors for key in keys)
+            if len(self._touched) >= self.touch_batch_size:
+                self._flush_touched()
+        return [array("d", vectors[key]).tolist() if key in vectors else None for key in keys]
+
+    def set(self, key, embedding):
+        """
+        Cache an embedding, evicting the least recently used embeddings if the cache is full.
+        :param key: cache key of the embedding
+        :param embedding: embedding as a list of floats
+        """
+        self.set_many({key: embedding})
+
+    def set_many(self, embeddings):
+        """
+        Cache several embeddings in one transaction, evicting the least recently used embeddings if the cache
+        is full.
+        :param embeddings: dictionary of cache key to embedding
+        """
+        if self.max_entries <= 0 or not embeddings:
+            return
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute("BEGIN")
+            try:
+                for key, embedding in embeddings.items():
+                    vector = array("d", embedding).tobytes()
+                    if conn.execute("INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                                    (key, vector, now)).rowcount:
+                        self._size += 1
+                    else:
+                        conn.execute("UPDATE embeddings SET vector = ?, last_used = ? WHERE key = ?",
+                                     (vector, now, key))
+                if self._size > self.max_entries:
+                    self._flush_touched()
+                    overflow = self._size - int(self.max_entries * self.evict_to)
+                    conn.execute("DELETE FROM embeddings WHERE key IN "
+                                 "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (overflow,))
+                    self._size -= overflow
+                    self.evictions += overflow
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                self._size = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                raise
+
+    def clear(self):
+        """
+        Drop all cached embeddings.
+        """
+        with self._lock:
+            self._connect().execute("DELETE FROM embeddings")
+            self._size = 0
+            self._touched = {}
+
+    def stats(self):
+        """
+        Return the cache counters. The size is only reported once the database has been opened.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "size": self._size if self._conn else None,
+                "max_size": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
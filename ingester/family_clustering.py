@@ -0,0 +1,99 @@
+import logging
+import os
+
+from dotenv import load_dotenv
+
+from ingester.database import GraphDB
+
+load_dotenv()
+
+
+class UnionFind:
+    """
+    Disjoint sets with path halving and union by size. The root of each set is kept as its smallest member, so a
+    family id does not depend on the order the edges are read in.
+    """
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+        self.smallest = {}
+
+    def add(self, item):
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+            self.smallest[item] = item
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        self.add(a)
+        self.add(b)
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        self.smallest[root_a] = min(self.smallest[root_a], self.smallest[root_b])
+
+    def label(self, item):
+        """
+        Get the smallest member of the set of an item.
+        """
+        return self.smallest[self.find(item)]
+
+
+def cluster_families(db, chunk_size=1000):
+    """
+    Recompute the family id of every model card as the connected components of the REVISION_OF graph, and write
+    the family ids that changed. The family id is the smallest model card id in the family.
+    :param db: GraphDB to cluster
+    :param chunk_size: number of family ids written per transaction
+    :return: dictionary with the number of model cards, families and updated model cards
+    """
+    families = UnionFind()
+    current = {}
+    for row in db.get_mc_families():
+        families.add(row['id'])
+        current[row['id']] = row['family_id']
+    for edge in db.get_revision_pairs():
+        families.union(edge['mc_id'], edge['model_id'])
+
+    changed = [{'id': mc_id, 'family_id': families.label(mc_id)} for mc_id, family_id in current.items()
+               if families.label(mc_id) != family_id]
+    for start in range(0, len(changed), chunk_size):
+        db.set_families(changed[start:start + chunk_size])
+
+    return {'model_cards': len(current), 'families': len({families.find(mc_id) for mc_id in current}),
+            'updated': len(changed)}
+
+
+def main():
+    """
+    Periodic job assigning family ids. Run with `python -m ingester.family_clustering`.
+    """
+    logging.basicConfig(level=logging.INFO)
+    NEO4J_URI = os.getenv("NEO4J_URI")
+    NEO4J_USERNAME = os.getenv("NEO4J_USER")
+    NEO4J_PWD = os.getenv("NEO4J_PWD")
+
+    db = GraphDB(NEO4J_URI, NEO4J_USERNAME, NEO4J_PWD)
+    try:
+        summary = cluster_families(db)
+    finally:
+        db.close()
+
+    logging.info(f"Clustered {summary['model_cards']} model cards into {summary['families']} families, "
+                 f"updated {summary['updated']} family ids.")
+
+
+if __name__ == "__main__":
+    main()
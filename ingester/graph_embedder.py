@@ -1,36 +1,244 @@
+import logging
 import os
+import random
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from ingester.embedding_cache import EmbeddingCache, embedding_cache_key
 
 load_dotenv()
 
 ENABLE_MC_SIMILARITY = os.getenv("ENABLE_MC_SIMILARITY", "False").lower() == "true"
+# embedding provider used for similarity and versioning, "openai" or "local"
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai").lower()
 OPENAI_API_KEY = None
 
-if ENABLE_MC_SIMILARITY:
+if EMBEDDING_PROVIDER not in ("openai", "local"):
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER '{EMBEDDING_PROVIDER}', expected 'openai' or 'local'.")
+
+if ENABLE_MC_SIMILARITY and EMBEDDING_PROVIDER == "openai":
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     if not OPENAI_API_KEY:
         raise ValueError("ENABLE_MC_SIMILARITY is set to True, but OPENAI_API_KEY is not set.")
 
-def open_ai_embedding(model_card, client, fields=None):
+EMBEDDING_MODEL = "text-embedding-3-small"
+# dimensions of the modelEmbeddings vector index
+EMBEDDING_DIMENSIONS = 300
+EMBEDDING_FIELDS = ['author', 'short_description', 'full_description', 'version', "input_type", "keywords", "category",
+                    "input_data"]
+
+# persistent cache of embeddings, set EMBEDDING_CACHE_PATH to an empty string to disable it
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "100000"))
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_SIZE) if EMBEDDING_CACHE_PATH else None
+
+# texts per embedding request, concurrent requests and retries of rate limited requests for batch embedding
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+EMBEDDING_MAX_WORKERS = int(os.getenv("EMBEDDING_MAX_WORKERS", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+
+_client = None
+_client_lock = threading.Lock()
+_provider = None
+
+
+def get_openai_client():
+    """
+    Return the OpenAI client shared by all embedding calls.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            _client = OpenAI(api_key=OPENAI_API_KEY)
+    return _client
+
+
+class EmbeddingProvider:
+    """
+    Turns texts into embeddings. The name identifies the embeddings a provider produces, so embeddings of
+    different providers never share a cache entry.
+    """
+    name = None
+    dimensions = EMBEDDING_DIMENSIONS
+
+    def embed(self, texts):
+        """
+        Embed texts.
+        :param texts: list of texts
+        :return: list of embeddings, in the order of the texts
+        """
+        raise NotImplementedError
+
+    def is_retryable(self, error):
+        """
+        Whether a failed embedding request should be retried.
+        """
+        return False
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """
+    Embeddings from the OpenAI embeddings API.
+    """
+
+    def __init__(self, model=EMBEDDING_MODEL, dimensions=EMBEDDING_DIMENSIONS, client=None):
+        self.name = model
+        self.dimensions = dimensions
+        self.client = client
+
+    def embed(self, texts):
+        client = self.client or get_openai_client()
+        response = client.embeddings.create(
+            input=texts,
+            model=self.name,
+            encoding_format="float",
+            dimensions=self.dimensions
+        )
+        return [item.embedding for item in response.data]
+
+    def is_retryable(self, error):
+        # rate limits, timeouts and server errors of the OpenAI client
+        if type(error).__name__ in ("RateLimitError", "APITimeoutError", "APIConnectionError"):
+            return True
+        status_code = getattr(error, "status_code", None)
+        return status_code == 429 or (status_code is not None and status_code >= 500)
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    In-process embeddings for clusters without access to the OpenAI API.
+
+    Word unigrams and bigrams are hashed into a fixed number of signed buckets, weighted by 1 + log of their
+    count and L2 normalized, so cosine similarity reflects the shared vocabulary of two cards. The vectors
+    need no fitting, are stable across processes and do not change as cards are added.
+    """
+    name = "local-hashing-v1"
+    _token_pattern = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, dimensions=EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def _features(self, text):
+        tokens = self._token_pattern.findall(text.lower())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float64)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                vectors[row, digest % self.dimensions] += sign
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).tolist()
+
+
+def get_embedding_provider():
+    """
+    Return the embedding provider selected by EMBEDDING_PROVIDER.
+    """
+    global _provider
+    if _provider is None:
+        _provider = LocalEmbeddingProvider() if EMBEDDING_PROVIDER == "local" else OpenAIEmbeddingProvider()
+    return _provider
+
+
+def embedding_text(model_card, fields=None):
     if fields is None:
-        fields = ['author', 'short_description', 'full_description', 'version', "input_type", "keywords", "category",
-                  "input_data"]
-    tokenized_text = " ".join(str(model_card[field]) for field in fields if field in model_card)
+        fields = EMBEDDING_FIELDS
+    return " ".join(str(model_card[field]) for field in fields if field in model_card)
+
+
+def embed_text(text, provider=None):
+    """
+    Embed a text, using the embedding cache when it is enabled.
+    :param text: text to embed
+    :param provider: embedding provider, defaults to the configured provider
+    :return: embedding as a list of floats
+    """
+    return embed_texts([text], provider)[0]
+
+
+def _embed_batch(provider, texts, max_retries):
+    for attempt in range(max_retries + 1):
+        try:
+            return provider.embed(texts)
+        except Exception as e:
+            if attempt == max_retries or not provider.is_retryable(e):
+                raise
+            delay = min(2 ** attempt, 30) * (0.5 + random.random() / 2)
+            logging.warning(f"Embedding request for {len(texts)} texts failed ({str(e)}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
 
-    response = client.embeddings.create(
-        input=tokenized_text,
-        model="text-embedding-3-small",
-        encoding_format="float",
-        dimensions=300
-    )
+def embed_texts(texts, provider=None, batch_size=None, max_workers=None, max_retries=None):
+    """
+    Embed many texts, packing them into batched provider requests that run concurrently.
 
-    return response.data[0].embedding
+    Cached embeddings are reused, identical texts are embedded once, and rate limited requests are retried with
+    exponential backoff.
+    :param texts: list of texts to embed
+    :param provider: embedding provider, defaults to the configured provider
+    :param batch_size: number of texts per provider request
+    :param max_workers: maximum number of concurrent provider requests
+    :param max_retries: number of retries of a rate limited request
+    :return: list of embeddings, in the order of the texts
+    """
+    provider = provider or get_embedding_provider()
+    batch_size = batch_size or EMBEDDING_BATCH_SIZE
+    max_workers = max_workers or EMBEDDING_MAX_WORKERS
+    max_retries = EMBEDDING_MAX_RETRIES if max_retries is None else max_retries
+
+    unique_texts = list(dict.fromkeys(texts))
+    keys = [embedding_cache_key(text, provider.name, provider.dimensions) for text in unique_texts]
+    cached = embedding_cache.get_many(keys) if embedding_cache is not None else [None] * len(keys)
+    embeddings = {text: embedding for text, embedding in zip(unique_texts, cached) if embedding is not None}
+    missing = [text for text in unique_texts if text not in embeddings]
+
+    batches = [missing[start:start + batch_size] for start in range(0, len(missing), batch_size)]
+    if len(batches) == 1:
+        batch_embeddings = [_embed_batch(provider, batches[0], max_retries)]
+    elif batches:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+            batch_embeddings = list(executor.map(lambda batch: _embed_batch(provider, batch, max_retries), batches))
+    else:
+        batch_embeddings = []
+
+    for batch, vectors in zip(batches, batch_embeddings):
+        for text, embedding in zip(batch, vectors):
+            embeddings[text] = embedding
+    if embedding_cache is not None and missing:
+        embedding_cache.set_many({embedding_cache_key(text, provider.name, provider.dimensions): embeddings[text]
+                                  for text in missing})
+    return [embeddings[text] for text in texts]
+
+
+def open_ai_embedding(model_card, client, fields=None):
+    return embed_text(embedding_text(model_card, fields), OpenAIEmbeddingProvider(client=client))
 
 def embed_model_versioning(model_card, fields=None):
     if not ENABLE_MC_SIMILARITY:
         return None
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    return open_ai_embedding(model_card, client, fields)
+    return embed_text(embedding_text(model_card, fields))
+
+def embed_model_cards(model_cards, fields=None):
+    """
+    Embed a batch of model cards with batched, concurrent provider requests.
+    :param model_cards: list of model cards
+    :param fields: model card fields to embed
+    :return: list of embeddings in the order of the model cards, or None if similarity is disabled
+    """
+    if not ENABLE_MC_SIMILARITY:
+        return None
+
+    return embed_texts([embedding_text(model_card, fields) for model_card in model_cards])
@@ -0,0 +1,222 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class IngestQueue:
+    """
+    Durable write-behind queue for model card uploads.
+
+    Queued model cards are stored in a local SQLite database and drained by a pool of worker threads that
+    ingest them in batches with `MCIngester.add_mcs`, so the upload request does not wait for the embedding,
+    the insert or the versioning search.
+
+    Several processes can drain the same queue database. A claimed job is leased to the queue that claimed it for
+    `lease_seconds`, and the lease is renewed while the job is being written. Jobs whose lease expired, because
+    their process stopped or could not record their outcome, are claimed again by any queue.
+    """
+
+    def __init__(self, ingester, path, workers=2, batch_size=50, poll_interval=1.0, lease_seconds=60.0):
+        """
+        :param ingester: MCIngester used to write the queued model cards
+        :param path: path of the SQLite database holding the queue
+        :param workers: number of worker threads draining the queue
+        :param batch_size: maximum number of model cards written per batch
+        :param poll_interval: seconds an idle worker waits before checking the queue again
+        :param lease_seconds: seconds a claimed job stays reserved for this queue without being renewed
+        """
+        self.ingester = ingester
+        self.path = path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        # claim owner of this queue, unique across the processes sharing the database
+        self.owner = uuid.uuid4().hex
+        self._conn = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        # ids of the jobs being written, whose leases are renewed
+        self._active = set()
+
+    def start(self):
+        """
+        Open the queue database and start the workers, which also resume the jobs left queued by the previous
+        process and, once their lease expires, the jobs it left running. Called when the server starts, and on
+        the first enqueue or job lookup otherwise.
+        """
+        with self._lock:
+            if self._conn is not None:
+                return
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT,
+                    model_card_id TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in (("owner", "TEXT"), ("lease_until", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._conn = conn
+
+            self._stop.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"ingest-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            if self.workers:
+                thread = threading.Thread(target=self._renew_leases, name="ingest-lease", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """
+        Stop the workers once their current batch is written and close the queue database.
+        """
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def enqueue(self, model_card):
+        """
+        Queue a model card for ingestion.
+        :param model_card: validated model card
+        :return: id of the ingestion job
+        """
+        self.start()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, payload, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, json.dumps(model_card), now, now))
+        self._wakeup.set()
+        return job_id
+
+    def get_job(self, job_id):
+        """
+        Get the status of an ingestion job.
+        :param job_id: id of the job
+        :return: job status, or None if the job does not exist
+        """
+        self.start()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, status, model_card_id, result, error, created_at, updated_at FROM jobs "
+                "WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = dict(row)
+            if job["status"] == "queued":
+                job["queue_position"] = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < ?",
+                    (job["created_at"],)).fetchone()[0]
+        return job
+
+    def _claim(self):
+        """
+        Atomically lease the oldest queued jobs, and running jobs whose lease expired, to this queue.
+        :return: list of (job_id, model_card) tuples
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT job_id, payload FROM jobs WHERE status = 'queued' OR "
+                    "(status = 'running' AND (lease_until IS NULL OR lease_until < ?)) ORDER BY created_at LIMIT ?",
+                    (now, self.batch_size)).fetchall()
+                self._conn.executemany(
+                    "UPDATE jobs SET status = 'running', owner = ?, lease_until = ?, updated_at = ? WHERE job_id = ?",
+                    [(self.owner, now + self.lease_seconds, now, row["job_id"]) for row in rows])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._active.update(row["job_id"] for row in rows)
+        return [(row["job_id"], json.loads(row["payload"])) for row in rows]
+
+    def _renew_leases(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            with self._lock:
+                if not self._active or self._conn is None:
+                    continue
+                try:
+                    self._conn.executemany(
+                        "UPDATE jobs SET lease_until = ? WHERE job_id = ? AND owner = ? AND status = 'running'",
+                        [(time.time() + self.lease_seconds, job_id, self.owner) for job_id in self._active])
+                except Exception as e:
+                    logging.error(f"Failed to renew the leases of {len(self._active)} ingestion jobs: {e}")
+
+    def _finish(self, updates):
+        """
+        Record the outcome of ingested jobs and drop their payloads. Jobs leased to another queue meanwhile are
+        left to it.
+        :param updates: list of (status, model_card_id, result, error, job_id) tuples
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, model_card_id = ?, result = ?, error = ?, payload = NULL, "
+                "lease_until = NULL, updated_at = ? WHERE job_id = ? AND owner = ?",
+                [(status, mc_id, result, error, now, job_id, self.owner)
+                 for status, mc_id, result, error, job_id in updates])
+
+    def _process(self, jobs):
+        try:
+            results = self.ingester.add_mcs([model_card for _, model_card in jobs])
+        except Exception as e:
+            logging.error(f"Failed to ingest a batch of {len(jobs)} queued model cards: {e}")
+            self._finish([("failed", None, None, str(e), job_id) for job_id, _ in jobs])
+            return
+
+        updates = []
+        for (job_id, _), result in zip(jobs, results):
+            if result["status"] == "failed":
+                updates.append(("failed", None, None, result.get("error"), job_id))
+            else:
+                updates.append(("done", result["model_card_id"], result["status"], None, job_id))
+        self._finish(updates)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                jobs = self._claim()
+            except Exception as e:
+                logging.error(f"Failed to read the ingestion queue: {e}")
+                jobs = []
+            if not jobs:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            try:
+                self._process(jobs)
+            except Exception as e:
+                # the jobs stay running until their lease expires and they are claimed again, as duplicates of the
+                # written model cards, but the worker keeps draining
+                logging.error(f"Failed to record the outcome of {len(jobs)} ingestion jobs: {e}")
+            finally:
+                with self._lock:
+                    self._active.difference_update(job_id for job_id, _ in jobs)
@@ -0,0 +1,234 @@
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from ingester.similarity_engine import SimilarityEngine
+
+load_dotenv()
+
+LSH_BANDS = int(os.getenv("LSH_BANDS", "40"))
+LSH_ROWS = int(os.getenv("LSH_ROWS", "16"))
+LSH_INDEX_PATH = os.getenv("LSH_INDEX_PATH", "lsh_index.npz")
+
+
+class LSHIndex(SimilarityEngine):
+    """
+    Random-hyperplane LSH index for near-duplicate detection.
+
+    Each embedding gets `bands * rows` sign bits, one per random hyperplane, and is bucketed once per band by its
+    `rows` bits of that band. Two cards with cosine similarity c agree on a bit with probability 1 - arccos(c) / pi,
+    so near-duplicates share at least one band bucket with high probability while unrelated cards rarely do. A
+    query only scores the cards in its buckets, with the exact cosine, so results are never false positives; cards
+    missed by every band lower the recall. Queries below `min_threshold`, where LSH recall is poor, fall back to the
+    exact scan.
+
+    The index keeps the embeddings and the sync protocol of SimilarityEngine and is persisted to `path` after
+    each sync that added, changed or removed embeddings, so a restart only loads the embeddings written since the
+    last sync. Embeddings re-read unchanged by the sync margin do not trigger a save.
+    """
+
+    def __init__(self, db, bands=LSH_BANDS, rows=LSH_ROWS, path=None, seed=0, min_threshold=0.9, **kwargs):
+        """
+        :param db: GraphDB the embeddings are loaded from
+        :param bands: number of bands, more bands raise the recall
+        :param rows: number of hyperplanes per band (at most 62), more rows lower the number of candidates
+        :param path: path the index is persisted to, or None to keep it in memory only
+        :param seed: seed of the random hyperplanes
+        :param min_threshold: lowest query threshold answered from the LSH buckets
+        """
+        super().__init__(db, **kwargs)
+        self.bands = bands
+        self.band_rows = rows
+        self.path = path
+        self.seed = seed
+        self.min_threshold = min_threshold
+        self.planes = None
+        self.buckets = [{} for _ in range(bands)]
+        self.keys = {}
+        # whether embeddings changed since the index was last saved or loaded
+        self.dirty = False
+        if path and os.path.exists(path):
+            self.load()
+
+    def _band_keys(self, vectors):
+        if self.planes is None:
+            rng = np.random.default_rng(self.seed)
+            self.planes = rng.standard_normal((self.bands * self.band_rows, vectors.shape[1])).astype(np.float32)
+        bits = ((vectors @ self.planes.T) > 0).reshape(len(vectors), self.bands, self.band_rows)
+        return (bits @ (1 << np.arange(self.band_rows, dtype=np.int64))).tolist()
+
+    def upsert(self, embeddings):
+        if not embeddings:
+            return
+        ids = list(embeddings)
+        vectors = self._normalize([embeddings[mc_id] for mc_id in ids])
+        keys = self._band_keys(vectors)
+        vectors = vectors.astype(self.dtype)
+        with self._lock:
+            if not self.dirty:
+                self.dirty = any(mc_id not in self.rows or not np.array_equal(self.matrix[self.rows[mc_id]], vector)
+                                 for mc_id, vector in zip(ids, vectors))
+            self._unbucket(ids)
+            super().upsert(embeddings)
+            for mc_id, mc_keys in zip(ids, keys):
+                self.keys[mc_id] = mc_keys
+                for band, key in zip(self.buckets, mc_keys):
+                    band.setdefault(key, set()).add(mc_id)
+
+    def remove(self, mc_ids):
+        with self._lock:
+            self.dirty = self.dirty or any(mc_id in self.rows for mc_id in mc_ids)
+            self._unbucket(mc_ids)
+            super().remove(mc_ids)
+
+    def _unbucket(self, mc_ids):
+        for mc_id in mc_ids:
+            for band, key in zip(self.buckets, self.keys.pop(mc_id, ())):
+                bucket = band.get(key)
+                if bucket is not None:
+                    bucket.discard(mc_id)
+                    if not bucket:
+                        del band[key]
+
+    def candidates(self, vector):
+        """
+        Get the ids of the model cards sharing at least one band bucket with the vector.
+        """
+        keys = self._band_keys(self._normalize([vector]))[0]
+        with self._lock:
+            return set().union(*(band.get(key, ()) for band, key in zip(self.buckets, keys)))
+
+    def search_many(self, vectors, k=10, threshold=0.0, exclude=None):
+        if threshold < self.min_threshold:
+            return super().search_many(vectors, k, threshold, exclude)
+        queries = self._normalize(vectors)
+        keys = self._band_keys(queries)
+        exclude = exclude or [None] * len(queries)
+        results = []
+        with self._lock:
+            for query, query_keys, excluded in zip(queries, keys, exclude):
+                candidates = set().union(*(band.get(key, ()) for band, key in zip(self.buckets, query_keys)))
+                candidates.discard(excluded)
+                if not candidates:
+                    results.append([])
+                    continue
+                ids = list(candidates)
+                vectors = self.matrix[[self.rows[mc_id] for mc_id in ids]].astype(np.float32)
+                scores = (1.0 + vectors @ query) / 2.0
+                matches = [(ids[i], float(scores[i])) for i in np.flatnonzero(scores > threshold)]
+                matches.sort(key=lambda match: match[1], reverse=True)
+                results.append(matches[:k])
+        return results
+
+    def sync(self):
+        super().sync()
+        if self.path and self.dirty:
+            self.save()
+
+    def save(self):
+        """
+        Persist the embeddings and the sync watermark. The buckets are rebuilt from the embeddings on load.
+        """
+        with self._lock:
+            count = len(self.ids)
+            matrix = self.matrix[:count] if self.matrix is not None else np.empty((0, 0), dtype=self.dtype)
+            ids = np.array(self.ids, dtype=str)
+            self.dirty = False
+        # a temporary file of its own, as other processes may save the same index concurrently
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                        prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                np.savez(file, ids=ids, matrix=matrix, watermark=np.array(self.watermark or 0),
+                         settings=np.array([self.bands, self.band_rows, self.seed]))
+            os.replace(tmp_path, self.path)
+        except Exception:
+            self.dirty = True
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def load(self):
+        """
+        Load a persisted index. An index persisted with other band, row or seed settings is ignored.
+        """
+        with np.load(self.path) as data:
+            if list(data['settings']) != [self.bands, self.band_rows, self.seed]:
+                logging.info(f"Ignoring the LSH index at {self.path}, it was built with other settings.")
+                return
+            ids, matrix, watermark = [str(mc_id) for mc_id in data['ids']], data['matrix'], int(data['watermark'])
+        self.upsert(dict(zip(ids, matrix)))
+        self.watermark = watermark
+        self.dirty = False
+        logging.info(f"Loaded {len(ids)} embeddings from the LSH index at {self.path}.")
+
+    def evaluate(self, threshold, sample_size=1000, k=1000, seed=0):
+        """
+        Measure the LSH search against the exact search on a sample of the indexed model cards.
+        :param threshold: score threshold of the queries
+        :param sample_size: number of indexed model cards used as queries
+        :param k: maximum number of results per query
+        :param seed: seed of the sample
+        :return: dictionary with precision, recall, mean candidates per query and mean query times
+        """
+        with self._lock:
+            sample = [str(mc_id) for mc_id in
+                      np.random.default_rng(seed).choice(self.ids, min(sample_size, len(self.ids)), replace=False)]
+            vectors = [self.get(mc_id) for mc_id in sample]
+
+        start = time.perf_counter()
+        exact = super().search_many(vectors, k, threshold, sample)
+        exact_time = time.perf_counter() - start
+        start = time.perf_counter()
+        approximate = self.search_many(vectors, k, max(threshold, self.min_threshold), sample)
+        lsh_time = time.perf_counter() - start
+
+        true_pairs = {(mc_id, match) for mc_id, matches in zip(sample, exact) for match, _ in matches}
+        found_pairs = {(mc_id, match) for mc_id, matches in zip(sample, approximate) for match, _ in matches}
+        hits = len(true_pairs & found_pairs)
+        candidates = sum(len(self.candidates(vector)) - 1 for vector in vectors)
+        return {
+            'queries': len(sample),
+            'bands': self.bands,
+            'rows': self.band_rows,
+            'precision': hits / len(found_pairs) if found_pairs else 1.0,
+            'recall': hits / len(true_pairs) if true_pairs else 1.0,
+            'mean_candidates': candidates / len(sample) if sample else 0.0,
+            'mean_exact_ms': 1000 * exact_time / len(sample) if sample else 0.0,
+            'mean_lsh_ms': 1000 * lsh_time / len(sample) if sample else 0.0,
+        }
+
+
+def main():
+    """
+    Build or update the persisted LSH index and report its precision and recall against the exact search.
+    Run with `python -m ingester.lsh_index`; tune LSH_BANDS and LSH_ROWS with the report.
+    """
+    from ingester.database import GraphDB, VERSIONING_THRESHOLD
+
+    logging.basicConfig(level=logging.INFO)
+    NEO4J_URI = os.getenv("NEO4J_URI")
+    NEO4J_USERNAME = os.getenv("NEO4J_USER")
+    NEO4J_PWD = os.getenv("NEO4J_PWD")
+    sample_size = int(os.getenv("LSH_EVAL_SAMPLE_SIZE", "1000"))
+
+    db = GraphDB(NEO4J_URI, NEO4J_USERNAME, NEO4J_PWD)
+    try:
+        index = LSHIndex(db, path=LSH_INDEX_PATH)
+        index.sync()
+    finally:
+        db.close()
+
+    report = index.evaluate(VERSIONING_THRESHOLD, sample_size)
+    logging.info(f"LSH index with {report['bands']} bands of {report['rows']} rows over {len(index)} model cards: "
+                 f"precision {report['precision']:.3f}, recall {report['recall']:.3f}, "
+                 f"{report['mean_candidates']:.1f} candidates per query, "
+                 f"{report['mean_lsh_ms']:.2f} ms per query ({report['mean_exact_ms']:.2f} ms exact).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,67 @@
+import logging
 import uuid
 
-from ingester.database import GraphDB
-from ingester.graph_embedder import embed_model_versioning
+from ingester.database import GraphDB, VERSIONING_THRESHOLD, mc_content_hash
+from ingester.graph_embedder import embed_model_cards, embed_model_versioning, get_embedding_provider
+
+# fields every model card needs before it can be ingested
+REQUIRED_MC_FIELDS = ['name', 'version', 'short_description', 'full_description', 'keywords', 'author', 'input_data',
+                      'output_data', 'input_type', 'category', 'ai_model']
+
+
+class DuplicateModelCardError(Exception):
+    """
+    Raised when an update would make a model card identical to another model card.
+    """
+
+    def __init__(self, model_card_id):
+        super().__init__(f"An identical model card already exists: {model_card_id}")
+        self.model_card_id = model_card_id
+
+
+def validate_mc(model_card):
+    """
+    Validate that the model card can be ingested.
+    :param model_card: Model card to validate.
+    :return: List of missing required fields, empty if the model card is valid.
+    """
+    if not isinstance(model_card, dict):
+        return list(REQUIRED_MC_FIELDS)
+    return [field for field in REQUIRED_MC_FIELDS if field not in model_card]
 
 
 class MCIngester:
 
-    def __init__(self, uri, user, password, similarity_support=False):
+    def __init__(self, uri, user, password, similarity_support=False, similarity_engine=None):
         self.uri = uri
         self.user = user
         self.password = password
         self.similarity_enabled = similarity_support
+        # optional in-process SimilarityEngine used for versioning instead of the vector index
+        self.similarity_engine = similarity_engine
+        self.listeners = []
         try:
             self.db = GraphDB(self.uri, self.user, self.password)
             print("Connected to the Neo4j database.")
         except Exception as e:
             print("Error connecting to the Neo4j database:", str(e))
 
+    def add_listener(self, listener):
+        """
+        Register a callback that is notified after a model card is written.
+
+        :param listener: Callable invoked as listener(model_card_id, model_card); model_card is None when only
+        related data (e.g. a deployment) changed.
+        """
+        self.listeners.append(listener)
+
+    def _notify(self, model_card_id, model_card=None):
+        for listener in self.listeners:
+            try:
+                listener(model_card_id, model_card)
+            except Exception as e:
+                logging.warning(f"Model card listener failed for {model_card_id}: {str(e)}")
+
     def add_mc(self, model_card):
         """
         Add a model card to the knowledge graph.
@@ -34,38 +79,164 @@ class MCIngester:
         if self.similarity_enabled:
             version_embedding = embed_model_versioning(model_card)
             model_card['embedding'] = version_embedding
+            model_card['embedding_model'] = get_embedding_provider().name
 
-        self.db.insert_base_mc(model_card, self.similarity_enabled)
-
+        existing_mc_id = self.db.insert_model_card(model_card, self.similarity_enabled)
+        if existing_mc_id:
+            # an identical model card was stored concurrently
+            return True, existing_mc_id
         base_mc_id = model_card['id']
-        datasheet_id = model_card['input_data']
-        self.db.connect_datasheet_mc(datasheet_id, base_mc_id)
-        self.db.insert_ai_model(base_mc_id, model_card['ai_model'])
 
-        bias_analysis = model_card["bias_analysis"]
-        if bias_analysis is not None:
-            bias_id = base_mc_id + "-bias"
-            self.db.insert_bias_analysis_metadata(base_mc_id, bias_id, bias_analysis)
+        # infer versioning
+        if self.similarity_enabled:
+            self._infer_versioning([model_card])
+        self._notify(base_mc_id, model_card)
+        return exists, base_mc_id
 
-        xai_analysis = model_card["xai_analysis"]
-        if xai_analysis is not None:
-            xai_id = base_mc_id + "-xai"
-            self.db.insert_xai_analysis_metadata(base_mc_id, xai_id, xai_analysis)
+    def add_mcs(self, model_cards, chunk_size=100):
+        """
+        Add a batch of model cards to the knowledge graph.
 
-        if "model_requirements" in model_card:
-            model_requirements = model_card["model_requirements"]
-            if model_requirements is not None:
-                requirements_id = base_mc_id + "-requirements"
-                self.db.insert_model_requirements_metadata(base_mc_id, requirements_id, model_requirements)
+        Duplicates are detected with one content hash lookup for the whole batch, and new model cards are written in chunks of
+        `chunk_size`, one transaction per chunk. If a chunk fails, its model cards are retried one by one so that a
+        single bad card does not fail the rest.
 
-        foundational_mc_id = model_card['foundational_model']
-        if foundational_mc_id:
-            self.db.connect_foundational_model(base_mc_id, foundational_mc_id)
+        :param model_cards: List of model cards to add.
+        :param chunk_size: Number of model cards written per transaction.
+        :return: List with a status entry ('created', 'exists' or 'failed') per model card, in input order.
+        """
+        results = [None] * len(model_cards)
+        candidates = []
+        for idx, model_card in enumerate(model_cards):
+            missing = validate_mc(model_card)
+            if missing:
+                results[idx] = {"index": idx, "status": "failed", "model_card_id": None,
+                                "error": f"Missing required fields: {', '.join(missing)}"}
+            else:
+                candidates.append(idx)
 
-        # infer versioning
-        if self.similarity_enabled:
-            self.db.infer_versioning(model_card)
-        return exists, base_mc_id
+        existing = self.db.check_mcs_exist([model_cards[idx] for idx in candidates]) if candidates else {}
+        pending = []
+        seen = {}
+        for position, idx in enumerate(candidates):
+            model_card = model_cards[idx]
+            content_hash = mc_content_hash(model_card)
+            if position in existing:
+                results[idx] = {"index": idx, "status": "exists", "model_card_id": existing[position]}
+            elif content_hash in seen:
+                # duplicate of an earlier card in the same batch
+                results[idx] = {"index": idx, "status": "exists",
+                                "model_card_id": model_cards[seen[content_hash]]['id']}
+            else:
+                if 'id' not in model_card:
+                    model_card['id'] = str(uuid.uuid4())
+                seen[content_hash] = idx
+                pending.append(idx)
+
+        if self.similarity_enabled and pending:
+            try:
+                embeddings = embed_model_cards([model_cards[idx] for idx in pending])
+            except Exception as e:
+                logging.error(f"Embedding {len(pending)} model cards failed: {str(e)}")
+                for idx in pending:
+                    results[idx] = {"index": idx, "status": "failed", "model_card_id": model_cards[idx]['id'],
+                                    "error": f"Embedding failed: {str(e)}"}
+                return results
+            embedding_model = get_embedding_provider().name
+            for idx, embedding in zip(pending, embeddings):
+                model_cards[idx]['embedding'] = embedding
+                model_cards[idx]['embedding_model'] = embedding_model
+
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            try:
+                duplicates = self.db.insert_model_cards([model_cards[idx] for idx in chunk], self.similarity_enabled)
+            except Exception as e:
+                logging.warning(f"Batch insert of {len(chunk)} model cards failed, retrying one by one: {str(e)}")
+                duplicates = {}
+                for idx in list(chunk):
+                    try:
+                        existing_mc_id = self.db.insert_model_card(model_cards[idx], self.similarity_enabled)
+                        if existing_mc_id:
+                            duplicates[model_cards[idx]['id']] = existing_mc_id
+                    except Exception as card_error:
+                        chunk.remove(idx)
+                        results[idx] = {"index": idx, "status": "failed", "model_card_id": model_cards[idx]['id'],
+                                        "error": str(card_error)}
+
+            created = []
+            for idx in chunk:
+                mc_id = model_cards[idx]['id']
+                if mc_id in duplicates:
+                    # an identical model card was stored concurrently
+                    results[idx] = {"index": idx, "status": "exists", "model_card_id": duplicates[mc_id]}
+                    continue
+                results[idx] = {"index": idx, "status": "created", "model_card_id": mc_id}
+                created.append(idx)
+
+            if self.similarity_enabled and created:
+                # the chunk is committed, so a versioning failure must not hide the created model cards
+                try:
+                    self._infer_versioning([model_cards[idx] for idx in created])
+                except Exception as e:
+                    logging.warning(f"Versioning of {len(created)} model cards failed: {str(e)}")
+            for idx in created:
+                self._notify(model_cards[idx]['id'], model_cards[idx])
+
+        return results
+
+    def _infer_versioning(self, model_cards, max_nodes=1000):
+        """
+        Infer versioning for newly inserted model cards, in memory when the similarity engine is loaded and with
+        the vector index otherwise. The engine first loads the embeddings written since its last sync, so cards
+        written by other processes are never missed; if that fails the vector index is used. Model cards with
+        revisions then join (and possibly merge) their families.
+
+        :param model_cards: Inserted model cards with their embeddings.
+        :param max_nodes: Maximum number of revisions per model card.
+        """
+        engine = self.similarity_engine
+        if engine is not None and engine.loaded:
+            try:
+                engine.catch_up()
+            except Exception as e:
+                logging.warning(f"Similarity engine catch-up failed, versioning with the vector index: {str(e)}")
+                engine = None
+        if engine is None or not engine.loaded:
+            revisions = self.db.infer_versioning_many([model_card['id'] for model_card in model_cards],
+                                                      max_nodes=max_nodes)
+            versioned = [mc_id for mc_id, card_revisions in revisions.items() if card_revisions]
+            if versioned:
+                self.db.assign_families(versioned)
+            return
+
+        model_cards = [model_card for model_card in model_cards if model_card.get('embedding')]
+        if not model_cards:
+            return
+        engine.upsert({model_card['id']: model_card['embedding'] for model_card in model_cards})
+        matches = engine.search_many([model_card['embedding'] for model_card in model_cards], max_nodes,
+                                     VERSIONING_THRESHOLD, [model_card['id'] for model_card in model_cards])
+        revisions = [{'mc_id': model_card['id'], 'model_id': model_id, 'score': score}
+                     for model_card, card_matches in zip(model_cards, matches) for model_id, score in card_matches]
+        if revisions:
+            self.db.merge_revisions(revisions)
+            self.db.assign_families(list(dict.fromkeys(revision['mc_id'] for revision in revisions)))
+
+    def _update_embedding(self, model_card_id, model_card):
+        """
+        Re-embed an updated model card and replace its embedding in the graph and in the similarity engine, so
+        searches in this process never score its old text. Unchanged text is served by the embedding cache.
+
+        :param model_card_id: ID of the updated model card.
+        :param model_card: Updated model card.
+        """
+        embedding = embed_model_versioning(model_card)
+        if embedding is None:
+            return
+        self.db.set_embeddings([{'id': model_card_id, 'embedding': embedding,
+                                 'content_hash': mc_content_hash(model_card)}], get_embedding_provider().name)
+        if self.similarity_engine is not None:
+            self.similarity_engine.upsert({model_card_id: embedding})
 
     def update_mc(self, model_card):
         """
@@ -73,10 +244,13 @@ class MCIngester:
 
         :param model_card: Model card to update.
         :return: Model card ID if found, None otherwise.
+        :raises DuplicateModelCardError: if the update would make the model card identical to another one.
         """
         base_mc_id = self.db.check_update_mc(model_card)
         if base_mc_id:
-            self.db.update_base_mc(base_mc_id, model_card)
+            duplicate_mc_id = self.db.update_base_mc(base_mc_id, model_card)
+            if duplicate_mc_id:
+                raise DuplicateModelCardError(duplicate_mc_id)
             self.db.update_ai_model(base_mc_id, model_card['ai_model'])
 
             bias_analysis = model_card["bias_analysis"]
@@ -94,6 +268,10 @@ class MCIngester:
                 requirements_id = base_mc_id + "-requirements"
                 self.db.update_model_requirements_metadata(requirements_id, model_requirements)
 
+            if self.similarity_enabled:
+                self._update_embedding(base_mc_id, model_card)
+            self._notify(base_mc_id, model_card)
+
         return base_mc_id
 
     def add_datasheet(self, datasheet):
@@ -126,6 +304,7 @@ class MCIngester:
         self.db.insert_user(user)
     def add_deployment(self, deployment):
         self.db.insert_deployment(deployment)
+        self._notify(deployment['model_id'].removesuffix("-model"))
 
     def version_perf_test(self, model_card):
         return self.db.versioning_perf_test(model_card)
@@ -0,0 +1,103 @@
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+
+from ingester.database import GraphDB, VERSIONING_THRESHOLD
+from ingester.family_clustering import cluster_families
+from ingester.similarity_engine import SimilarityEngine
+
+load_dotenv()
+
+# confidence changes smaller than this are not written back
+CONFIDENCE_TOLERANCE = 1e-6
+
+
+def diff_revisions(inferred, existing):
+    """
+    Compare inferred revision pairs with the REVISION_OF edges in the graph.
+    :param inferred: dictionary of (model card id, model card id) to score, each pair ordered by id
+    :param existing: iterable of existing edges ({'mc_id', 'model_id', 'score'}) with mc_id < model_id
+    :return: tuple of (edges to merge, edges to delete), lists of {'mc_id', 'model_id', 'score'}
+    """
+    to_merge, to_delete, kept = [], [], set()
+    for edge in existing:
+        pair = (edge['mc_id'], edge['model_id'])
+        if pair not in inferred:
+            to_delete.append(edge)
+            continue
+        kept.add(pair)
+        if edge['score'] is None or abs(edge['score'] - inferred[pair]) > CONFIDENCE_TOLERANCE:
+            to_merge.append({'mc_id': pair[0], 'model_id': pair[1], 'score': inferred[pair]})
+    to_merge.extend({'mc_id': pair[0], 'model_id': pair[1], 'score': score}
+                    for pair, score in inferred.items() if pair not in kept)
+    return to_merge, to_delete
+
+
+def reversion(db, threshold=VERSIONING_THRESHOLD, chunk_size=1000, dry_run=False, block_size=4096):
+    """
+    Recompute the REVISION_OF edges of all model cards from their embeddings.
+
+    All embeddings are loaded into a SimilarityEngine and compared pairwise in blocks. Only the difference with
+    the existing edges is written: new pairs are merged, pairs below the threshold are deleted and changed
+    confidences are updated, in transactions of chunk_size pairs. Families are then recomputed from the new
+    edges.
+    :param db: GraphDB to re-version
+    :param threshold: minimum score, (1 + cosine) / 2, for two model cards to be revisions of each other
+    :param chunk_size: number of pairs written per transaction
+    :param dry_run: only compute the difference, without writing it
+    :param block_size: rows and columns of the similarity blocks
+    :return: dictionary with the number of inferred, merged and deleted pairs, and of model cards whose family
+    changed
+    """
+    start_time = time.time()
+    engine = SimilarityEngine(db)
+    engine.sync()
+    inferred = engine.all_pairs(threshold, block_size)
+    logging.info(f"Found {len(inferred)} revision pairs among {len(engine)} model cards "
+                 f"in {time.time() - start_time:.1f}s.")
+
+    to_merge, to_delete = diff_revisions(inferred, db.get_revision_pairs())
+    families_updated = 0
+    if not dry_run:
+        for start in range(0, len(to_delete), chunk_size):
+            db.delete_revisions(to_delete[start:start + chunk_size])
+        for start in range(0, len(to_merge), chunk_size):
+            db.merge_revisions(to_merge[start:start + chunk_size])
+        if to_merge or to_delete:
+            families_updated = cluster_families(db, chunk_size)['updated']
+
+    return {'model_cards': len(engine), 'inferred': len(inferred), 'merged': len(to_merge),
+            'deleted': len(to_delete), 'families_updated': families_updated, 'dry_run': dry_run,
+            'seconds': round(time.time() - start_time, 1)}
+
+
+def main():
+    """
+    Re-version every model card after a change of the versioning threshold or the embedding model.
+    Run with `python -m ingester.reversioning`; set REVERSIONING_DRY_RUN=True to only report the changes.
+    """
+    logging.basicConfig(level=logging.INFO)
+    NEO4J_URI = os.getenv("NEO4J_URI")
+    NEO4J_USERNAME = os.getenv("NEO4J_USER")
+    NEO4J_PWD = os.getenv("NEO4J_PWD")
+    threshold = float(os.getenv("REVERSIONING_THRESHOLD", str(VERSIONING_THRESHOLD)))
+    chunk_size = int(os.getenv("REVERSIONING_CHUNK_SIZE", "1000"))
+    dry_run = os.getenv("REVERSIONING_DRY_RUN", "False").lower() == "true"
+
+    db = GraphDB(NEO4J_URI, NEO4J_USERNAME, NEO4J_PWD)
+    try:
+        summary = reversion(db, threshold, chunk_size, dry_run)
+    finally:
+        db.close()
+
+    action = "Would merge" if dry_run else "Merged"
+    logging.info(f"{action} {summary['merged']} and {'would delete' if dry_run else 'deleted'} {summary['deleted']} "
+                 f"revision pairs ({summary['inferred']} in total) in {summary['seconds']}s.")
+    if not dry_run:
+        logging.info(f"Updated the family of {summary['families_updated']} model cards.")
+
+
+if __name__ == "__main__":
+    main()
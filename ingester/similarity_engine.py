@@ -0,0 +1,270 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ENABLE_MC_SIMILARITY = os.getenv("ENABLE_MC_SIMILARITY", "False").lower() == "true"
+# serve versioning and RAG similarity queries from memory instead of the vector index
+ENABLE_SIMILARITY_ENGINE = os.getenv("ENABLE_SIMILARITY_ENGINE", "False").lower() == "true"
+SIMILARITY_ENGINE_DTYPE = os.getenv("SIMILARITY_ENGINE_DTYPE", "float32")
+# "exact" scans every embedding, "lsh" only scores the candidates of an LSHIndex
+SIMILARITY_ENGINE_INDEX = os.getenv("SIMILARITY_ENGINE_INDEX", "exact").lower()
+SIMILARITY_SYNC_INTERVAL = float(os.getenv("SIMILARITY_SYNC_INTERVAL", "60"))
+
+# embeddings written this long (ms) before the last sync are fetched again, so writes from transactions that
+# committed after the sync read are not missed
+SYNC_MARGIN_MS = 60000
+
+
+class SimilarityEngine:
+    """
+    In-process cosine similarity search over model card embeddings.
+
+    Embeddings are L2 normalized and kept in one contiguous NumPy matrix (float32, or float16 to halve the
+    memory), so a query is a few blocked matrix-vector products instead of a database round trip. Scores use the
+    scale of the Neo4j `modelEmbeddings` index, (1 + cosine) / 2, so the same thresholds apply to both.
+
+    The engine is kept in sync with the graph in two ways: the ingester upserts the embeddings it writes when
+    model cards are added or updated, and `sync` reloads embeddings written since the previous sync (by other
+    processes or the embedding backfill) and drops model cards that no longer have an embedding. Writes made in
+    this process are therefore visible at once, while searches only see writes made by other processes after the
+    next sync, up to the sync interval later. Versioning cannot miss them: it calls `catch_up` first, which loads
+    the embeddings written since the last sync.
+    """
+
+    def __init__(self, db, dtype=np.float32, block_size=65536):
+        """
+        :param db: GraphDB the embeddings are loaded from
+        :param dtype: NumPy dtype of the embedding matrix, float32 or float16
+        :param block_size: number of embeddings scored per matrix multiply
+        """
+        self.db = db
+        self.dtype = np.dtype(dtype)
+        self.block_size = block_size
+        self.ids = []
+        self.rows = {}
+        self.matrix = None
+        self.watermark = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def loaded(self):
+        return self.watermark is not None
+
+    def _normalize(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def upsert(self, embeddings):
+        """
+        Add or replace embeddings.
+        :param embeddings: dictionary of model card id to embedding
+        """
+        if not embeddings:
+            return
+        ids = list(embeddings)
+        vectors = self._normalize([embeddings[mc_id] for mc_id in ids]).astype(self.dtype)
+        with self._lock:
+            if self.matrix is None:
+                self.matrix = np.empty((max(len(ids), 1024), vectors.shape[1]), dtype=self.dtype)
+            rows = []
+            for mc_id in ids:
+                row = self.rows.get(mc_id)
+                if row is None:
+                    row = self.rows[mc_id] = len(self.ids)
+                    self.ids.append(mc_id)
+                rows.append(row)
+            if len(self.ids) > len(self.matrix):
+                grown = np.empty((max(2 * len(self.matrix), len(self.ids)), self.matrix.shape[1]), dtype=self.dtype)
+                grown[:len(self.matrix)] = self.matrix
+                self.matrix = grown
+            self.matrix[rows] = vectors
+
+    def remove(self, mc_ids):
+        """
+        Remove embeddings. The last row is moved into each freed row so the matrix stays contiguous.
+        :param mc_ids: ids of the model cards to remove
+        """
+        with self._lock:
+            for mc_id in mc_ids:
+                row = self.rows.pop(mc_id, None)
+                if row is None:
+                    continue
+                last = len(self.ids) - 1
+                if row != last:
+                    self.matrix[row] = self.matrix[last]
+                    self.ids[row] = self.ids[last]
+                    self.rows[self.ids[row]] = row
+                self.ids.pop()
+
+    def get(self, mc_id):
+        """
+        Get the normalized embedding of a model card, or None if it is not loaded.
+        """
+        with self._lock:
+            row = self.rows.get(mc_id)
+            return None if row is None else self.matrix[row].astype(np.float32)
+
+    def search(self, vector, k=10, threshold=0.0, exclude=None):
+        """
+        Find the most similar model cards.
+        :param vector: query embedding
+        :param k: maximum number of results
+        :param threshold: minimum score, on the (1 + cosine) / 2 scale
+        :param exclude: model card id to leave out of the results, e.g. the query card itself
+        :return: list of (model card id, score), most similar first
+        """
+        return self.search_many([vector], k, threshold, [exclude])[0]
+
+    def search_many(self, vectors, k=10, threshold=0.0, exclude=None):
+        """
+        Find the most similar model cards for several query embeddings, scoring the matrix block by block.
+        :param vectors: query embeddings
+        :param k: maximum number of results per query
+        :param threshold: minimum score, on the (1 + cosine) / 2 scale
+        :param exclude: model card id to leave out per query, or None
+        :return: list with a list of (model card id, score) per query, most similar first
+        """
+        queries = self._normalize(vectors)
+        exclude = exclude or [None] * len(queries)
+        with self._lock:
+            count = len(self.ids)
+            candidates = [[] for _ in queries]
+            for start in range(0, count, self.block_size):
+                block = self.matrix[start:min(start + self.block_size, count)]
+                scores = (1.0 + queries @ block.astype(np.float32, copy=False).T) / 2.0
+                for q, row_scores in enumerate(scores):
+                    top = np.flatnonzero(row_scores > threshold)
+                    if len(top) > k + 1:
+                        top = top[np.argpartition(row_scores[top], -(k + 1))[-(k + 1):]]
+                    candidates[q].extend((self.ids[start + i], float(row_scores[i])) for i in top)
+        results = []
+        for q, matches in enumerate(candidates):
+            matches = [match for match in matches if match[0] != exclude[q]]
+            matches.sort(key=lambda match: match[1], reverse=True)
+            results.append(matches[:k])
+        return results
+
+    def all_pairs(self, threshold, block_size=4096, max_workers=None):
+        """
+        Find every pair of model cards scoring above the threshold. The similarity matrix is computed in
+        block_size x block_size tiles of its upper triangle, so memory stays bounded, and row blocks are scored
+        concurrently.
+        :param threshold: minimum score, on the (1 + cosine) / 2 scale
+        :param block_size: rows and columns per tile
+        :param max_workers: number of row blocks scored concurrently, defaults to the number of CPUs
+        :return: dictionary of (model card id, model card id) to score, each pair ordered by id
+        """
+        cosine_threshold = 2.0 * threshold - 1.0
+        with self._lock:
+            count = len(self.ids)
+            matrix = self.matrix[:count].astype(np.float32, copy=False)
+            ids = list(self.ids)
+
+        def score_rows(start):
+            pairs = {}
+            rows = matrix[start:start + block_size]
+            for column_start in range(start, count, block_size):
+                scores = rows @ matrix[column_start:column_start + block_size].T
+                above = scores > cosine_threshold
+                if column_start == start:
+                    # a mask rather than zeroed scores, which would pass thresholds below 0.5 (cosine below 0)
+                    above &= np.triu(np.ones_like(above), k=1)
+                for i, j in zip(*np.nonzero(above)):
+                    a, b = ids[start + i], ids[column_start + j]
+                    pairs[(a, b) if a < b else (b, a)] = float((1.0 + scores[i, j]) / 2.0)
+            return pairs
+
+        pairs = {}
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            for block_pairs in executor.map(score_rows, range(0, count, block_size)):
+                pairs.update(block_pairs)
+        return pairs
+
+    def _load_since_watermark(self):
+        since = None if self.watermark is None else self.watermark - SYNC_MARGIN_MS
+        watermark = self.watermark or 0
+        loaded = 0
+        for page in self.db.get_embeddings(since):
+            self.upsert({row['id']: row['embedding'] for row in page})
+            watermark = max([watermark] + [row['updated_at'] or 0 for row in page])
+            loaded += len(page)
+        return watermark, loaded
+
+    def catch_up(self):
+        """
+        Load the embeddings written since the last sync, e.g. by other processes, without the scan for removed
+        model cards. Called before versioning, so a new model card is compared with every embedded model card.
+        :return: number of embeddings loaded
+        """
+        if self.watermark is None:
+            raise RuntimeError("The similarity engine is not loaded yet")
+        watermark, loaded = self._load_since_watermark()
+        with self._lock:
+            self.watermark = max(self.watermark, watermark)
+        return loaded
+
+    def sync(self):
+        """
+        Bring the engine up to date with the graph. The first sync loads every embedding; later syncs load the
+        embeddings written since the previous one and drop model cards that no longer have an embedding.
+        """
+        watermark, loaded = self._load_since_watermark()
+
+        if self.watermark is not None:
+            # only cards loaded before the scan can be stale, cards upserted meanwhile were written after it
+            with self._lock:
+                known = list(self.ids)
+            embedded_ids = set(self.db.get_embedded_mc_ids())
+            stale = [mc_id for mc_id in known if mc_id not in embedded_ids]
+            self.remove(stale)
+            if stale:
+                logging.info(f"Removed {len(stale)} model cards from the similarity engine.")
+        with self._lock:
+            self.watermark = max(self.watermark or 0, watermark)
+        logging.info(f"Loaded {loaded} embeddings into the similarity engine ({len(self)} in total).")
+
+    def start_sync(self, interval):
+        """
+        Load the embeddings and keep syncing them in a background thread.
+        :param interval: seconds between syncs
+        """
+        def run():
+            while not stop.is_set():
+                try:
+                    self.sync()
+                except Exception as e:
+                    logging.error(f"Similarity engine sync failed: {str(e)}")
+                stop.wait(interval)
+
+        stop = threading.Event()
+        threading.Thread(target=run, name="similarity-sync", daemon=True).start()
+        return stop
+
+
+def start_similarity_engine(uri, user, password):
+    """
+    Create the similarity engine and start syncing it with the graph, if it is enabled.
+    :param uri: Neo4j database URI
+    :param user: database username
+    :param password: database password
+    :return: the similarity engine, or None if it is disabled
+    """
+    if not (ENABLE_MC_SIMILARITY and ENABLE_SIMILARITY_ENGINE):
+        return None
+    from ingester.database import GraphDB
+    db = GraphDB(uri, user, password)
+    if SIMILARITY_ENGINE_INDEX == "lsh":
+        from ingester.lsh_index import LSHIndex, LSH_INDEX_PATH
+        engine = LSHIndex(db, path=LSH_INDEX_PATH, dtype=SIMILARITY_ENGINE_DTYPE)
+    else:
+        engine = SimilarityEngine(db, dtype=SIMILARITY_ENGINE_DTYPE)
+    engine.start_sync(SIMILARITY_SYNC_INTERVAL)
+    return engine
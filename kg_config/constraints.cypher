@@ -26,3 +26,12 @@ OPTIONS {indexConfig: {`vector.dimensions`: 300, `vector.similarity_function`: '
 
 CREATE FULLTEXT INDEX mcFullIndex FOR (n:ModelCard) ON EACH
 [n.name, n.short_description, n.full_description, n.keywords, n.author];
+
+CREATE CONSTRAINT modelcard_content_hash IF NOT EXISTS
+FOR (mc:ModelCard) REQUIRE mc.content_hash IS UNIQUE;
+
+CREATE INDEX modelcard_family_id IF NOT EXISTS
+FOR (mc:ModelCard) ON (mc.family_id);
+
+CREATE INDEX modelcard_embedding_updated_at IF NOT EXISTS
+FOR (mc:ModelCard) ON (mc.embedding_updated_at);
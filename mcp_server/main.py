@@ -3,11 +3,12 @@ import os
 import json
 import logging
 import hashlib
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from urllib.parse import urlparse
 
-from ingester.neo4j_ingester import MCIngester
-from reconstructor.mc_reconstructor import MCReconstructor
+from ingester.neo4j_ingester import DuplicateModelCardError, MCIngester
+from ingester.similarity_engine import start_similarity_engine
+from reconstructor.mc_reconstructor import FACET_INDEX_REFRESH_INTERVAL, MCReconstructor
 
 # Environment variables
 NEO4J_URI = os.getenv("NEO4J_URI")
@@ -16,8 +17,10 @@ NEO4J_PWD = os.getenv("NEO4J_PWD")
 ENABLE_MC_SIMILARITY = os.getenv("ENABLE_MC_SIMILARITY", "False").lower() == "true"
 
 # Initialize ingester and reconstructor
-mc_ingester = MCIngester(NEO4J_URI, NEO4J_USERNAME, NEO4J_PWD, ENABLE_MC_SIMILARITY)
-mc_reconstructor = MCReconstructor(NEO4J_URI, NEO4J_USERNAME, NEO4J_PWD)
+similarity_engine = start_similarity_engine(NEO4J_URI, NEO4J_USERNAME, NEO4J_PWD)
+mc_ingester = MCIngester(NEO4J_URI, NEO4J_USERNAME, NEO4J_PWD, ENABLE_MC_SIMILARITY, similarity_engine)
+mc_reconstructor = MCReconstructor(NEO4J_URI, NEO4J_USERNAME, NEO4J_PWD, similarity_engine)
+mc_ingester.add_listener(mc_reconstructor.on_model_card_write)
 
 logging.basicConfig(level=logging.INFO)
 
@@ -109,10 +112,9 @@ async def get_modelcard_linkset_resource(mc_id: str) -> str:
     Returns:
         The linkset information as JSON string
     """
-    model_card = mc_reconstructor.reconstruct(str(mc_id))
-    if not model_card:
+    link_headers = mc_reconstructor.get_model_card_link_headers(str(mc_id))
+    if not link_headers:
         return json.dumps({"error": f"Model card with ID '{mc_id}' could not be found!"})
-    link_headers = mc_reconstructor.get_link_headers(model_card)
     return json.dumps(link_headers)
 
 
@@ -137,6 +139,26 @@ async def upload_modelcard(model_card: Dict[str, Any]) -> Dict[str, Any]:
     return {"message": "Successfully uploaded the model card", "model_card_id": base_mc_id}
 
 
+@mcp.tool()
+async def upload_modelcards(model_cards: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Upload a batch of model cards to the Patra Knowledge Graph.
+    
+    Args:
+        model_cards: List of model card dictionaries
+        
+    Returns:
+        Dictionary with the status (created, exists or failed) of each model card and per-status counts
+    """
+    if not model_cards:
+        return {"error": "At least one model card is required"}
+    
+    results = mc_ingester.add_mcs(model_cards)
+    summary = {status: sum(1 for r in results if r["status"] == status)
+               for status in ("created", "exists", "failed")}
+    return {"results": results, **summary}
+
+
 @mcp.tool()
 async def update_modelcard(mc_id: str, model_card: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -151,7 +173,10 @@ async def update_modelcard(mc_id: str, model_card: Dict[str, Any]) -> Dict[str,
     """
     # Ensure the model_card has the correct ID
     model_card['id'] = mc_id
-    base_mc_id = mc_ingester.update_mc(model_card)
+    try:
+        base_mc_id = mc_ingester.update_mc(model_card)
+    except DuplicateModelCardError as e:
+        return {"error": str(e), "model_card_id": e.model_card_id}
     if base_mc_id:
         return {"message": "Successfully updated the model card", "model_card_id": base_mc_id}
     return {"message": "Model card not found", "model_card_id": base_mc_id}
@@ -379,7 +404,9 @@ async def create_edge(source_node_id: str, target_node_id: str) -> Dict[str, Any
             MATCH (a), (b)
             WHERE elementId(a) = $source_id AND elementId(b) = $target_id
             CREATE (a)-[r:{relationship_type}]->(b)
-            RETURN r, type(r) as rel_type
+            RETURN r, type(r) as rel_type,
+                   CASE WHEN a:ModelCard THEN a.external_id END as source_mc_id,
+                   CASE WHEN b:ModelCard THEN b.external_id END as target_mc_id
             """
             create_result = await session.run(create_query, source_id=source_node_id, target_id=target_node_id)
             created = await create_result.single()
@@ -387,6 +414,9 @@ async def create_edge(source_node_id: str, target_node_id: str) -> Dict[str, Any
             await driver.close()
             
             if created:
+                # the new edge changes the reconstructed model card, so drop it from the caches
+                for mc_id in {created["source_mc_id"], created["target_mc_id"]} - {None}:
+                    mc_reconstructor.on_model_card_write(mc_id)
                 return {
                     "success": True,
                     "message": "Edge created successfully",
@@ -404,35 +434,146 @@ async def create_edge(source_node_id: str, target_node_id: str) -> Dict[str, Any
 
 
 @mcp.tool()
-async def search_modelcards(query: str) -> Dict[str, Any]:
+async def search_modelcards(query: str, mode: str = "fulltext", limit: int = 10, offset: int = 0,
+                            boosts: Optional[Dict[str, float]] = None, match: Optional[str] = None,
+                            fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """
     Full text search for model cards.
     
     Args:
-        query: Search query string
+        query: Search query string, in Lucene syntax unless boosts or match are given
+        mode: "fulltext", or "hybrid" to fuse full-text and semantic search by reciprocal rank fusion; the query
+            is then searched as plain terms, and boosts, match and fields are not supported
+        limit: Maximum number of results (at most 100)
+        offset: Number of results to skip
+        boosts: Full-text boost per indexed field, e.g. {"name": 3}
+        match: Full-text matching of the query terms, "fuzzy" or "prefix"
+        fields: Model card properties returned with each full-text result
         
     Returns:
         Dictionary with search results or error
     """
-    if not query:
+    if not query or not query.strip():
         return {"error": "Query (q) is required"}
+    if not 0 < limit <= 100 or offset < 0:
+        return {"error": "limit must be between 1 and 100 and offset not negative"}
     
-    results = mc_reconstructor.search_kg(query)
+    if mode == "hybrid":
+        unsupported = [name for name, value in (("boosts", boosts), ("match", match), ("fields", fields)) if value]
+        if unsupported:
+            return {"error": f"{', '.join(unsupported)} not supported in hybrid mode"}
+        return {"results": mc_reconstructor.hybrid_search(query, limit, offset)}
+    
+    try:
+        results = mc_reconstructor.search_kg(query, limit=limit, offset=offset, boosts=boosts, match=match,
+                                             fields=fields)
+    except ValueError as e:
+        return {"error": str(e)}
     return {"results": results}
 
 
 @mcp.tool()
-async def list_modelcards() -> Dict[str, Any]:
+async def semantic_search_modelcards(query: str, limit: int = 10, threshold: float = 0.80) -> Dict[str, Any]:
+    """
+    Semantic search for model cards, matching the meaning of a natural-language query.
+    
+    Args:
+        query: Natural-language search query
+        limit: Maximum number of results (at most 100)
+        threshold: Minimum similarity score
+        
+    Returns:
+        Dictionary with search results or error
+    """
+    if not ENABLE_MC_SIMILARITY:
+        return {"error": "Semantic search requires ENABLE_MC_SIMILARITY"}
+    if not query or not query.strip():
+        return {"error": "Query (q) is required"}
+    if not 0 < limit <= 100:
+        return {"error": "limit must be between 1 and 100"}
+    
+    results = mc_reconstructor.semantic_search(query, limit, threshold)
+    return {"results": results}
+
+
+@mcp.tool()
+async def get_modelcards(mc_ids: List[str]) -> Dict[str, Any]:
+    """
+    Retrieve several model cards at once.
+    
+    Args:
+        mc_ids: List of model card IDs to retrieve
+        
+    Returns:
+        Dictionary with the model cards keyed by ID and the IDs that could not be found
+    """
+    if not mc_ids:
+        return {"error": "At least one model card ID is required"}
+    
+    model_cards, missing = mc_reconstructor.reconstruct_many(mc_ids)
+    return {"model_cards": model_cards, "missing": missing}
+
+
+@mcp.tool()
+async def get_modelcard_family(mc_id: str) -> Dict[str, Any]:
     """
-    Lists all the models in Patra KG.
+    Get all versions of a model: the model cards in the same family as the given model card.
     
+    Args:
+        mc_id: ID of any model card in the family
+        
     Returns:
-        Dictionary with all model cards
+        Dictionary with the family ID and its model cards, or an error
     """
-    model_card_dict = mc_reconstructor.get_all_mcs()
-    return model_card_dict
+    family = mc_reconstructor.get_family(mc_id)
+    if family is None:
+        return {"error": f"Model card with ID '{mc_id}' could not be found!"}
+    return family
+
+
+@mcp.tool()
+async def get_modelcard_facets(query: Optional[str] = None, size: int = 20) -> Dict[str, Any]:
+    """
+    Count the model cards per category, input type, framework, license and author, to browse the catalogue.
+    
+    Args:
+        query: Optional full-text query the counted model cards must match
+        size: Maximum number of values per facet (at most 1000)
+        
+    Returns:
+        Dictionary with the number of counted model cards and the most frequent values of each facet, or an error
+    """
+    if not 0 < size <= 1000:
+        return {"error": "size must be between 1 and 1000"}
+    return mc_reconstructor.facets((query or '').strip() or None, size)
+
+
+@mcp.tool()
+async def list_modelcards(limit: Optional[int] = None, cursor: Optional[str] = None) -> Any:
+    """
+    Lists the models in Patra KG. Without limit and cursor the first 1000 model cards are returned as a list, as
+    before pagination; with either, one page is returned together with the cursor of the next page.
+    
+    Args:
+        limit: Maximum number of model cards to return (at most 1000, default 100 when paging)
+        cursor: Cursor of the page to fetch, taken from next_cursor of the previous page
+    
+    Returns:
+        List of model cards, or a dictionary with the model cards and the cursor of the next page (None on the
+        last page)
+    """
+    if limit is None and cursor is None:
+        return mc_reconstructor.get_all_mcs()
+    limit = 100 if limit is None else limit
+    if not 0 < limit <= 1000:
+        return {"error": "limit must be between 1 and 1000"}
+    
+    model_cards, next_cursor = mc_reconstructor.get_mcs_page(limit, cursor)
+    return {"model_cards": model_cards, "next_cursor": next_cursor}
 
 
 if __name__ == "__main__":
+    # load the facet counters before the first tool call needs them, and keep them up to date with other writers
+    mc_reconstructor.facet_index.start_refresh(FACET_INDEX_REFRESH_INTERVAL)
     mcp.run(transport="sse")
 
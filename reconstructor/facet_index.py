@@ -0,0 +1,173 @@
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# model card and AI model properties counted for catalogue browsing
+FACET_FIELDS = ("categories", "input_type", "framework", "license", "author")
+
+
+def facet_values(model_card: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get the facet values of a model card.
+
+    Args:
+        model_card: Model card as uploaded, or the projection of its facet values
+
+    Returns:
+        Dictionary of facet to value, without the facets the model card has no value for
+    """
+    ai_model = model_card.get("ai_model") or {}
+    values = {
+        "categories": model_card.get("categories", model_card.get("category")),
+        "input_type": model_card.get("input_type"),
+        "framework": model_card.get("framework", ai_model.get("framework")),
+        "license": model_card.get("license", ai_model.get("license")),
+        "author": model_card.get("author"),
+    }
+    return {facet: value for facet, value in values.items() if value not in (None, "")}
+
+
+class FacetIndex:
+    """
+    In-memory counts of model cards per facet value.
+
+    The counters are loaded with one projection query on first use and adjusted by the facet values of each
+    model card written by this process, so reading them does not touch the graph. The facet values of every model
+    card are kept as well, to count the facets of a subset such as the results of a search. Model cards written
+    by other processes are counted when the index is rebuilt, periodically with `start_refresh`.
+    """
+
+    def __init__(self, loader: Callable[[Optional[List[str]]], Iterable[Dict[str, Any]]]) -> None:
+        """
+        Initialize the index.
+
+        Args:
+            loader: Function returning the id and facet values of the given model cards, or of every model card
+                when called with None
+        """
+        self.loader = loader
+        self.built = False
+        self._counts: Dict[str, Counter] = {facet: Counter() for facet in FACET_FIELDS}
+        self._values: Dict[str, Dict[str, Any]] = {}
+        # model cards written while a rebuild is loading, applied to the rebuilt counters
+        self._pending: Optional[Dict[str, Optional[Dict[str, Any]]]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def build(self) -> None:
+        """
+        Load the facet values of every model card, replacing the current counts. The current counts keep being
+        read and updated while the facet values load, and the updates are applied to the new counts.
+        """
+        with self._lock:
+            self._pending = {}
+        try:
+            counts = {facet: Counter() for facet in FACET_FIELDS}
+            values = {}
+            for row in self.loader(None):
+                values[row["id"]] = facet_values(row)
+                for facet, value in values[row["id"]].items():
+                    counts[facet][value] += 1
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._counts, self._values = counts, values
+            self.built = True
+            for mc_id, model_card in pending.items():
+                self._apply(mc_id, model_card)
+
+    def _ensure_built(self) -> None:
+        if not self.built:
+            with self._lock:
+                if not self.built:
+                    self.build()
+
+    def update(self, mc_id: str, model_card: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Replace the facet values of a model card. An index that is not built yet is left to load it on first use.
+
+        Args:
+            mc_id: The external ID of the model card
+            model_card: The model card data, or None to load it; a model card that no longer exists is removed
+        """
+        with self._lock:
+            # a first build holds the lock, so the write waits for it; a rebuild loads without the lock and
+            # replays the writes made meanwhile, which it may have read before they happened
+            if self._pending is not None:
+                self._pending[mc_id] = model_card
+            if self.built:
+                self._apply(mc_id, model_card)
+
+    def _apply(self, mc_id: str, model_card: Optional[Dict[str, Any]]) -> None:
+        if model_card is None:
+            model_card = next(iter(self.loader([mc_id])), None)
+        for facet, value in self._values.pop(mc_id, {}).items():
+            self._counts[facet][value] -= 1
+            if not self._counts[facet][value]:
+                del self._counts[facet][value]
+        if model_card is not None:
+            self._values[mc_id] = facet_values(model_card)
+            for facet, value in self._values[mc_id].items():
+                self._counts[facet][value] += 1
+
+    def start_refresh(self, interval: float) -> threading.Event:
+        """
+        Build the index in a background thread and rebuild it every interval, to count the model cards written
+        by other processes.
+
+        Args:
+            interval: Seconds between rebuilds
+
+        Returns:
+            Event that stops the refresh when set
+        """
+        def run() -> None:
+            while not stop.is_set():
+                try:
+                    if self.built:
+                        self.build()
+                    else:
+                        self._ensure_built()
+                except Exception as e:
+                    logging.error(f"Facet index refresh failed: {str(e)}")
+                stop.wait(interval)
+
+        stop = threading.Event()
+        threading.Thread(target=run, name="facet-index-refresh", daemon=True).start()
+        return stop
+
+    def facets(self, mc_ids: Optional[Iterable[str]] = None, size: int = 20) -> Dict[str, Any]:
+        """
+        Count the model cards per facet value.
+
+        Args:
+            mc_ids: Only count these model cards, or None to read the counters of the whole catalogue
+            size: Maximum number of values returned per facet, the most frequent first
+
+        Returns:
+            Dictionary with the number of counted model cards and, per facet, a list of values and counts
+        """
+        self._ensure_built()
+        with self._lock:
+            if mc_ids is None:
+                total, counts = len(self._values), self._counts
+            else:
+                total, counts = 0, {facet: Counter() for facet in FACET_FIELDS}
+                for mc_id in mc_ids:
+                    values = self._values.get(mc_id)
+                    if values is None:
+                        continue
+                    total += 1
+                    for facet, value in values.items():
+                        counts[facet][value] += 1
+            return {
+                "total": total,
+                "facets": {facet: [{"value": value, "count": count} for value, count in
+                                   counts[facet].most_common(size)] for facet in FACET_FIELDS},
+            }
@@ -1,6 +1,39 @@
-from ingester.database import GraphDB
-from typing import Dict, Optional, Any, List
+from concurrent.futures import ThreadPoolExecutor
+
+from ingester import graph_embedder
+from ingester.database import (GraphDB, FULL_TEXT_FIELDS, FULL_TEXT_MATCH_MODES, SEARCH_RESULT_FIELDS,
+                               DEFAULT_SEARCH_RESULT_FIELDS, lucene_query)
+from reconstructor.cache import LRUCache
+from reconstructor.facet_index import FacetIndex
+from reconstructor.suggest_index import SuggestIndex
+from typing import Dict, Optional, Any, Iterator, List, Tuple
+import hashlib
+import json
 import logging
+import os
+import threading
+import time
+
+MC_CACHE_SIZE = int(os.getenv("MC_CACHE_SIZE", "1024"))
+MC_CACHE_TTL = float(os.getenv("MC_CACHE_TTL", "300"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+# results fetched from each retrieval in hybrid search, and the k constant of reciprocal rank fusion
+HYBRID_SEARCH_DEPTH = int(os.getenv("HYBRID_SEARCH_DEPTH", "50"))
+RRF_K = 60
+# seconds between rebuilds of the suggestion index, which pick up the model cards written by other processes
+SUGGEST_INDEX_REFRESH_INTERVAL = float(os.getenv("SUGGEST_INDEX_REFRESH_INTERVAL", "300"))
+# seconds between rebuilds of the facet counters, which pick up the model cards written by other processes
+FACET_INDEX_REFRESH_INTERVAL = float(os.getenv("FACET_INDEX_REFRESH_INTERVAL", "300"))
+
+# model card node properties used by the ingester and search, left out of reconstructed model cards
+INTERNAL_MC_FIELDS = ("embedding", "embedding_model", "embedding_updated_at", "embedding_hash", "content_hash",
+                      "family_id")
+
+
+def _normalize_query(query: str) -> str:
+    """Collapse runs of whitespace, so that equivalent queries share a cache entry."""
+    return " ".join(query.split())
 
 
 class MCReconstructor:
@@ -9,10 +42,10 @@ class MCReconstructor:
     
     This class provides functionality to retrieve and reconstruct complete model cards
     from a Neo4j knowledge graph, including associated AI models, bias analysis,
-    and explainability analysis.
+    explainability analysis, requirements and datasheets.
     """
 
-    def __init__(self, uri: str, user: str, password: str) -> None:
+    def __init__(self, uri: str, user: str, password: str, similarity_engine: Optional[Any] = None) -> None:
         """
         Initialize the MCReconstructor with Neo4j connection parameters.
         
@@ -20,6 +53,7 @@ class MCReconstructor:
             uri: Neo4j database URI
             user: Database username
             password: Database password
+            similarity_engine: Optional in-process SimilarityEngine used for RAG search
         """
         try:
             self.db = GraphDB(uri, user, password)
@@ -28,115 +62,220 @@ class MCReconstructor:
             logging.error(f"Error connecting to the Neo4j database: {str(e)}")
             raise
 
+        # reconstructed model cards and their ETags, keyed by model card ID
+        self.model_card_cache = LRUCache(max_size=MC_CACHE_SIZE, ttl=MC_CACHE_TTL)
+        # linkset headers, keyed by model card ID
+        self.link_header_cache = LRUCache(max_size=MC_CACHE_SIZE, ttl=MC_CACHE_TTL)
+        # query text to query embedding
+        self.query_embedding_cache = LRUCache(max_size=SEARCH_CACHE_SIZE)
+        # search results, keyed by the search parameters and the catalogue generation
+        self.search_cache = LRUCache(max_size=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+        # bumped on every write of this process, so cached search results are never older than its last write;
+        # writes of other processes and batch jobs are only reflected once the results expire after SEARCH_CACHE_TTL
+        self.catalogue_generation = 0
+        self._search_latency = {"hit": [0, 0.0], "miss": [0, 0.0]}
+        self._search_lock = threading.Lock()
+        # typeahead suggestions over names, authors and keywords, loaded on first use
+        self.suggest_index = SuggestIndex(lambda mc_ids: self.db.get_suggest_terms(mc_ids))
+        # model card counts per facet value, loaded on first use
+        self.facet_index = FacetIndex(lambda mc_ids: self.db.get_facet_values(mc_ids))
+        self.similarity_engine = similarity_engine
+        # runs the full-text and vector retrievals of hybrid search concurrently
+        self.search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search")
+
     def reconstruct(self, model_card_id: str) -> Optional[Dict[str, Any]]:
         """
         Reconstruct a complete model card from the knowledge graph.
         
+        The model card and its AI model, bias analysis, explainability analysis, requirements and
+        datasheet are fetched in a single query. Reconstructed model cards are cached until they
+        expire or are invalidated by a write.
+        
         Args:
             model_card_id: The external ID of the model card to reconstruct
             
         Returns:
             A dictionary containing the complete model card data, or None if not found
         """
-        base_mc = self._retrieve_base_model_card(model_card_id)
-        if base_mc is None:
-            return None
+        model_card, _ = self.reconstruct_with_etag(model_card_id)
+        return model_card
 
-        self._clean_model_card(base_mc)
-        self._attach_ai_model(base_mc, model_card_id)
-        self._attach_bias_analysis(base_mc, model_card_id)
-        self._attach_xai_analysis(base_mc, model_card_id)
-                
-        return base_mc
-    
-    
-    
+    def reconstruct_with_etag(self, model_card_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Reconstruct a model card along with a strong ETag of its content. A cached model card is
+        returned without touching the knowledge graph.
+        
+        Args:
+            model_card_id: The external ID of the model card to reconstruct
+            
+        Returns:
+            A tuple of the model card and its ETag, or (None, None) if not found
+        """
+        cached = self.model_card_cache.get(model_card_id)
+        if cached is not None:
+            return cached
+
+        record = self.db.get_model_card(model_card_id)
+        if record is None:
+            logging.warning(f"Model card '{model_card_id}' not found in knowledge graph")
+            return None, None
+
+        return self._cache_model_card(model_card_id, self._build_model_card(record))
 
-    def _execute_query(self, query: str, result_key: str, metadata: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    def reconstruct_many(self, model_card_ids: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
         """
-        Execute a query and return result.
+        Reconstruct several model cards from the knowledge graph with one batched query.
+        
+        Cached model cards are served from the cache and only the rest are queried.
         
         Args:
-            query: Cypher query to execute
-            result_key: Key to extract from query result
-            metadata: Query parameters
+            model_card_ids: The external IDs of the model cards to reconstruct
             
         Returns:
-            Result dictionary or None
+            A tuple of the reconstructed model cards keyed by ID and the list of IDs that were not found
         """
-        return self.get_result_dict(query, result_key, metadata)
+        unique_ids = list(dict.fromkeys(str(mc_id) for mc_id in model_card_ids))
+        if not unique_ids:
+            return {}, []
+
+        model_cards = {}
+        uncached_ids = []
+        for mc_id in unique_ids:
+            cached = self.model_card_cache.get(mc_id)
+            if cached is not None:
+                model_cards[mc_id] = cached[0]
+            else:
+                uncached_ids.append(mc_id)
+
+        if uncached_ids:
+            for record in self.db.get_model_cards(uncached_ids):
+                mc_id = record["mc_id"]
+                model_cards[mc_id], _ = self._cache_model_card(mc_id, self._build_model_card(record))
+
+        missing = [mc_id for mc_id in unique_ids if mc_id not in model_cards]
+        if missing:
+            logging.warning(f"{len(missing)} model cards not found in knowledge graph")
+        return {mc_id: model_cards[mc_id] for mc_id in unique_ids if mc_id in model_cards}, missing
 
-    def _retrieve_base_model_card(self, model_card_id: str) -> Optional[Dict[str, Any]]:
+    def _cache_model_card(self, model_card_id: str, model_card: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
         """
-        Retrieve the base model card from the knowledge graph.
+        Compute the ETag of a reconstructed model card and cache both.
         
         Args:
             model_card_id: The external ID of the model card
+            model_card: The reconstructed model card
             
         Returns:
-            Model card dictionary or None
+            A tuple of the model card and its ETag
         """
-        query = 'MATCH (mc:ModelCard {external_id: $mc_id}) RETURN mc'
-        base_mc = self._execute_query(query, "mc", {"mc_id": model_card_id})
+        canonical = json.dumps(model_card, sort_keys=True, separators=(',', ':'), default=str)
+        etag = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+        self.model_card_cache.set(model_card_id, (model_card, etag))
+        return model_card, etag
 
-        if base_mc is None:
-            logging.warning(f"Model card '{model_card_id}' not found in knowledge graph")
+    def invalidate(self, model_card_id: str) -> None:
+        """
+        Drop any cached data for a model card.
         
-        return base_mc
+        Args:
+            model_card_id: The external ID of the model card
+        """
+        self.model_card_cache.invalidate(model_card_id)
+        self.link_header_cache.invalidate(model_card_id)
 
-    def _clean_model_card(self, model_card: Dict[str, Any]) -> None:
+    def on_model_card_write(self, model_card_id: str, model_card: Optional[Dict[str, Any]] = None) -> None:
         """
-        Remove unnecessary data from the model card (e.g., embeddings).
+        Listener for MCIngester writes that keeps the caches consistent with the knowledge graph.
         
         Args:
-            model_card: The model card dictionary to clean
+            model_card_id: The external ID of the written model card
+            model_card: The written model card data, if available
         """
-        if 'embedding' in model_card:
-            del model_card["embedding"]
+        self.invalidate(model_card_id)
+        with self._search_lock:
+            self.catalogue_generation += 1
+        self.suggest_index.update(model_card_id, model_card)
+        self.facet_index.update(model_card_id, model_card)
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return the hit, miss and eviction counters of the reconstructor caches."""
+        return {
+            "model_cards": self.model_card_cache.stats(),
+            "link_headers": self.link_header_cache.stats(),
+            "query_embeddings": self.query_embedding_cache.stats(),
+            "search": self.search_stats(),
+        }
 
-    def _attach_ai_model(self, model_card: Dict[str, Any], model_card_id: str) -> None:
+    def search_stats(self) -> Dict[str, Any]:
+        """Return the search cache counters, the catalogue generation and the mean search latency."""
+        stats = self.search_cache.stats()
+        with self._search_lock:
+            stats["generation"] = self.catalogue_generation
+            for outcome, (count, total) in self._search_latency.items():
+                stats[f"mean_{outcome}_ms"] = 1000 * total / count if count else None
+        return stats
+
+    def _cached_search(self, key: Tuple, search) -> List[Dict[str, Any]]:
         """
-        Retrieve and attach AI model information to the model card.
+        Return cached search results for the key, or run the search and cache its results.
         
         Args:
-            model_card: The model card dictionary to update
-            model_card_id: The model card ID for constructing the AI model ID
+            key: The search parameters
+            search: Function running the search
+            
+        Returns:
+            The search results
         """
-        query = 'MATCH (ai:Model {model_id: $ai_model_id}) RETURN ai'
-        ai_model = self._execute_query(
-            query, "ai", {"ai_model_id": f"{model_card_id}-model"}
-        )
-        model_card["ai_model"] = ai_model
-
-    def _attach_bias_analysis(self, model_card: Dict[str, Any], model_card_id: str) -> None:
+        start = time.perf_counter()
+        key = key + (self.catalogue_generation,)
+        results = self.search_cache.get(key)
+        outcome = "hit" if results is not None else "miss"
+        if results is None:
+            results = search()
+            self.search_cache.set(key, results)
+        with self._search_lock:
+            latency = self._search_latency[outcome]
+            latency[0] += 1
+            latency[1] += time.perf_counter() - start
+        return results
+
+    def _build_model_card(self, record: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Retrieve and attach bias analysis information to the model card if available.
+        Assemble a model card dictionary from a model card record.
         
         Args:
-            model_card: The model card dictionary to update
-            model_card_id: The model card ID for constructing the bias analysis ID
+            record: Record with the model card and its satellite node properties
+            
+        Returns:
+            The model card dictionary
         """
-        query = 'MATCH (ba:BiasAnalysis {external_id: $bias_id}) RETURN ba'
-        bias_analysis = self._execute_query(
-            query, "ba", {"bias_id": f"{model_card_id}-bias"}
-        )
-        if bias_analysis is not None:
-            model_card["bias_analysis"] = bias_analysis
+        model_card = dict(record["model_card"])
+        self._clean_model_card(model_card)
+        model_card["ai_model"] = record["ai_model"]
+
+        if record["bias_analysis"] is not None:
+            model_card["bias_analysis"] = record["bias_analysis"]
+        if record["xai_analysis"] is not None:
+            model_card["xai_analysis"] = record["xai_analysis"]
+        if record["requirements"] is not None:
+            model_card["model_requirements"] = [
+                f"{key}=={value}" for key, value in record["requirements"].items()
+                if key not in ("external_id", "name")
+            ]
+        if record["datasheet"] is not None:
+            model_card["datasheet"] = record["datasheet"]
+
+        return model_card
 
-    def _attach_xai_analysis(self, model_card: Dict[str, Any], model_card_id: str) -> None:
+    def _clean_model_card(self, model_card: Dict[str, Any]) -> None:
         """
-        Retrieve and attach explainability analysis information to the model card if available.
+        Remove internal data from the model card (e.g., embeddings, the content hash and the family id).
         
         Args:
-            model_card: The model card dictionary to update
-            model_card_id: The model card ID for constructing the XAI analysis ID
+            model_card: The model card dictionary to clean
         """
-        query = 'MATCH (xai:ExplainabilityAnalysis {external_id: $xai_id}) RETURN xai'
-        xai_analysis = self._execute_query(
-            query, "xai", {"xai_id": f"{model_card_id}-xai"}
-        )
-        if xai_analysis is not None:
-            model_card["xai_analysis"] = xai_analysis
+        for field in INTERNAL_MC_FIELDS:
+            model_card.pop(field, None)
 
     def get_result_dict(self, query: str, result_type: str, metadata: Dict[str, str]) -> Optional[Dict[str, Any]]:
         """Execute a Cypher query and extract the result as a dictionary."""
@@ -150,23 +289,229 @@ class MCReconstructor:
 
         return {key: node[key] for key in node.keys()}
 
-    def search_kg(self, query: str) -> List[Dict[str, Any]]:
-        """Search the knowledge graph using full-text search."""
-        results = self.db.full_text_search(query)
+    def search_kg(self, query: str, collapse_family: bool = False, limit: int = 10, offset: int = 0,
+                  boosts: Optional[Dict[str, float]] = None, match: Optional[str] = None,
+                  fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Search the knowledge graph using full-text search.
+        
+        Args:
+            query: Search query string, in Lucene syntax unless boosts or match are given
+            collapse_family: Keep only the best scoring model card of each model family
+            limit: Maximum number of results
+            offset: Number of best matching results to skip
+            boosts: Boost per indexed field, e.g. {"name": 3}
+            match: None for exact terms, "fuzzy" or "prefix"
+            fields: Model card properties returned with each result
+            
+        Returns:
+            List of matching model cards, best match first
+            
+        Raises:
+            ValueError: If a boost, the match mode or a field is not supported
+        """
+        if boosts and (not set(boosts) <= set(FULL_TEXT_FIELDS) or min(boosts.values()) <= 0):
+            raise ValueError(f"boosts must be positive and on {', '.join(FULL_TEXT_FIELDS)}")
+        if match is not None and match not in FULL_TEXT_MATCH_MODES:
+            raise ValueError(f"match must be one of {', '.join(FULL_TEXT_MATCH_MODES)}")
+        if fields and not set(fields) <= set(SEARCH_RESULT_FIELDS):
+            raise ValueError(f"fields must be among {', '.join(SEARCH_RESULT_FIELDS)}")
+        fields = list(fields or DEFAULT_SEARCH_RESULT_FIELDS)
+        key = ("fulltext", _normalize_query(query), limit, offset, collapse_family,
+               tuple(sorted(boosts.items())) if boosts else None, match, tuple(fields))
+        return self._cached_search(key, lambda: self._full_text_search(query, collapse_family, limit, offset,
+                                                                       boosts, match, fields))
+
+    def _full_text_search(self, query: str, collapse_family: bool, limit: int, offset: int,
+                          boosts: Optional[Dict[str, float]], match: Optional[str],
+                          fields: List[str]) -> List[Dict[str, Any]]:
+        if not collapse_family:
+            results = self.db.full_text_search(query, limit, offset, boosts, match, fields)
+            return [
+                {"mc_id": r["mc_id"], **{field: r[field] for field in fields}, "score": r["score"]}
+                for r in results
+            ]
+
         return [
             {
                 "mc_id": r["mc_id"],
+                **{field: r[field] for field in fields},
+                "score": r["score"],
+                "family_id": r["family_id"],
+                "family_hits": r["family_hits"]
+            }
+            for r in self.db.full_text_search_families(query, limit, offset, boosts, match, fields)
+        ]
+
+    def suggest(self, prefix: str, limit: int = 10, field: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Suggest model card names, authors and keywords starting with a prefix, from memory.
+        
+        Args:
+            prefix: Typed prefix
+            limit: Maximum number of suggestions
+            field: Only suggest texts of this field: name, author or keywords
+            
+        Returns:
+            List of suggestions with the text, its field, the number of model cards and their IDs
+        """
+        return self.suggest_index.suggest(prefix, limit, field)
+
+    def facets(self, query: Optional[str] = None, size: int = 20) -> Dict[str, Any]:
+        """
+        Count the model cards per category, input type, framework, license and author.
+        
+        Args:
+            query: Full-text query the counted model cards must match, or None to count the whole catalogue
+            size: Maximum number of values returned per facet
+            
+        Returns:
+            Dictionary with the number of counted model cards and the most frequent values of each facet
+        """
+        if query is None:
+            return self.facet_index.facets(size=size)
+        # every match is counted; only the ids are read, so this stays cheap for broad queries
+        return self._cached_search(
+            ("facets", _normalize_query(query), size),
+            lambda: self.facet_index.facets(self.db.full_text_search_ids(query), size))
+
+    def semantic_search(self, query: str, limit: int = 10, threshold: float = 0.80) -> List[Dict[str, Any]]:
+        """
+        Search model cards by the similarity of their embedding to the embedding of the query.
+        
+        Query embeddings and search results are cached, so a repeated query neither calls the
+        embedding provider nor queries the graph.
+        
+        Args:
+            query: Natural-language search query
+            limit: Maximum number of results
+            threshold: Minimum similarity score
+            
+        Returns:
+            List of matching model cards with the same fields as search_kg, best match first
+        """
+        normalized_query = _normalize_query(query).lower()
+        embedding = self.query_embedding_cache.get(normalized_query)
+        if embedding is None:
+            embedding = tuple(graph_embedder.embed_text(normalized_query))
+            self.query_embedding_cache.set(normalized_query, embedding)
+
+        return self._cached_search(("semantic", embedding, limit, threshold),
+                                   lambda: self._semantic_search(list(embedding), limit, threshold))
+
+    def hybrid_search(self, query: str, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Search model cards with both the full-text and the vector index, fused by reciprocal rank fusion.
+        
+        The two retrievals run concurrently. Each model card scores the sum of 1 / (RRF_K + rank) over the
+        retrievals that found it, and keeps the score of each retrieval. Without similarity support only the
+        full-text retrieval is used. The query is searched as plain terms, so Lucene syntax in it is escaped.
+        
+        Args:
+            query: Natural-language search query
+            limit: Maximum number of results
+            offset: Number of fused results to skip
+            
+        Returns:
+            Page of model cards with the fused score and the per-source scores, best match first
+        """
+        return self._cached_search(("hybrid", _normalize_query(query), limit, offset),
+                                   lambda: self._hybrid_search(query, limit, offset))
+
+    def _hybrid_search(self, query: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+        depth = max(HYBRID_SEARCH_DEPTH, offset + limit)
+        full_text = self.search_executor.submit(self.db.full_text_search, lucene_query(query, escape=True), depth)
+        vector = None
+        if graph_embedder.ENABLE_MC_SIMILARITY:
+            vector = self.search_executor.submit(self.semantic_search, query, depth, 0.0)
+
+        fused = {}
+        for source, results in (("fulltext", full_text.result()), ("vector", vector.result() if vector else [])):
+            for rank, r in enumerate(results, start=1):
+                entry = fused.get(r["mc_id"])
+                if entry is None:
+                    entry = fused[r["mc_id"]] = {
+                        "mc_id": r["mc_id"],
+                        "name": r["name"],
+                        "version": r["version"],
+                        "short_description": r["short_description"],
+                        "score": 0.0,
+                        "scores": {"fulltext": None, "vector": None}
+                    }
+                entry["score"] += 1.0 / (RRF_K + rank)
+                entry["scores"][source] = r["score"]
+        ranked = sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)
+        return ranked[offset:offset + limit]
+
+    def _semantic_search(self, embedding: List[float], limit: int, threshold: float) -> List[Dict[str, Any]]:
+        engine = self.similarity_engine
+        if engine is not None and engine.loaded:
+            matches = engine.search(embedding, limit, threshold)
+            summaries = self.db.get_mc_summaries([model_id for model_id, _ in matches])
+            return [dict(summaries[model_id], score=score) for model_id, score in matches if model_id in summaries]
+        return [
+            {
+                "mc_id": r["model_id"],
                 "name": r["name"],
                 "version": r["version"],
                 "short_description": r["short_description"],
                 "score": r["score"]
             }
-            for r in results
+            for r in self.db.rag_search(embedding, threshold, limit)
         ]
 
-    def get_all_mcs(self) -> List[Dict[str, Any]]:
-        """Retrieve all model cards from the knowledge graph."""
-        model_cards = self.db.get_all_modelcards()
+    def get_family(self, mc_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get all versions of a model, i.e. the model cards in its family.
+        
+        Args:
+            mc_id: The ID of any model card in the family
+            
+        Returns:
+            Dictionary with the family ID and its model cards, or None if the model card does not exist
+        """
+        members = self.db.get_family(mc_id)
+        if not members:
+            return None
+        return {
+            "family_id": members[0]["family_id"],
+            "model_cards": [
+                {
+                    "mc_id": m["mc_id"],
+                    "name": m["name"],
+                    "version": m["version"],
+                    "short_description": m["short_description"]
+                }
+                for m in members
+            ]
+        }
+
+    def rag_search(self, embedded_query: List[float], threshold: float = 0.80,
+                   max_nodes: int = 5) -> List[Dict[str, Any]]:
+        """
+        Find the model cards most similar to an embedded query.
+        
+        The similarity engine answers the query in memory once it is loaded; otherwise the
+        vector index is queried.
+        
+        Args:
+            embedded_query: Embedding of the query
+            threshold: Minimum similarity score
+            max_nodes: Maximum number of results
+            
+        Returns:
+            List of model card IDs and scores, most similar first
+        """
+        engine = self.similarity_engine
+        if engine is not None and engine.loaded:
+            return [{"model_id": model_id, "score": score}
+                    for model_id, score in engine.search(embedded_query, max_nodes, threshold)]
+        return [{"model_id": r["model_id"], "score": r["score"]}
+                for r in self.db.rag_search(embedded_query, threshold, max_nodes)]
+
+    def get_all_mcs(self, limit: int = 1000, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Retrieve model cards from the knowledge graph, ordered by ID, after the given cursor."""
+        model_cards = self.db.get_all_modelcards(limit, cursor)
         return [
             {
                 "mc_id": r["mc_id"],
@@ -177,6 +522,25 @@ class MCReconstructor:
             for r in model_cards
         ]
 
+    def get_mcs_page(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Retrieve a page of model cards using keyset pagination.
+        
+        Args:
+            limit: Maximum number of model cards in the page
+            cursor: Cursor returned with the previous page, or None for the first page
+            
+        Returns:
+            A tuple of the model cards and the cursor of the next page, or None if this is the last page
+        """
+        model_cards = self.get_all_mcs(limit + 1, cursor)
+        next_cursor = model_cards[limit - 1]["mc_id"] if len(model_cards) > limit else None
+        return model_cards[:limit], next_cursor
+
+    def stream_mcs(self, cursor: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Stream all model cards from the knowledge graph, ordered by ID, after the given cursor."""
+        return self.db.stream_modelcards(cursor)
+
     def get_model_location(self, model_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve the download location for a specific model."""
         model_info = self.db.get_model_location(model_id)
@@ -202,9 +566,42 @@ class MCReconstructor:
     def set_model_location(self, model_id: str, location: str) -> None:
         """Update the download location for a specific model."""
         self.db.set_model_location(model_id, location)
+        self.invalidate(model_id)
+        self.invalidate(model_id.removesuffix("-model"))
         logging.info(f"Updated model location for {model_id}")
 
 
+    def get_model_card_link_headers(self, model_card_id: str) -> Optional[Dict[str, str]]:
+        """
+        Generate the linkset headers for a model card from a projection of the few fields they need.
+        
+        Headers are cached per model card until a write invalidates them.
+        
+        Args:
+            model_card_id: The external ID of the model card
+            
+        Returns:
+            A dictionary containing 'Link' and 'Content-Length' headers, or None if not found
+        """
+        headers = self.link_header_cache.get(model_card_id)
+        if headers is not None:
+            return headers
+
+        record = self.db.get_link_fields(model_card_id)
+        if record is None:
+            logging.warning(f"Model card '{model_card_id}' not found in knowledge graph")
+            return None
+
+        link_fields = {
+            "external_id": record["external_id"],
+            "author": record["author"],
+            "input_data": record["input_data"],
+            "ai_model": record["ai_model"] or {},
+        }
+        headers = self.get_link_headers(link_fields)
+        self.link_header_cache.set(model_card_id, headers)
+        return headers
+
     def get_link_headers(self, model_card: Dict[str, Any]) -> Dict[str, str]:
         """
         Generate HTTP Link and Content-Length headers based on model card data.
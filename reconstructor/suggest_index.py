@@ -0,0 +1,182 @@
+import bisect
+import itertools
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# model card properties offered as suggestions
+SUGGEST_FIELDS = ("name", "author", "keywords")
+
+
+def suggest_terms(model_card: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """
+    Get the (field, text) suggestions of a model card. Keywords are split on commas.
+
+    Args:
+        model_card: Model card, or a projection of its name, author and keywords
+
+    Returns:
+        List of distinct (field, text) pairs
+    """
+    terms = []
+    for field in SUGGEST_FIELDS:
+        value = model_card.get(field)
+        if not value:
+            continue
+        texts = value.split(",") if field == "keywords" and isinstance(value, str) else \
+            value if isinstance(value, list) else [value]
+        for text in texts:
+            text = " ".join(str(text).split())
+            if text and (field, text) not in terms:
+                terms.append((field, text))
+    return terms
+
+
+class SuggestIndex:
+    """
+    In-memory prefix index over model card names, authors and keywords for typeahead suggestions.
+
+    Suggestions are kept in a sorted array of (lowercased text, field, text) keys, so a prefix lookup is a
+    bisect to the first match followed by a scan of the matching range. The index is built from one
+    projection query on first use and updated in place when this process writes model cards. Model cards written
+    by other processes are picked up when the index is rebuilt, periodically with `start_refresh`.
+    """
+
+    def __init__(self, loader: Callable[[Optional[List[str]]], Iterable[Dict[str, Any]]]) -> None:
+        """
+        Initialize the index.
+
+        Args:
+            loader: Function returning the id, name, author and keywords of the given model cards, or of
+                every model card when called with None
+        """
+        self.loader = loader
+        self.built = False
+        self._keys: List[Tuple[str, str, str]] = []
+        # ids of the model cards of each key, in insertion order
+        self._mc_ids: Dict[Tuple[str, str, str], Dict[str, None]] = {}
+        self._terms: Dict[str, List[Tuple[str, str, str]]] = {}
+        # model cards written while a rebuild is loading, applied to the rebuilt index
+        self._pending: Optional[Dict[str, Optional[Dict[str, Any]]]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def build(self) -> None:
+        """
+        Load the suggestions of every model card, replacing the current ones. The current suggestions keep being
+        served and updated while the new ones load, and the updates are applied to the new ones.
+        """
+        with self._lock:
+            self._pending = {}
+        try:
+            keys, mc_ids, terms = set(), {}, {}
+            for row in self.loader(None):
+                mc_keys = [(text.lower(), field, text) for field, text in suggest_terms(row)]
+                terms[row["id"]] = mc_keys
+                for key in mc_keys:
+                    keys.add(key)
+                    mc_ids.setdefault(key, {})[row["id"]] = None
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._keys, self._mc_ids, self._terms = sorted(keys), mc_ids, terms
+            self.built = True
+            for mc_id, model_card in pending.items():
+                self._apply(mc_id, model_card)
+
+    def _ensure_built(self) -> None:
+        if not self.built:
+            with self._lock:
+                if not self.built:
+                    self.build()
+
+    def update(self, mc_id: str, model_card: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Replace the suggestions of a model card. An index that is not built yet is left to load it on first use.
+
+        Args:
+            mc_id: The external ID of the model card
+            model_card: The model card data, or None to load it; a model card that no longer exists is removed
+        """
+        with self._lock:
+            # a first build holds the lock, so the write waits for it; a rebuild loads without the lock and
+            # replays the writes made meanwhile, which it may have read before they happened
+            if self._pending is not None:
+                self._pending[mc_id] = model_card
+            if self.built:
+                self._apply(mc_id, model_card)
+
+    def _apply(self, mc_id: str, model_card: Optional[Dict[str, Any]]) -> None:
+        if model_card is None:
+            model_card = next(iter(self.loader([mc_id])), {})
+        for key in self._terms.pop(mc_id, []):
+            owners = self._mc_ids[key]
+            owners.pop(mc_id, None)
+            if not owners:
+                del self._mc_ids[key]
+                del self._keys[bisect.bisect_left(self._keys, key)]
+        mc_keys = [(text.lower(), field, text) for field, text in suggest_terms(model_card)]
+        if mc_keys:
+            self._terms[mc_id] = mc_keys
+        for key in mc_keys:
+            if key not in self._mc_ids:
+                self._mc_ids[key] = {}
+                bisect.insort(self._keys, key)
+            self._mc_ids[key][mc_id] = None
+
+    def start_refresh(self, interval: float) -> threading.Event:
+        """
+        Build the index in a background thread and rebuild it every interval, to suggest the model cards
+        written by other processes.
+
+        Args:
+            interval: Seconds between rebuilds
+
+        Returns:
+            Event that stops the refresh when set
+        """
+        def run() -> None:
+            while not stop.is_set():
+                try:
+                    if self.built:
+                        self.build()
+                    else:
+                        self._ensure_built()
+                except Exception as e:
+                    logging.error(f"Suggest index refresh failed: {str(e)}")
+                stop.wait(interval)
+
+        stop = threading.Event()
+        threading.Thread(target=run, name="suggest-index-refresh", daemon=True).start()
+        return stop
+
+    def suggest(self, prefix: str, limit: int = 10, field: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the suggestions starting with a prefix, case-insensitively, in alphabetical order.
+
+        Args:
+            prefix: Typed prefix
+            limit: Maximum number of suggestions
+            field: Only suggest texts of this field
+
+        Returns:
+            List of suggestions with the text, its field, the number of model cards and up to 10 of their ids
+        """
+        self._ensure_built()
+        prefix = " ".join(prefix.split()).lower()
+        suggestions = []
+        with self._lock:
+            for i in range(bisect.bisect_left(self._keys, (prefix,)), len(self._keys)):
+                key = self._keys[i]
+                if len(suggestions) == limit or not key[0].startswith(prefix):
+                    break
+                if field is None or key[1] == field:
+                    mc_ids = self._mc_ids[key]
+                    suggestions.append({"text": key[2], "field": key[1], "count": len(mc_ids),
+                                        "mc_ids": list(itertools.islice(mc_ids, 10))})
+        return suggestions
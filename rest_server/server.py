@@ -1,21 +1,35 @@
 import os
+import json
 import logging
-from urllib.parse import urlparse
+from urllib.parse import urlencode, urlparse
 
 from flask import Flask, request, jsonify, Response
 from flask_restx import Api, Resource
 
-from ingester.neo4j_ingester import MCIngester
-from reconstructor.mc_reconstructor import MCReconstructor
+from ingester import graph_embedder
+from ingester.ingest_queue import IngestQueue
+from ingester.neo4j_ingester import DuplicateModelCardError, MCIngester, validate_mc
+from ingester.similarity_engine import start_similarity_engine
+from reconstructor.mc_reconstructor import (FACET_INDEX_REFRESH_INTERVAL, SUGGEST_INDEX_REFRESH_INTERVAL,
+                                            MCReconstructor)
+from reconstructor.suggest_index import SUGGEST_FIELDS
 
 NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USERNAME = os.getenv("NEO4J_USER")
 NEO4J_PWD = os.getenv("NEO4J_PWD")
 
 ENABLE_MC_SIMILARITY = os.getenv("ENABLE_MC_SIMILARITY", "False").lower() == "true"
+MAX_PAGE_SIZE = 1000
 
-mc_ingester = MCIngester(NEO4J_URI, NEO4J_USERNAME, NEO4J_PWD, ENABLE_MC_SIMILARITY)
-mc_reconstructor = MCReconstructor(NEO4J_URI, NEO4J_USERNAME, NEO4J_PWD)
+INGEST_QUEUE_PATH = os.getenv("INGEST_QUEUE_PATH", "ingest_queue.db")
+INGEST_QUEUE_WORKERS = int(os.getenv("INGEST_QUEUE_WORKERS", "2"))
+INGEST_QUEUE_BATCH_SIZE = int(os.getenv("INGEST_QUEUE_BATCH_SIZE", "50"))
+
+similarity_engine = start_similarity_engine(NEO4J_URI, NEO4J_USERNAME, NEO4J_PWD)
+mc_ingester = MCIngester(NEO4J_URI, NEO4J_USERNAME, NEO4J_PWD, ENABLE_MC_SIMILARITY, similarity_engine)
+mc_reconstructor = MCReconstructor(NEO4J_URI, NEO4J_USERNAME, NEO4J_PWD, similarity_engine)
+mc_ingester.add_listener(mc_reconstructor.on_model_card_write)
+ingest_queue = IngestQueue(mc_ingester, INGEST_QUEUE_PATH, INGEST_QUEUE_WORKERS, INGEST_QUEUE_BATCH_SIZE)
 
 logging.basicConfig(level=logging.INFO)
 app = Flask(__name__)
@@ -35,38 +49,100 @@ class ModelCard(Resource):
         """
         Upload model card to the Patra Knowledge Graph.
         Expects a JSON payload.
+        With ?async=true the model card is validated and queued, and the response is 202 with the id of
+        the ingestion job, which can be followed at /jobs/<job_id>.
         """
         data = request.get_json()
+        if request.args.get('async', 'false').lower() == 'true':
+            missing = validate_mc(data)
+            if missing:
+                return {"error": f"Missing required fields: {', '.join(missing)}"}, 400
+            job_id = ingest_queue.enqueue(data)
+            status_url = f"/jobs/{job_id}"
+            return {"message": "Model card queued for ingestion", "job_id": job_id, "status_url": status_url}, \
+                202, {"Location": status_url}
         exists, base_mc_id = mc_ingester.add_mc(data)
         if exists:
             return {"message": "Model card already exists", "model_card_id": base_mc_id}, 200
         return {"message": "Successfully uploaded the model card", "model_card_id": base_mc_id}, 200
 
 
+@api.route('/jobs/<string:job_id>')
+class IngestJob(Resource):
+    def get(self, job_id):
+        """
+        Get the status of an asynchronous model card upload.
+        The status is one of queued, running, done or failed.
+        """
+        job = ingest_queue.get_job(job_id)
+        if job is None:
+            return {"error": f"Job '{job_id}' could not be found!"}, 404
+        return job, 200
+
+
+@api.route('/modelcards/batch')
+class ModelCardBatch(Resource):
+    def post(self):
+        """
+        Upload a batch of model cards to the Patra Knowledge Graph.
+        Expects a JSON array of model cards.
+        Returns the status of each model card (created, exists or failed) in the order they were given.
+        """
+        data = request.get_json()
+        if not isinstance(data, list):
+            return {"error": "Expected a JSON array of model cards"}, 400
+        results = mc_ingester.add_mcs(data)
+        summary = {status: sum(1 for r in results if r["status"] == status)
+                   for status in ("created", "exists", "failed")}
+        return {"results": results, **summary}, 200
+
+
 @api.route('/modelcard/<string:mc_id>')
 class ModelCardDetail(Resource):
     def get(self, mc_id):
-        model_card = mc_reconstructor.reconstruct(str(mc_id))
+        model_card, etag = mc_reconstructor.reconstruct_with_etag(str(mc_id))
         if model_card is None:
             return {"error": "Model card could not be found!"}, 400
-        return model_card, 200
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+        return model_card, 200, {"ETag": f'"{etag}"'}
     def head(self, mc_id):
-        model_card = mc_reconstructor.reconstruct(str(mc_id))
-        if not model_card:
+        generated_headers = mc_reconstructor.get_model_card_link_headers(str(mc_id))
+        if not generated_headers:
             error_payload = jsonify({"error": f"Model card with ID '{mc_id}' could not be found!"})
             return Response(response=error_payload.get_data(as_text=True), status=404, mimetype='application/json')
-        generated_headers = mc_reconstructor.get_link_headers(model_card)
         response = Response(response=None,status=200,mimetype='text/plain')
         response.headers.update(generated_headers)
         return response
     def put(self, mc_id):
         data = request.get_json()
-        base_mc_id = mc_ingester.update_mc(data)
+        try:
+            base_mc_id = mc_ingester.update_mc(data)
+        except DuplicateModelCardError as e:
+            return {"error": str(e), "model_card_id": e.model_card_id}, 409
         if base_mc_id:
             return {"message": "Successfully updated the model card", "model_card_id": base_mc_id}, 200
         return {"message": "Model card not found", "model_card_id": base_mc_id}, 200
 
 
+@api.route('/modelcards/get')
+class ModelCardMultiGet(Resource):
+    def post(self):
+        """
+        Retrieve several model cards at once.
+        Expects a JSON payload with a list of model card ids, e.g. {"ids": ["id1", "id2"]}.
+        Returns the model cards keyed by id and the ids that could not be found.
+        """
+        data = request.get_json()
+        ids = data.get('ids') if isinstance(data, dict) else None
+        if not isinstance(ids, list) or not all(isinstance(mc_id, str) for mc_id in ids):
+            return {"error": "A list of model card ids (ids) is required"}, 400
+        model_cards, missing = mc_reconstructor.reconstruct_many(ids)
+        return {"model_cards": model_cards, "missing": missing}, 200
+
+
 @api.route('/datasheet')
 class Datasheet(Resource):
     def post(self):
@@ -84,16 +160,120 @@ class SearchModelCards(Resource):
     def get(self):
         """
         Full text search for model cards.
+        Query parameters:
+            q: search query, in Lucene syntax unless boost or match is given
+            limit: maximum number of results (default 10, at most 100)
+            offset: number of results to skip (default 0)
+            boost: per-field boosts, e.g. name:3,full_description:0.5
+            match: fuzzy or prefix matching of the query terms
+            fields: comma separated model card properties returned with each result
+            collapse: family to return only the best matching version of each model family
+            mode: hybrid to fuse the full-text and vector searches by reciprocal rank fusion; the query is then
+                searched as plain terms, and boost, match, fields and collapse are not supported
         """
         query = request.args.get('q')
-        if not query:
+        if not query or not query.strip():
             return {"error": "Query (q) is required"}, 400
-        results = mc_reconstructor.search_kg(query)
+        limit = request.args.get('limit', 10, type=int)
+        offset = request.args.get('offset', 0, type=int)
+        if limit is None or offset is None or not 0 < limit <= 100 or offset < 0:
+            return {"error": "limit must be between 1 and 100 and offset not negative"}, 400
+        if request.args.get('mode') == 'hybrid':
+            unsupported = [arg for arg in ('boost', 'match', 'fields', 'collapse') if request.args.get(arg)]
+            if unsupported:
+                return {"error": f"{', '.join(unsupported)} not supported in hybrid mode"}, 400
+            return mc_reconstructor.hybrid_search(query, limit, offset), 200
+
+        boosts = None
+        if request.args.get('boost'):
+            try:
+                boosts = {field: float(boost) for field, boost in
+                          (item.split(':') for item in request.args['boost'].split(','))}
+            except ValueError:
+                return {"error": "boost must be a list of field:boost pairs"}, 400
+        fields = request.args['fields'].split(',') if request.args.get('fields') else None
+        try:
+            results = mc_reconstructor.search_kg(query, request.args.get('collapse') == 'family', limit, offset,
+                                                 boosts, request.args.get('match'), fields)
+        except ValueError as e:
+            return {"error": str(e)}, 400
         return results, 200
 
 
 
 
+@api.route('/modelcards/suggest')
+class SuggestModelCards(Resource):
+    def get(self):
+        """
+        Typeahead suggestions of model card names, authors and keywords, served from memory.
+        Query parameters:
+            prefix: typed prefix, matched case-insensitively
+            limit: maximum number of suggestions (default 10, at most 100)
+            field: only suggest name, author or keywords
+        """
+        prefix = request.args.get('prefix', '')
+        if not prefix.strip():
+            return {"error": "Prefix (prefix) is required"}, 400
+        limit = request.args.get('limit', 10, type=int)
+        field = request.args.get('field')
+        if limit is None or not 0 < limit <= 100:
+            return {"error": "limit must be between 1 and 100"}, 400
+        if field is not None and field not in SUGGEST_FIELDS:
+            return {"error": f"field must be one of {', '.join(SUGGEST_FIELDS)}"}, 400
+        return mc_reconstructor.suggest(prefix, limit, field), 200
+
+
+@api.route('/modelcards/facets')
+class ModelCardFacets(Resource):
+    def get(self):
+        """
+        Number of model cards per category, input type, framework, license and author.
+        Query parameters:
+            q: optional full-text query the counted model cards must match
+            size: maximum number of values per facet (default 20, at most 1000)
+        """
+        size = request.args.get('size', 20, type=int)
+        if size is None or not 0 < size <= 1000:
+            return {"error": "size must be between 1 and 1000"}, 400
+        return mc_reconstructor.facets((request.args.get('q') or '').strip() or None, size), 200
+
+
+@api.route('/modelcards/semantic')
+class SemanticSearchModelCards(Resource):
+    def get(self):
+        """
+        Semantic search for model cards: the query is embedded and matched against the model card embeddings.
+        Query parameters:
+            q: natural-language query
+            limit: maximum number of results (default 10)
+            threshold: minimum similarity score (default 0.8)
+        """
+        if not ENABLE_MC_SIMILARITY:
+            return {"error": "Semantic search requires ENABLE_MC_SIMILARITY"}, 503
+        query = request.args.get('q')
+        if not query or not query.strip():
+            return {"error": "Query (q) is required"}, 400
+        limit = request.args.get('limit', 10, type=int)
+        threshold = request.args.get('threshold', 0.80, type=float)
+        if limit is None or not 0 < limit <= 100 or threshold is None:
+            return {"error": "limit must be between 1 and 100 and threshold a number"}, 400
+        results = mc_reconstructor.semantic_search(query, limit, threshold)
+        return results, 200
+
+
+@api.route('/modelcard/<string:mc_id>/family')
+class ModelCardFamily(Resource):
+    def get(self, mc_id):
+        """
+        Get all versions of a model: the model cards in the same family as the given model card.
+        """
+        family = mc_reconstructor.get_family(mc_id)
+        if family is None:
+            return {"error": f"Model card with ID '{mc_id}' could not be found!"}, 404
+        return family, 200
+
+
 @api.route('/modelcard/<string:mc_id>/download_url')
 class ModelDownloadURL(Resource):
     def get(self, mc_id):
@@ -110,10 +290,31 @@ class ModelDownloadURL(Resource):
 class ListModelCards(Resource):
     def get(self):
         """
-        Lists all the models in Patra KG.
+        Lists the models in Patra KG, one page at a time.
+        Without limit and cursor the first page is returned as a list, as before pagination. With either, the
+        page is returned as {"model_cards": [...], "next_cursor": ...}. The next page is also linked in a
+        rel="next" Link header.
+        Query parameters:
+            limit: page size (default and maximum 1000)
+            cursor: cursor of the page to fetch, taken from next_cursor or the Link header of the previous page
+            format: 'ndjson' to stream all model cards after the cursor as newline-delimited JSON
         """
-        model_card_dict = mc_reconstructor.get_all_mcs()
-        return model_card_dict, 200
+        cursor = request.args.get('cursor')
+        if request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson':
+            lines = (json.dumps(model_card) + "\n" for model_card in mc_reconstructor.stream_mcs(cursor))
+            return Response(lines, status=200, mimetype='application/x-ndjson')
+
+        limit = request.args.get('limit', MAX_PAGE_SIZE, type=int)
+        if limit is None or not 0 < limit <= MAX_PAGE_SIZE:
+            return {"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}, 400
+        model_card_dict, next_cursor = mc_reconstructor.get_mcs_page(limit, cursor)
+        headers = {}
+        if next_cursor:
+            next_url = f"{request.base_url}?{urlencode({'limit': limit, 'cursor': next_cursor})}"
+            headers['Link'] = f'<{next_url}>; rel="next"'
+        if 'limit' not in request.args and cursor is None:
+            return model_card_dict, 200, headers
+        return {"model_cards": model_card_dict, "next_cursor": next_cursor}, 200, headers
 
 
 @api.route('/modelcard/<string:mc_id>/deployments')
@@ -211,11 +412,10 @@ class ModelCardLinkset(Resource):
         Provides linkset relations for a model card in the HTTP Link header.
         Returns an empty body with link information in the header.
         """
-        model_card = mc_reconstructor.reconstruct(str(mc_id))
-        if not model_card:
+        generated_headers = mc_reconstructor.get_model_card_link_headers(str(mc_id))
+        if not generated_headers:
              error_payload = jsonify({"error": f"Model card with ID '{mc_id}' could not be found!"})
              return Response(response=error_payload.get_data(as_text=True), status=404, mimetype='application/json')
-        generated_headers = mc_reconstructor.get_link_headers(model_card)
         response = Response(
             response=None,
             status=200,
@@ -225,6 +425,18 @@ class ModelCardLinkset(Resource):
         return response
 
 
+@api.route('/cache/stats')
+class CacheStats(Resource):
+    def get(self):
+        """
+        Hit, miss and eviction counters of the in-process caches.
+        """
+        stats = mc_reconstructor.cache_stats()
+        if graph_embedder.embedding_cache is not None:
+            stats["embeddings"] = graph_embedder.embedding_cache.stats()
+        return stats, 200
+
+
 @api.route('/device')
 class Device(Resource):
     def post(self):
@@ -290,4 +502,12 @@ class User(Resource):
             logging.error(f"Failed to register user: {str(e)}")
             return {"error": f"Failed to register user: {str(e)}"}, 500
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5002)
\ No newline at end of file
+    # resume the ingestion jobs queued before a restart without waiting for the next async upload
+    ingest_queue.start()
+    # load the facet counters before the first request needs them, and keep them up to date with other writers
+    mc_reconstructor.facet_index.start_refresh(FACET_INDEX_REFRESH_INTERVAL)
+    # likewise for the typeahead suggestions
+    mc_reconstructor.suggest_index.start_refresh(SUGGEST_INDEX_REFRESH_INTERVAL)
+    # the reloader would run this module again in a child process, with a second queue, similarity engine and
+    # caches that the writes of the first one never reach
+    app.run(debug=True, use_reloader=False, host='0.0.0.0', port=5002)
\ No newline at end of file
@@ -14,6 +14,7 @@ from mcp_server.main import (
     get_model_deployments_resource,
     get_modelcard_linkset_resource,
     upload_modelcard,
+    upload_modelcards,
     update_modelcard,
     upload_datasheet,
     update_model_location,
@@ -22,6 +23,10 @@ from mcp_server.main import (
     register_user,
     create_edge,
     search_modelcards,
+    get_modelcards,
+    get_modelcard_family,
+    get_modelcard_facets,
+    semantic_search_modelcards,
     list_modelcards
 )
 
@@ -127,25 +132,24 @@ async def test_get_model_deployments_resource_not_found():
 async def test_get_modelcard_linkset_resource_success():
     """Test successful linkset resource retrieval."""
     with patch('mcp_server.main.mc_reconstructor') as mock_reconstructor:
-        mock_model_card = {"external_id": "test-mc-123", "name": "Test Model"}
         mock_link_headers = {
             "Link": '<test-mc-123>; rel="cite-as"',
             "Content-Length": "100"
         }
-        mock_reconstructor.reconstruct.return_value = mock_model_card
-        mock_reconstructor.get_link_headers.return_value = mock_link_headers
+        mock_reconstructor.get_model_card_link_headers.return_value = mock_link_headers
         
         result = await get_modelcard_linkset_resource("test-mc-123")
         result_dict = json.loads(result)
         
         assert result_dict == mock_link_headers
+        mock_reconstructor.get_model_card_link_headers.assert_called_once_with("test-mc-123")
 
 
 @pytest.mark.asyncio
 async def test_get_modelcard_linkset_resource_not_found():
     """Test linkset resource when model card not found."""
     with patch('mcp_server.main.mc_reconstructor') as mock_reconstructor:
-        mock_reconstructor.reconstruct.return_value = None
+        mock_reconstructor.get_model_card_link_headers.return_value = None
         
         result = await get_modelcard_linkset_resource("nonexistent-mc")
         result_dict = json.loads(result)
@@ -185,6 +189,33 @@ async def test_upload_modelcard_duplicate():
         assert result["model_card_id"] == "existing-mc-id"
 
 
+@pytest.mark.asyncio
+async def test_upload_modelcards_success():
+    """Test batch model card upload."""
+    with patch('mcp_server.main.mc_ingester') as mock_ingester:
+        model_cards = [{"name": "Model A"}, {"name": "Model B"}]
+        mock_ingester.add_mcs.return_value = [
+            {"index": 0, "status": "created", "model_card_id": "mc-a"},
+            {"index": 1, "status": "exists", "model_card_id": "mc-b"}
+        ]
+        
+        result = await upload_modelcards(model_cards)
+        
+        assert result["created"] == 1
+        assert result["exists"] == 1
+        assert result["failed"] == 0
+        assert [r["model_card_id"] for r in result["results"]] == ["mc-a", "mc-b"]
+        mock_ingester.add_mcs.assert_called_once_with(model_cards)
+
+
+@pytest.mark.asyncio
+async def test_upload_modelcards_empty():
+    """Test batch model card upload without model cards."""
+    result = await upload_modelcards([])
+    
+    assert "error" in result
+
+
 @pytest.mark.asyncio
 async def test_update_modelcard_success():
     """Test successful model card update."""
@@ -412,6 +443,32 @@ async def test_create_edge_success():
         await mock_driver.close.assert_called_once()
 
 
+@pytest.mark.asyncio
+async def test_create_edge_invalidates_model_card():
+    """Test that linking a node to a model card drops the cached model card."""
+    with patch('neo4j.AsyncGraphDatabase', create=True) as mock_driver_class, \
+            patch('mcp_server.main.mc_reconstructor') as mock_reconstructor:
+        mock_driver = MagicMock(close=AsyncMock())
+        mock_driver_class.driver.return_value = mock_driver
+        
+        mock_session = AsyncMock()
+        mock_driver.session.return_value.__aenter__.return_value = mock_session
+        mock_driver.session.return_value.__aexit__.return_value = None
+        
+        mock_result = AsyncMock()
+        mock_result.single.return_value = {"source_labels": ["ModelCard"], "target_labels": ["BiasAnalysis"]}
+        mock_created_result = AsyncMock()
+        mock_created_result.single.return_value = {"rel_type": "BIAS_ANALYSIS", "source_mc_id": "mc-1",
+                                                   "target_mc_id": None}
+        mock_session.run.side_effect = [mock_result, mock_created_result]
+        
+        result = await create_edge("source-id", "target-id")
+        
+        assert result["success"] is True
+        assert result["relationship_type"] == "BIAS_ANALYSIS"
+        mock_reconstructor.on_model_card_write.assert_called_once_with("mc-1")
+
+
 @pytest.mark.asyncio
 async def test_create_edge_nodes_not_found():
     """Test edge creation when nodes not found."""
@@ -475,7 +532,8 @@ async def test_search_modelcards_success():
         
         assert "results" in result
         assert result["results"] == mock_results
-        mock_reconstructor.search_kg.assert_called_once_with("test query")
+        mock_reconstructor.search_kg.assert_called_once_with("test query", limit=10, offset=0, boosts=None,
+                                                             match=None, fields=None)
 
 
 @pytest.mark.asyncio
@@ -487,6 +545,28 @@ async def test_search_modelcards_missing_query():
     assert "required" in result["error"]
 
 
+@pytest.mark.asyncio
+async def test_get_modelcards_success():
+    """Test retrieving several model cards at once."""
+    with patch('mcp_server.main.mc_reconstructor') as mock_reconstructor:
+        mock_model_cards = {"mc1": {"external_id": "mc1"}}
+        mock_reconstructor.reconstruct_many.return_value = (mock_model_cards, ["mc2"])
+        
+        result = await get_modelcards(["mc1", "mc2"])
+        
+        assert result["model_cards"] == mock_model_cards
+        assert result["missing"] == ["mc2"]
+        mock_reconstructor.reconstruct_many.assert_called_once_with(["mc1", "mc2"])
+
+
+@pytest.mark.asyncio
+async def test_get_modelcards_missing_ids():
+    """Test retrieving several model cards without IDs."""
+    result = await get_modelcards([])
+    
+    assert "error" in result
+
+
 @pytest.mark.asyncio
 async def test_list_modelcards_success():
     """Test successful model card listing."""
@@ -495,12 +575,34 @@ async def test_list_modelcards_success():
             {"mc_id": "mc1", "name": "Model 1"},
             {"mc_id": "mc2", "name": "Model 2"}
         ]
+        mock_reconstructor.get_mcs_page.return_value = (mock_results, "mc2")
+        
+        result = await list_modelcards(limit=2)
+        
+        assert result["model_cards"] == mock_results
+        assert result["next_cursor"] == "mc2"
+        mock_reconstructor.get_mcs_page.assert_called_once_with(2, None)
+
+
+@pytest.mark.asyncio
+async def test_list_modelcards_without_paging():
+    """Test that listing without limit or cursor keeps returning a plain list."""
+    with patch('mcp_server.main.mc_reconstructor') as mock_reconstructor:
+        mock_results = [{"mc_id": "mc1", "name": "Model 1"}]
         mock_reconstructor.get_all_mcs.return_value = mock_results
         
         result = await list_modelcards()
         
         assert result == mock_results
-        mock_reconstructor.get_all_mcs.assert_called_once()
+        mock_reconstructor.get_mcs_page.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_list_modelcards_invalid_limit():
+    """Test model card listing with an out of range limit."""
+    result = await list_modelcards(limit=0)
+    
+    assert "error" in result
 
 
 # ============================================================================
@@ -520,6 +622,99 @@ def test_get_pid():
     assert pid1 != pid3
 
 
+@pytest.mark.asyncio
+async def test_get_modelcard_family():
+    """Test retrieving the family of a model card."""
+    family = {"family_id": "mc1", "model_cards": [{"mc_id": "mc1"}, {"mc_id": "mc2"}]}
+    with patch('mcp_server.main.mc_reconstructor') as mock_reconstructor:
+        mock_reconstructor.get_family.return_value = family
+        
+        result = await get_modelcard_family("mc2")
+        
+        assert result == family
+        mock_reconstructor.get_family.assert_called_once_with("mc2")
+
+
+@pytest.mark.asyncio
+async def test_get_modelcard_facets():
+    """Test counting model cards per facet value for a query."""
+    facets = {"total": 1, "facets": {"framework": [{"value": "pytorch", "count": 1}]}}
+    with patch('mcp_server.main.mc_reconstructor') as mock_reconstructor:
+        mock_reconstructor.facets.return_value = facets
+        
+        result = await get_modelcard_facets("resnet", size=5)
+        
+        assert result == facets
+        mock_reconstructor.facets.assert_called_once_with("resnet", 5)
+
+
+@pytest.mark.asyncio
+async def test_get_modelcard_family_not_found():
+    """Test retrieving the family of a missing model card."""
+    with patch('mcp_server.main.mc_reconstructor') as mock_reconstructor:
+        mock_reconstructor.get_family.return_value = None
+        
+        result = await get_modelcard_family("missing")
+        
+        assert "error" in result
+
+
+@pytest.mark.asyncio
+async def test_semantic_search_modelcards():
+    """Test semantic search for model cards."""
+    mock_results = [{"mc_id": "mc1", "name": "Model 1", "version": "1", "short_description": "", "score": 0.9}]
+    with patch('mcp_server.main.ENABLE_MC_SIMILARITY', True), \
+            patch('mcp_server.main.mc_reconstructor') as mock_reconstructor:
+        mock_reconstructor.semantic_search.return_value = mock_results
+        
+        result = await semantic_search_modelcards("image classifier", limit=5)
+        
+        assert result["results"] == mock_results
+        mock_reconstructor.semantic_search.assert_called_once_with("image classifier", 5, 0.80)
+
+
+@pytest.mark.asyncio
+async def test_semantic_search_modelcards_disabled():
+    """Test semantic search when similarity is disabled."""
+    with patch('mcp_server.main.ENABLE_MC_SIMILARITY', False):
+        result = await semantic_search_modelcards("image classifier")
+        
+        assert "error" in result
+
+
+@pytest.mark.asyncio
+async def test_search_modelcards_hybrid():
+    """Test hybrid search for model cards."""
+    mock_results = [{"mc_id": "mc1", "score": 0.03, "scores": {"fulltext": 2.0, "vector": 0.9}}]
+    with patch('mcp_server.main.mc_reconstructor') as mock_reconstructor:
+        mock_reconstructor.hybrid_search.return_value = mock_results
+        
+        result = await search_modelcards("image classifier", mode="hybrid", limit=5, offset=5)
+        
+        assert result["results"] == mock_results
+        mock_reconstructor.hybrid_search.assert_called_once_with("image classifier", 5, 5)
+        mock_reconstructor.search_kg.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_search_modelcards_rejects_blank_query():
+    """Test search rejects a query of whitespace only."""
+    with patch('mcp_server.main.mc_reconstructor') as mock_reconstructor:
+        result = await search_modelcards("   ", boosts={"name": 3})
+
+        assert result == {"error": "Query (q) is required"}
+        mock_reconstructor.search_kg.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_search_modelcards_hybrid_rejects_fulltext_options():
+    """Test hybrid search rejects the full-text only options."""
+    with patch('mcp_server.main.mc_reconstructor') as mock_reconstructor:
+        result = await search_modelcards("image classifier", mode="hybrid", boosts={"name": 2}, match="fuzzy")
+
+        assert result == {"error": "boosts, match not supported in hybrid mode"}
+        mock_reconstructor.hybrid_search.assert_not_called()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
-
@@ -1,6 +1,7 @@
 import json
 import os
 import sys
+import time
 from unittest.mock import MagicMock
 
 import pytest
@@ -77,6 +78,270 @@ def test_upload_duplicate_model_card(monkeypatch):
     assert "Model card already exists" in resp2.json().get("message", "")
 
 
+def test_upload_model_card_batch(client, monkeypatch):
+    cards = [load_json("tensorflow_titanic_MC.json"), load_json("tesorflow_adult_nn_MC.json"), {"name": "broken"}]
+    results = [
+        {"index": 0, "status": "created", "model_card_id": "mc-1"},
+        {"index": 1, "status": "exists", "model_card_id": "mc-2"},
+        {"index": 2, "status": "failed", "model_card_id": None, "error": "Missing required fields: version"},
+    ]
+    monkeypatch.setattr("ingester.neo4j_ingester.MCIngester.add_mcs", lambda self, model_cards: results)
+    response = client.post("/modelcards/batch", json=cards)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["results"] == results
+    assert (data["created"], data["exists"], data["failed"]) == (1, 1, 1)
+
+
+class FakeBatchDB:
+    """GraphDB stand-in recording the rows add_mcs writes; writing a card named "bad" fails."""
+
+    def __init__(self, existing):
+        self.existing = existing
+        self.rows = []
+        self.batches = []
+
+    def check_mcs_exist(self, model_cards):
+        from ingester.database import mc_content_hash
+        return {idx: self.existing[mc_content_hash(mc)] for idx, mc in enumerate(model_cards)
+                if mc_content_hash(mc) in self.existing}
+
+    def insert_model_cards(self, model_cards, similarity_support=False):
+        from ingester.database import _model_card_rows
+        self.batches.append([mc['id'] for mc in model_cards])
+        if any(mc['name'] == "bad" for mc in model_cards):
+            raise RuntimeError("write failed")
+        self.rows.append(_model_card_rows(model_cards, similarity_support))
+        return {}
+
+    def insert_model_card(self, model_card, similarity_support=False):
+        return self.insert_model_cards([model_card], similarity_support).get(model_card['id'])
+
+
+def test_add_mcs_dedups_and_falls_back_per_card():
+    from ingester.database import mc_content_hash
+    from ingester.neo4j_ingester import MCIngester
+
+    def card(name, mc_id):
+        model_card = load_json("tensorflow_titanic_MC.json")
+        model_card.update(name=name, id=mc_id)
+        return model_card
+
+    stored = card("stored", "mc-stored")
+    cards = [card("a", "mc-a"), card("stored", "mc-new"), card("a", "mc-a2"), card("bad", "mc-bad"),
+             card("e", "mc-e"), {"name": "broken"}]
+    cards[0]["ai_model"]["metrics"] = {"Test loss": 0.5, "f1-score": 0.9}
+    ingester = MCIngester("bolt://localhost:7687", "neo4j", "password")
+    ingester.db = FakeBatchDB({mc_content_hash(stored): "mc-stored"})
+    notified = []
+    ingester.add_listener(lambda mc_id, model_card: notified.append(mc_id))
+
+    results = ingester.add_mcs(cards, chunk_size=2)
+
+    assert [(r["status"], r["model_card_id"]) for r in results] == [
+        ("created", "mc-a"), ("exists", "mc-stored"), ("exists", "mc-a"), ("failed", "mc-bad"),
+        ("created", "mc-e"), ("failed", None)]
+    assert results[3]["error"] == "write failed"
+    assert "Missing required fields" in results[5]["error"]
+    # the failed chunk is retried one card at a time
+    assert ingester.db.batches == [["mc-a", "mc-bad"], ["mc-a"], ["mc-bad"], ["mc-e"]]
+    assert notified == ["mc-a", "mc-e"]
+
+    rows = ingester.db.rows[0]
+    assert rows["model_cards"][0]["content_hash"] == mc_content_hash(cards[0])
+    assert rows["models"][0]["metrics"] == {"Test_loss": 0.5, "f1_score": 0.9}
+    assert rows["requirements"][0]["props"]["absl_py"] == "2.1.0"
+
+
+def test_add_mcs_reports_created_cards_when_versioning_fails(monkeypatch):
+    from ingester import neo4j_ingester
+
+    def card(name):
+        model_card = load_json("tensorflow_titanic_MC.json")
+        model_card.update(name=name, id=f"mc-{name}")
+        return model_card
+
+    provider = MagicMock()
+    provider.name = "local"
+    monkeypatch.setattr(neo4j_ingester, "get_embedding_provider", lambda: provider)
+    monkeypatch.setattr(neo4j_ingester, "embed_model_cards", lambda model_cards: [[1.0, 0.0] for _ in model_cards])
+    ingester = neo4j_ingester.MCIngester("bolt://localhost:7687", "neo4j", "password", True)
+    ingester.db = FakeBatchDB({})
+    versioned = []
+
+    def failing_versioning(model_cards):
+        versioned.append([mc["id"] for mc in model_cards])
+        raise RuntimeError("vector index unavailable")
+
+    monkeypatch.setattr(ingester, "_infer_versioning", failing_versioning)
+    notified = []
+    ingester.add_listener(lambda mc_id, model_card: notified.append(mc_id))
+    ingester.add_listener(lambda mc_id, model_card: 1 / 0)
+
+    results = ingester.add_mcs([card("a"), card("b"), card("c")], chunk_size=2)
+
+    assert [(r["status"], r["model_card_id"]) for r in results] == [
+        ("created", "mc-a"), ("created", "mc-b"), ("created", "mc-c")]
+    # later chunks are still written and versioned
+    assert ingester.db.batches == [["mc-a", "mc-b"], ["mc-c"]]
+    assert versioned == [["mc-a", "mc-b"], ["mc-c"]]
+    assert notified == ["mc-a", "mc-b", "mc-c"]
+
+
+class FakeEmbedDB:
+    """GraphDB stand-in for the embedding backfill; the write of batch number `fail_on` fails once."""
+
+    def __init__(self, mc_ids, fail_on=None):
+        self.stale = {mc_id: f"hash-{mc_id}" for mc_id in mc_ids}
+        self.fail_on = fail_on
+        self.writes = []
+        self.versioned = []
+        self.families = []
+
+    def get_mcs_to_embed(self, embedding_model, after="", limit=500):
+        return [{"id": mc_id, "content_hash": content_hash, "short_description": mc_id}
+                for mc_id, content_hash in sorted(self.stale.items()) if mc_id > after][:limit]
+
+    def set_embeddings(self, rows, embedding_model):
+        if len(self.writes) + 1 == self.fail_on:
+            self.fail_on = None
+            raise RuntimeError("write failed")
+        self.writes.append((rows, embedding_model))
+        for row in rows:
+            del self.stale[row["id"]]
+
+    def infer_versioning_many(self, mc_ids):
+        self.versioned.append(mc_ids)
+        return {mc_id: [{"model_id": "mc-1"}] if mc_id == "mc-3" else [] for mc_id in mc_ids}
+
+    def assign_families(self, mc_ids):
+        self.families.append(mc_ids)
+
+
+def test_get_mcs_to_embed_treats_untagged_embeddings_as_legacy_model(client, monkeypatch):
+    from rest_server import server
+    from ingester.database import LEGACY_EMBEDDING_MODEL
+
+    session = FakeSearchSession([{"id": "mc-1"}])
+    monkeypatch.setattr(server.mc_reconstructor.db, "driver", MagicMock(session=lambda: session))
+
+    assert server.mc_reconstructor.db.get_mcs_to_embed("local", "mc-0", 10) == [{"id": "mc-1"}]
+    query, params = session.calls[0]
+    assert "coalesce(mc.embedding_model, $legacy_model) <> $embedding_model" in query
+    assert params["legacy_model"] == LEGACY_EMBEDDING_MODEL == "text-embedding-3-small"
+    assert (params["embedding_model"], params["after"], params["limit"]) == ("local", "mc-0", 10)
+
+
+def test_embedding_backfill_resumes_from_checkpoint(monkeypatch, tmp_path):
+    from ingester import embedding_backfill
+
+    provider = MagicMock()
+    provider.name = "local"
+    monkeypatch.setattr(embedding_backfill, "get_embedding_provider", lambda: provider)
+    monkeypatch.setattr(embedding_backfill, "embed_texts", lambda texts: [[float(len(text))] for text in texts])
+    checkpoint_path = str(tmp_path / "backfill.json")
+    db = FakeEmbedDB(["mc-1", "mc-2", "mc-3", "mc-4", "mc-5"], fail_on=2)
+
+    with pytest.raises(RuntimeError):
+        embedding_backfill.backfill_embeddings(db, checkpoint_path, batch_size=2)
+    with open(checkpoint_path) as file:
+        assert json.load(file)["after"] == "mc-2"
+
+    checkpoint = embedding_backfill.backfill_embeddings(db, checkpoint_path, batch_size=2)
+
+    assert (checkpoint["phase"], checkpoint["embedded"], checkpoint["versioned"]) == ("done", 5, 5)
+    # one write per batch, with the content hash each embedding was built from
+    assert [[row["id"] for row in rows] for rows, _ in db.writes] == [["mc-1", "mc-2"], ["mc-3", "mc-4"], ["mc-5"]]
+    assert db.writes[0] == ([{"id": "mc-1", "embedding": [4.0], "content_hash": "hash-mc-1"},
+                             {"id": "mc-2", "embedding": [4.0], "content_hash": "hash-mc-2"}], "local")
+    # the ids of the interrupted batch are recorded only once
+    assert db.versioned == [["mc-1", "mc-2"], ["mc-3", "mc-4"], ["mc-5"]]
+    assert db.families == [["mc-3"]]
+
+
+def test_mc_content_hash_covers_content_fields_only():
+    from ingester.database import CONTENT_HASH_FIELDS, mc_content_hash
+
+    model_card = load_json("tensorflow_titanic_MC.json")
+    reordered = dict(reversed(list(model_card.items())))
+    reordered.update(id="other-id", ai_model={}, citation="changed")
+    assert mc_content_hash(reordered) == mc_content_hash(model_card)
+    for field in CONTENT_HASH_FIELDS:
+        assert mc_content_hash(dict(model_card, **{field: "changed"})) != mc_content_hash(model_card), field
+
+
+def test_update_model_card_conflicting_with_another_card(client, monkeypatch):
+    updated = []
+    monkeypatch.setattr("ingester.database.GraphDB.check_update_mc", lambda self, metadata: "mc-1")
+    monkeypatch.setattr("ingester.database.GraphDB.update_base_mc", lambda self, mc_id, metadata: "mc-2")
+    monkeypatch.setattr("ingester.database.GraphDB.update_ai_model",
+                        lambda self, mc_id, metadata: updated.append(mc_id))
+
+    response = client.put("/modelcard/mc-1", json=load_json("tensorflow_titanic_MC.json"))
+    assert response.status_code == 409
+    assert response.get_json()["model_card_id"] == "mc-2"
+    assert updated == []
+
+
+class FakeRecord(dict):
+    def data(self):
+        return dict(self)
+
+
+class FakeHashSession:
+    """Session over an in-memory set of model cards, answering the queries of backfill_content_hashes."""
+
+    def __init__(self, cards):
+        self.cards = cards
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, after=None, batch_size=None, hashes=None, rows=None):
+        if "IS NULL" in query:
+            unhashed = sorted((card for card in self.cards if card.get("content_hash") is None),
+                              key=lambda card: card["id"])
+            return [FakeRecord({key: value for key, value in card.items() if key != "content_hash"})
+                    for card in unhashed if card["id"] > after][:batch_size]
+        if hashes is not None:
+            return [FakeRecord(hash=card["content_hash"]) for card in self.cards if card.get("content_hash") in hashes]
+        for row in rows:
+            next(card for card in self.cards if card["id"] == row["id"])["content_hash"] = row["content_hash"]
+        return MagicMock()
+
+    def execute_write(self, work):
+        return work(self)
+
+
+def test_backfill_content_hashes_skips_duplicates(monkeypatch):
+    from ingester.database import GraphDB, mc_content_hash
+
+    def card(mc_id, name):
+        return {"id": mc_id, "name": name, "version": "1", "short_description": "", "full_description": "",
+                "keywords": "", "author": "lab", "input_data": "", "output_data": "", "input_type": "image",
+                "category": "classification"}
+
+    stored = card("mc-0", "stored")
+    stored["content_hash"] = mc_content_hash(stored)
+    cards = [stored, card("mc-1", "stored"), card("mc-2", "new"), card("mc-3", "new"), card("mc-4", "other")]
+    db = GraphDB("bolt://localhost:7687", "neo4j", "password")
+    monkeypatch.setattr(db, "driver", MagicMock(session=lambda: FakeHashSession(cards)))
+
+    hashed, duplicates = db.backfill_content_hashes(batch_size=2)
+
+    assert (hashed, duplicates) == (2, ["mc-1", "mc-3"])
+    assert [c.get("content_hash") is not None for c in cards] == [True, False, True, False, True]
+
+
+def test_upload_model_card_batch_requires_array(client):
+    response = client.post("/modelcards/batch", json={"name": "not a list"})
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
 def test_update_model_card(monkeypatch):
     data = load_json("tesorflow_adult_nn_MC.json")
     dummy = dummy_response(200, {"message": "Successfully updated the model card", "model_card_id": "dummy_id"})
@@ -95,6 +360,141 @@ def test_download_model_card(monkeypatch):
     assert "external_id" in response.json()
 
 
+def dummy_model_card_record(mc_id):
+    return {"mc_id": mc_id, "model_card": {"external_id": mc_id, "name": "Test Model", "embedding": [0.1]},
+            "ai_model": {"model_id": f"{mc_id}-model"}, "bias_analysis": None, "xai_analysis": None,
+            "requirements": None, "datasheet": None}
+
+
+def test_get_model_card_maps_single_query_record(client, monkeypatch):
+    from rest_server import server
+
+    record = {
+        "mc_id": "mapped-mc",
+        "model_card": {"external_id": "mapped-mc", "name": "Test Model", "embedding": [0.1],
+                       "embedding_model": "local-hashing-v1", "embedding_updated_at": 1700000000000,
+                       "content_hash": "abc", "family_id": "mapped-mc"},
+        "ai_model": {"model_id": "mapped-mc-model", "framework": "pytorch"},
+        "bias_analysis": {"demographic_parity_diff": 0.1}, "xai_analysis": None,
+        "requirements": {"external_id": "mapped-mc-requirements", "name": "mapped-mc-requirements",
+                         "numpy": "1.24.4"},
+        "datasheet": {"external_id": "ds-1"},
+    }
+    monkeypatch.setattr("ingester.database.GraphDB.get_model_cards", lambda self, mc_ids: [record])
+    server.mc_reconstructor.invalidate("mapped-mc")
+
+    response = client.get("/modelcard/mapped-mc")
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "external_id": "mapped-mc", "name": "Test Model",
+        "ai_model": {"model_id": "mapped-mc-model", "framework": "pytorch"},
+        "bias_analysis": {"demographic_parity_diff": 0.1},
+        "model_requirements": ["numpy==1.24.4"],
+        "datasheet": {"external_id": "ds-1"},
+    }
+
+
+def test_sanitize_properties_mangles_keys():
+    from ingester.database import _requirement_properties, _sanitize_properties
+
+    assert _sanitize_properties({"Test loss": 1, "f1-score": 2, "ok_key": 3}) == \
+        {"Test_loss": 1, "f1_score": 2, "ok_key": 3}
+    assert _requirement_properties(["numpy==1.24.4", "scikit-learn==1.5.2", "torch"]) == \
+        {"numpy": "1.24.4", "scikit_learn": "1.5.2", "torch": ""}
+
+
+def test_sanitize_properties_disambiguates_colliding_keys():
+    from ingester.database import _sanitize_properties
+
+    assert _sanitize_properties({"f1-score": 1, "f1 score": 2, "f1_score": 3}) == \
+        {"f1_score": 1, "f1_score_2": 2, "f1_score_3": 3}
+
+
+def test_get_model_card_etag_not_modified(client, monkeypatch):
+    calls = []
+
+    def fake_get_model_cards(self, mc_ids):
+        calls.append(mc_ids)
+        return [dummy_model_card_record(mc_id) for mc_id in mc_ids]
+
+    monkeypatch.setattr("ingester.database.GraphDB.get_model_cards", fake_get_model_cards)
+    response = client.get("/modelcard/etag-test-mc")
+    assert response.status_code == 200
+    assert "embedding" not in response.get_json()
+    etag = response.headers["ETag"]
+
+    cached = client.get("/modelcard/etag-test-mc", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert len(calls) == 1
+
+
+def test_model_card_cache_invalidated_on_update(client, monkeypatch):
+    from rest_server.server import mc_ingester
+    calls = []
+
+    def fake_get_model_cards(self, mc_ids):
+        calls.append(mc_ids)
+        return [dummy_model_card_record(mc_id) for mc_id in mc_ids]
+
+    monkeypatch.setattr("ingester.database.GraphDB.get_model_cards", fake_get_model_cards)
+    client.get("/modelcard/invalidate-test-mc")
+    client.get("/modelcard/invalidate-test-mc")
+    assert len(calls) == 1
+
+    mc_ingester._notify("invalidate-test-mc")
+    client.get("/modelcard/invalidate-test-mc")
+    assert len(calls) == 2
+
+
+def test_linkset_uses_link_projection(client, monkeypatch):
+    calls = []
+
+    def fake_get_link_fields(self, mc_id):
+        calls.append(mc_id)
+        return {"external_id": mc_id, "author": "jdoe", "input_data": "https://example.com/data",
+                "ai_model": {"location": "https://example.com/model", "inference_labels": None}}
+
+    monkeypatch.setattr("ingester.database.GraphDB.get_link_fields", fake_get_link_fields)
+    response = client.head("/modelcard/linkset-test-mc")
+    assert response.status_code == 200
+    assert 'rel="cite-as"' in response.headers["Link"]
+    assert 'title="model_location"' in response.headers["Link"]
+
+    response = client.get("/modelcard/linkset-test-mc/linkset")
+    assert response.status_code == 200
+    assert calls == ["linkset-test-mc"]
+
+
+def test_linkset_not_found(client, monkeypatch):
+    monkeypatch.setattr("ingester.database.GraphDB.get_link_fields", lambda self, mc_id: None)
+    response = client.get("/modelcard/missing-mc/linkset")
+    assert response.status_code == 404
+
+
+def test_cache_stats(client):
+    response = client.get("/cache/stats")
+    assert response.status_code == 200
+    stats = response.get_json()["model_cards"]
+    assert {"hits", "misses", "evictions", "size"} <= set(stats)
+
+
+def test_get_multiple_model_cards(client, monkeypatch):
+    model_cards = {"mc-1": {"external_id": "mc-1"}, "mc-2": {"external_id": "mc-2"}}
+    monkeypatch.setattr("reconstructor.mc_reconstructor.MCReconstructor.reconstruct_many",
+                        lambda self, ids: (model_cards, ["mc-3"]))
+    response = client.post("/modelcards/get", json={"ids": ["mc-1", "mc-2", "mc-3"]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["model_cards"] == model_cards
+    assert data["missing"] == ["mc-3"]
+
+
+def test_get_multiple_model_cards_requires_ids(client):
+    response = client.post("/modelcards/get", json={"ids": "mc-1"})
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
 def test_download_url(monkeypatch):
     model_id = "dummy_model_id-model"
     dummy = dummy_response(200, {"download_url": "http://dummy-download-url"})
@@ -112,6 +512,809 @@ def test_list_models(monkeypatch):
     assert isinstance(response.json(), list)
 
 
+class FakeEmbeddingClient:
+    def __init__(self):
+        self.calls = 0
+        self.embeddings = self
+
+    def create(self, input, model, encoding_format, dimensions):
+        self.calls += 1
+        return MagicMock(data=[MagicMock(embedding=[0.5] * dimensions)])
+
+
+def test_embedding_cache_reuses_embeddings(client, monkeypatch, tmp_path):
+    from ingester import graph_embedder
+    from ingester.embedding_cache import EmbeddingCache
+
+    monkeypatch.setattr(graph_embedder, "embedding_cache", EmbeddingCache(str(tmp_path / "embeddings.db")))
+    fake_client = FakeEmbeddingClient()
+    model_card = {"author": "a", "short_description": "s", "version": "1"}
+
+    first = graph_embedder.open_ai_embedding(model_card, fake_client)
+    second = graph_embedder.open_ai_embedding(dict(model_card), fake_client)
+    assert first == second == [0.5] * graph_embedder.EMBEDDING_DIMENSIONS
+    assert fake_client.calls == 1
+
+    stats = client.get("/cache/stats").get_json()["embeddings"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+
+def test_embedding_cache_evicts_least_recently_used_in_batches(tmp_path):
+    from ingester.embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"), max_entries=4, evict_to=0.5, touch_batch_size=100)
+    cache.set_many({"a": [1.0], "b": [2.0], "c": [3.0], "d": [4.0]})
+    # the touch is only buffered, and written before the eviction
+    assert cache.get("a") == [1.0]
+    cache.set("e", [5.0])
+
+    assert cache.evictions == 3
+    assert cache.stats()["size"] == 2
+    assert cache.get_many(["a", "b", "c", "d", "e"]) == [[1.0], None, None, None, [5.0]]
+    # the count is read back from the database when it is reopened
+    reopened = EmbeddingCache(cache.path)
+    assert reopened.get("e") == [5.0] and reopened.stats()["size"] == 2
+
+
+def test_local_embedding_provider():
+    from ingester.graph_embedder import LocalEmbeddingProvider
+
+    provider = LocalEmbeddingProvider()
+    resnet, resnet_v2, bert = provider.embed(["resnet image classification on imagenet",
+                                              "resnet image classification on imagenet v2",
+                                              "bert language model for question answering"])
+    assert len(resnet) == 300
+    assert abs(sum(x * x for x in resnet) - 1.0) < 1e-9
+    similarity = lambda a, b: sum(x * y for x, y in zip(a, b))
+    assert similarity(resnet, resnet_v2) > similarity(resnet, bert)
+    assert provider.embed(["resnet image classification on imagenet"])[0] == resnet
+
+
+class FlakyEmbeddingProvider:
+    name = "flaky"
+    dimensions = 2
+
+    def __init__(self):
+        self.requests = []
+
+    def embed(self, texts):
+        self.requests.append(list(texts))
+        if len(self.requests) == 1:
+            raise RuntimeError("rate limited")
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def is_retryable(self, error):
+        return True
+
+
+def test_embed_texts_batches_in_order(monkeypatch):
+    from ingester import graph_embedder
+
+    monkeypatch.setattr(graph_embedder, "embedding_cache", None)
+    monkeypatch.setattr(graph_embedder.time, "sleep", lambda seconds: None)
+    provider = FlakyEmbeddingProvider()
+    texts = ["a", "bbb", "cc", "a", "dddd"]
+
+    embeddings = graph_embedder.embed_texts(texts, provider, batch_size=2, max_workers=2)
+    assert embeddings == [[1.0, 1.0], [3.0, 1.0], [2.0, 1.0], [1.0, 1.0], [4.0, 1.0]]
+    # four distinct texts in two batches, one of which was retried
+    assert len(provider.requests) == 3
+    assert all(len(batch) <= 2 for batch in provider.requests)
+
+
+class FakeEmbeddingDB:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def get_embeddings(self, since=None, batch_size=1000):
+        rows = [{"id": mc_id, "embedding": embedding, "updated_at": updated_at}
+                for mc_id, (embedding, updated_at) in sorted(self.embeddings.items())
+                if since is None or updated_at >= since]
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+    def get_embedded_mc_ids(self):
+        return iter(self.embeddings)
+
+
+def test_similarity_engine_search_and_sync():
+    from ingester.similarity_engine import SimilarityEngine, SYNC_MARGIN_MS
+
+    db = FakeEmbeddingDB({"a": ([1.0, 0.0], 1), "a2": ([0.99, 0.1], 1), "b": ([0.0, 1.0], 1)})
+    engine = SimilarityEngine(db, block_size=2)
+    engine.sync()
+    assert len(engine) == 3
+
+    matches = engine.search([1.0, 0.0], k=2, threshold=0.9, exclude="a")
+    assert [mc_id for mc_id, _ in matches] == ["a2"]
+    assert matches[0][1] == pytest.approx((1 + 0.99 / (0.99 ** 2 + 0.01) ** 0.5) / 2, rel=1e-5)
+
+    # "a2" is updated, "b" deleted and "c" added by another process
+    later = 1 + 2 * SYNC_MARGIN_MS
+    db.embeddings = {"a": ([1.0, 0.0], 1), "a2": ([0.0, 1.0], later), "c": ([-1.0, 0.0], later)}
+    engine.sync()
+    assert sorted(engine.ids) == ["a", "a2", "c"]
+    assert engine.search([1.0, 0.0], k=3, threshold=0.9, exclude="a") == []
+    assert engine.search([0.0, 1.0], k=1)[0][0] == "a2"
+
+
+def test_update_model_card_replaces_embedding_in_similarity_engine(monkeypatch):
+    from ingester import neo4j_ingester
+    from ingester.database import mc_content_hash
+    from ingester.similarity_engine import SimilarityEngine
+
+    engine = SimilarityEngine(FakeEmbeddingDB({}))
+    engine.upsert({"mc-1": [1.0, 0.0]})
+    ingester = neo4j_ingester.MCIngester("bolt://localhost:7687", "neo4j", "password", True, engine)
+    ingester.db = MagicMock()
+    ingester.db.check_update_mc.return_value = "mc-1"
+    ingester.db.update_base_mc.return_value = None
+    provider = MagicMock()
+    provider.name = "local"
+    monkeypatch.setattr(neo4j_ingester, "get_embedding_provider", lambda: provider)
+    monkeypatch.setattr(neo4j_ingester, "embed_model_versioning", lambda model_card: [0.0, 2.0])
+    model_card = load_json("tensorflow_titanic_MC.json")
+
+    assert ingester.update_mc(model_card) == "mc-1"
+
+    ingester.db.set_embeddings.assert_called_once_with(
+        [{"id": "mc-1", "embedding": [0.0, 2.0], "content_hash": mc_content_hash(model_card)}], "local")
+    assert engine.get("mc-1").tolist() == [0.0, 1.0]
+
+
+def test_versioning_catches_up_with_other_writers():
+    from ingester.neo4j_ingester import MCIngester
+    from ingester.similarity_engine import SimilarityEngine, SYNC_MARGIN_MS
+
+    db = FakeEmbeddingDB({"a": ([1.0, 0.0], 1)})
+    engine = SimilarityEngine(db)
+    engine.sync()
+    # written by another process after the last sync
+    db.embeddings["b"] = ([0.0, 1.0], 1 + 2 * SYNC_MARGIN_MS)
+    db.merge_revisions = MagicMock()
+    db.assign_families = MagicMock()
+    ingester = MCIngester("bolt://localhost:7687", "neo4j", "password", True, engine)
+    ingester.db = db
+
+    ingester._infer_versioning([{"id": "b2", "embedding": [0.01, 1.0]}])
+
+    db.merge_revisions.assert_called_once()
+    assert [(r["mc_id"], r["model_id"]) for r in db.merge_revisions.call_args[0][0]] == [("b2", "b")]
+    assert engine.watermark == 1 + 2 * SYNC_MARGIN_MS
+
+    # the vector index is used when the engine cannot catch up
+    db.get_embeddings = MagicMock(side_effect=RuntimeError("unavailable"))
+    db.infer_versioning_many = MagicMock(return_value={"c": []})
+    ingester._infer_versioning([{"id": "c", "embedding": [1.0, 0.0]}])
+    db.infer_versioning_many.assert_called_once_with(["c"], max_nodes=1000)
+
+
+def test_lsh_index_finds_near_duplicates(tmp_path):
+    import numpy as np
+    from ingester.lsh_index import LSHIndex
+
+    rng = np.random.default_rng(7)
+    originals = rng.standard_normal((200, 32))
+    revisions = originals + 0.05 * rng.standard_normal((200, 32))
+    embeddings = {f"mc-{i}": vector for i, vector in enumerate(originals)}
+    embeddings.update({f"mc-{i}-v2": vector for i, vector in enumerate(revisions)})
+
+    path = str(tmp_path / "lsh.npz")
+    index = LSHIndex(FakeEmbeddingDB({}), bands=20, rows=8, path=path)
+    index.upsert(embeddings)
+    report = index.evaluate(threshold=0.95, sample_size=100)
+    assert report["precision"] == 1.0
+    assert report["recall"] >= 0.95
+    assert report["mean_candidates"] < len(index) / 4
+
+    index.remove(["mc-0-v2"])
+    assert [mc_id for mc_id, _ in index.search(originals[0], threshold=0.95, exclude="mc-0")] == []
+
+    index.watermark = 1
+    index.save()
+    restored = LSHIndex(FakeEmbeddingDB({}), bands=20, rows=8, path=path)
+    assert len(restored) == len(index)
+    assert restored.watermark == 1
+    assert restored.search(originals[1], threshold=0.95, exclude="mc-1")[0][0] == "mc-1-v2"
+
+
+def test_lsh_index_saves_only_changed_syncs(monkeypatch, tmp_path):
+    from ingester.lsh_index import LSHIndex
+    from ingester.similarity_engine import SYNC_MARGIN_MS
+
+    db = FakeEmbeddingDB({"a": ([1.0, 0.0], 1), "b": ([0.0, 1.0], 1)})
+    index = LSHIndex(db, bands=4, rows=4, path=str(tmp_path / "lsh.npz"))
+    saves = []
+    save = index.save
+    monkeypatch.setattr(index, "save", lambda: saves.append(len(index)) or save())
+
+    index.sync()
+    # the sync margin reads "a" and "b" again, unchanged
+    index.sync()
+    assert saves == [2]
+
+    db.embeddings["a"] = ([0.6, 0.8], 1 + 2 * SYNC_MARGIN_MS)
+    index.sync()
+    del db.embeddings["b"]
+    index.sync()
+    assert saves == [2, 2, 1]
+    assert not index.dirty
+    # saves go through a temporary file of their own, removed by the rename
+    assert os.listdir(tmp_path) == ["lsh.npz"]
+
+
+def test_semantic_search_caches_embeddings_and_results(client, monkeypatch):
+    from rest_server import server
+    from ingester import graph_embedder
+
+    embed_calls, search_calls = [], []
+    monkeypatch.setattr(server, "ENABLE_MC_SIMILARITY", True)
+    monkeypatch.setattr(server.mc_reconstructor, "similarity_engine", None)
+    monkeypatch.setattr(graph_embedder, "embed_text", lambda text: embed_calls.append(text) or [0.1, 0.2])
+
+    def fake_rag_search(self, embedded_query, threshold=0.80, max_nodes=5):
+        search_calls.append((embedded_query, threshold, max_nodes))
+        return [{"model_id": "mc-1", "name": "resnet", "version": "1", "short_description": "cnn", "score": 0.91}]
+
+    monkeypatch.setattr("ingester.database.GraphDB.rag_search", fake_rag_search)
+    server.mc_reconstructor.search_cache.clear()
+    server.mc_reconstructor.query_embedding_cache.clear()
+
+    response = client.get("/modelcards/semantic?q=Image%20classifier&limit=3")
+    assert response.status_code == 200
+    assert response.get_json() == [{"mc_id": "mc-1", "name": "resnet", "version": "1",
+                                    "short_description": "cnn", "score": 0.91}]
+    assert client.get("/modelcards/semantic?q=image  classifier&limit=3").get_json() == response.get_json()
+    assert embed_calls == ["image classifier"]
+    assert search_calls == [([0.1, 0.2], 0.80, 3)]
+
+    server.mc_reconstructor.on_model_card_write("mc-2")
+    client.get("/modelcards/semantic?q=image classifier&limit=3")
+    assert len(embed_calls) == 1
+    assert len(search_calls) == 2
+
+
+def test_search_results_cached_until_write(client, monkeypatch):
+    from rest_server import server
+
+    calls = []
+
+    def fake_full_text_search(self, prompt, *args):
+        calls.append(prompt)
+        return [{"mc_id": "mc-1", "name": "resnet", "version": "1", "short_description": "", "score": 1.0,
+                 "family_id": "mc-1"}]
+
+    monkeypatch.setattr("ingester.database.GraphDB.full_text_search", fake_full_text_search)
+    server.mc_reconstructor.search_cache.clear()
+
+    first = client.get("/modelcards/search?q=resnet%20 image").get_json()
+    assert client.get("/modelcards/search?q=resnet image").get_json() == first
+    assert calls == ["resnet  image"]
+
+    server.mc_reconstructor.on_model_card_write("mc-2")
+    client.get("/modelcards/search?q=resnet image")
+    assert len(calls) == 2
+
+    stats = client.get("/cache/stats").get_json()["search"]
+    assert stats["generation"] == server.mc_reconstructor.catalogue_generation
+    assert stats["hits"] >= 1
+    assert stats["mean_hit_ms"] is not None and stats["mean_miss_ms"] is not None
+
+
+def test_hybrid_search_fuses_rankings(client, monkeypatch):
+    from rest_server import server
+    from ingester import graph_embedder
+
+    def hit(mc_id, score):
+        return {"mc_id": mc_id, "name": mc_id, "version": "1", "short_description": "", "score": score}
+
+    monkeypatch.setattr(graph_embedder, "ENABLE_MC_SIMILARITY", True)
+    monkeypatch.setattr("ingester.database.GraphDB.full_text_search",
+                        lambda self, prompt, *args: [hit("a", 5.0), hit("b", 4.0), hit("c", 3.0)])
+    monkeypatch.setattr(server.mc_reconstructor, "semantic_search",
+                        lambda query, limit, threshold: [hit("c", 0.9), hit("d", 0.8), hit("a", 0.7)])
+    server.mc_reconstructor.search_cache.clear()
+
+    response = client.get("/modelcards/search?q=vision&mode=hybrid&limit=2")
+    assert response.status_code == 200
+    results = response.get_json()
+    assert [r["mc_id"] for r in results] == ["a", "c"]
+    assert results[0]["scores"] == {"fulltext": 5.0, "vector": 0.7}
+    assert results[0]["score"] == pytest.approx(1 / 61 + 1 / 63)
+
+    page = client.get("/modelcards/search?q=vision&mode=hybrid&limit=2&offset=2").get_json()
+    assert [r["mc_id"] for r in page] == ["b", "d"]
+    assert page[0]["scores"] == {"fulltext": 4.0, "vector": None}
+
+
+def test_hybrid_search_escapes_query_and_rejects_fulltext_options(client, monkeypatch):
+    from rest_server import server
+    from ingester import graph_embedder
+
+    prompts = []
+    monkeypatch.setattr(graph_embedder, "ENABLE_MC_SIMILARITY", False)
+    monkeypatch.setattr("ingester.database.GraphDB.full_text_search",
+                        lambda self, prompt, *args: prompts.append(prompt) or [])
+    server.mc_reconstructor.search_cache.clear()
+
+    response = client.get("/modelcards/search", query_string={"q": 'resnet (v2) "image:net', "mode": "hybrid"})
+    assert response.status_code == 200
+    assert prompts == ['resnet \\(v2\\) \\"image\\:net']
+
+    for arg in ("boost=name:2", "match=fuzzy", "fields=author", "collapse=family"):
+        response = client.get(f"/modelcards/search?q=vision&mode=hybrid&{arg}")
+        assert response.status_code == 400
+        assert arg.split("=")[0] in response.get_json()["error"]
+    assert len(prompts) == 1
+
+
+def test_search_rejects_blank_query(client, monkeypatch):
+    searched = []
+    monkeypatch.setattr("ingester.database.GraphDB.full_text_search", lambda self, *args: searched.append(args))
+    for query in ("q=%20%20&boost=name:3", "q=%20&mode=hybrid", "q=%09"):
+        response = client.get(f"/modelcards/search?{query}")
+        assert response.status_code == 400
+        assert response.get_json() == {"error": "Query (q) is required"}
+    assert searched == []
+
+
+def test_semantic_search_requires_similarity(client, monkeypatch):
+    from rest_server import server
+
+    monkeypatch.setattr(server, "ENABLE_MC_SIMILARITY", False)
+    assert client.get("/modelcards/semantic?q=anything").status_code == 503
+
+
+def test_model_card_family(client, monkeypatch):
+    members = [{"family_id": "mc-1", "mc_id": mc_id, "name": "m", "version": version, "short_description": ""}
+               for mc_id, version in (("mc-1", "1"), ("mc-2", "2"))]
+    monkeypatch.setattr("ingester.database.GraphDB.get_family",
+                        lambda self, mc_id: members if mc_id in ("mc-1", "mc-2") else [])
+    response = client.get("/modelcard/mc-2/family")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["family_id"] == "mc-1"
+    assert [mc["mc_id"] for mc in body["model_cards"]] == ["mc-1", "mc-2"]
+    assert client.get("/modelcard/unknown/family").status_code == 404
+
+
+def test_search_pushes_paging_boosts_and_fields_down(client, monkeypatch):
+    calls = []
+
+    def fake_full_text_search(self, prompt, max_nodes=10, offset=0, boosts=None, match=None, fields=None):
+        calls.append((prompt, max_nodes, offset, boosts, match, fields))
+        return [{"mc_id": "mc-1", "name": "resnet", "author": "lab", "score": 1.0, "family_id": "mc-1"}]
+
+    monkeypatch.setattr("ingester.database.GraphDB.full_text_search", fake_full_text_search)
+    response = client.get("/modelcards/search?q=resnt&limit=20&offset=40&boost=name:3&match=fuzzy&fields=name,author")
+    assert response.status_code == 200
+    assert response.get_json() == [{"mc_id": "mc-1", "name": "resnet", "author": "lab", "score": 1.0}]
+    assert calls == [("resnt", 20, 40, {"name": 3.0}, "fuzzy", ["name", "author"])]
+
+    assert client.get("/modelcards/search?q=resnet&fields=embedding").status_code == 400
+    assert client.get("/modelcards/search?q=resnet&boost=name").status_code == 400
+    assert client.get("/modelcards/search?q=resnet&match=regex").status_code == 400
+
+
+def test_lucene_query_escapes_and_boosts_terms():
+    from ingester.database import lucene_query
+
+    assert lucene_query("name:res*") == "name:res*"
+    assert lucene_query("res-net v2", match="prefix") == "res\\-net* v2*"
+    assert lucene_query("resnet", {"name": 3}).startswith("name:(resnet)^3 short_description:(resnet)^1")
+
+
+def test_suggest_served_from_prefix_index(client, monkeypatch):
+    from rest_server import server
+    from reconstructor.suggest_index import SuggestIndex
+
+    loads = []
+
+    def fake_get_suggest_terms(self, mc_ids=None):
+        loads.append(mc_ids)
+        return [{"id": "mc-1", "name": "ResNet-50", "author": "Vision Lab", "keywords": "image, resnet"},
+                {"id": "mc-2", "name": "ResNet-152", "author": "Vision Lab", "keywords": "image"}]
+
+    monkeypatch.setattr("ingester.database.GraphDB.get_suggest_terms", fake_get_suggest_terms)
+    monkeypatch.setattr(server.mc_reconstructor, "suggest_index",
+                        SuggestIndex(lambda mc_ids: server.mc_reconstructor.db.get_suggest_terms(mc_ids)))
+
+    response = client.get("/modelcards/suggest?prefix=res")
+    assert response.status_code == 200
+    assert [(s["text"], s["field"], s["mc_ids"]) for s in response.get_json()] == [
+        ("resnet", "keywords", ["mc-1"]), ("ResNet-152", "name", ["mc-2"]), ("ResNet-50", "name", ["mc-1"])]
+    assert client.get("/modelcards/suggest?prefix=vision&field=author").get_json()[0]["count"] == 2
+
+    server.mc_reconstructor.on_model_card_write("mc-3", {"name": "RegNet", "author": "Vision Lab", "keywords": ""})
+    server.mc_reconstructor.on_model_card_write("mc-2", {"name": "ResNet-152", "author": "", "keywords": ""})
+    assert [s["text"] for s in client.get("/modelcards/suggest?prefix=re&field=name").get_json()] == [
+        "RegNet", "ResNet-152", "ResNet-50"]
+    assert client.get("/modelcards/suggest?prefix=vision").get_json()[0]["mc_ids"] == ["mc-1", "mc-3"]
+    assert loads == [None]
+
+    assert client.get("/modelcards/suggest").status_code == 400
+    assert client.get("/modelcards/suggest?prefix=r&field=version").status_code == 400
+
+
+def test_facets_counted_in_memory(client, monkeypatch):
+    from rest_server import server
+    from reconstructor.facet_index import FacetIndex
+
+    loads = []
+
+    def fake_get_facet_values(self, mc_ids=None):
+        loads.append(mc_ids)
+        return [{"id": "mc-1", "categories": "classification", "input_type": "image", "author": "lab",
+                 "framework": "pytorch", "license": "MIT"},
+                {"id": "mc-2", "categories": "classification", "input_type": "text", "author": "lab",
+                 "framework": "tensorflow", "license": None}]
+
+    monkeypatch.setattr("ingester.database.GraphDB.get_facet_values", fake_get_facet_values)
+    monkeypatch.setattr("ingester.database.GraphDB.full_text_search_ids", lambda self, prompt: ["mc-2", "mc-3"])
+    monkeypatch.setattr(server.mc_reconstructor, "facet_index",
+                        FacetIndex(lambda mc_ids: server.mc_reconstructor.db.get_facet_values(mc_ids)))
+    server.mc_reconstructor.search_cache.clear()
+
+    response = client.get("/modelcards/facets")
+    assert response.status_code == 200
+    facets = response.get_json()
+    assert facets["total"] == 2
+    assert facets["facets"]["categories"] == [{"value": "classification", "count": 2}]
+    assert facets["facets"]["license"] == [{"value": "MIT", "count": 1}]
+
+    server.mc_reconstructor.on_model_card_write("mc-3", {"category": "detection", "input_type": "image",
+                                                         "author": "lab", "ai_model": {"framework": "pytorch"}})
+    facets = client.get("/modelcards/facets?size=1").get_json()
+    assert facets["total"] == 3
+    assert facets["facets"]["framework"] == [{"value": "pytorch", "count": 2}]
+    assert facets["facets"]["author"] == [{"value": "lab", "count": 3}]
+    assert loads == [None]
+
+    # every match of the query is counted
+    filtered = client.get("/modelcards/facets?q=bert").get_json()
+    assert filtered["total"] == 2
+    assert sorted(filtered["facets"]["input_type"], key=lambda value: value["value"]) == [
+        {"value": "image", "count": 1}, {"value": "text", "count": 1}]
+    assert client.get("/modelcards/facets?size=0").status_code == 400
+
+
+def test_suggest_index_refresh_picks_up_other_writers():
+    from reconstructor.suggest_index import SuggestIndex
+
+    rows = [{"id": "mc-1", "name": "resnet"}]
+    writes = []
+
+    def loader(mc_ids):
+        for row in list(rows):
+            # a model card written by this process while the rebuild loads
+            while writes:
+                mc_id, model_card = writes.pop()
+                rows.append(dict(model_card, id=mc_id))
+                index.update(mc_id, model_card)
+            yield row
+
+    index = SuggestIndex(loader)
+    stop = index.start_refresh(0.05)
+    try:
+        for _ in range(100):
+            if index.built:
+                break
+            time.sleep(0.01)
+        assert [s["text"] for s in index.suggest("res")] == ["resnet"]
+
+        # written by another process, and by this one during the rebuild
+        rows.append({"id": "mc-2", "name": "resnext"})
+        writes.append(("mc-3", {"name": "resnet-v2"}))
+        for _ in range(100):
+            if len(index) == 3:
+                break
+            time.sleep(0.01)
+        assert [s["text"] for s in index.suggest("res")] == ["resnet", "resnet-v2", "resnext"]
+    finally:
+        stop.set()
+
+
+def test_facet_index_refresh_counts_other_writers():
+    from reconstructor.facet_index import FacetIndex
+
+    rows = [{"id": "mc-1", "author": "lab"}]
+    writes = []
+
+    def loader(mc_ids):
+        for row in list(rows):
+            # a model card written by this process while the rebuild loads
+            while writes:
+                mc_id, model_card = writes.pop()
+                rows.append(dict(model_card, id=mc_id))
+                index.update(mc_id, model_card)
+            yield row
+
+    index = FacetIndex(loader)
+    stop = index.start_refresh(0.05)
+    try:
+        for _ in range(100):
+            if index.built:
+                break
+            time.sleep(0.01)
+        assert index.facets()["total"] == 1
+
+        # written by another process, and by this one during the rebuild
+        rows.append({"id": "mc-2", "author": "other"})
+        writes.append(("mc-3", {"author": "lab"}))
+        for _ in range(100):
+            if len(index) == 3:
+                break
+            time.sleep(0.01)
+        facets = index.facets()
+        assert facets["total"] == 3
+        assert facets["facets"]["author"] == [{"value": "lab", "count": 2}, {"value": "other", "count": 1}]
+    finally:
+        stop.set()
+
+
+class FakeSearchSession:
+    """Session recording the full-text queries it runs and answering them with fixed records."""
+
+    def __init__(self, records):
+        self.records = records
+        self.calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        self.calls.append((query, params))
+        return [FakeRecord(record) for record in self.records]
+
+
+def test_search_collapses_families(client, monkeypatch):
+    from rest_server import server
+
+    records = [{"mc_id": mc_id, "score": score, "family_id": family_id, "family_hits": hits,
+                "values": [mc_id, "1", ""]}
+               for mc_id, family_id, score, hits in (("a2", "a", 3.0, 2), ("c", "c", 1.0, 1))]
+    session = FakeSearchSession(records)
+    monkeypatch.setattr(server.mc_reconstructor.db, "driver", MagicMock(session=lambda: session))
+    server.mc_reconstructor.search_cache.clear()
+
+    response = client.get("/modelcards/search?q=model&collapse=family&limit=2&offset=1")
+    assert response.status_code == 200
+    results = response.get_json()
+    assert [(r["mc_id"], r["family_id"], r["family_hits"]) for r in results] == [("a2", "a", 2), ("c", "c", 1)]
+    # families are collapsed and paged in the query, not over-fetched
+    query, params = session.calls[0]
+    assert "collect(node)" in query and "family_hits" in query
+    assert (params["offset"], params["num_nodes"], params["prompt"]) == (1, 2, "model")
+
+
+def test_family_clustering_merges_components():
+    from ingester.family_clustering import cluster_families
+
+    db = MagicMock()
+    db.get_mc_families.return_value = iter([{"id": "a", "family_id": "a"}, {"id": "b", "family_id": "b"},
+                                            {"id": "c", "family_id": "b"}, {"id": "d", "family_id": None}])
+    db.get_revision_pairs.return_value = iter([{"mc_id": "b", "model_id": "c", "score": 0.97},
+                                               {"mc_id": "a", "model_id": "c", "score": 0.96}])
+    summary = cluster_families(db)
+    assert summary == {"model_cards": 4, "families": 2, "updated": 3}
+    db.set_families.assert_called_once_with([{"id": "b", "family_id": "a"}, {"id": "c", "family_id": "a"},
+                                             {"id": "d", "family_id": "d"}])
+
+
+def test_reversioning_applies_only_the_difference():
+    from ingester.reversioning import reversion
+
+    db = FakeEmbeddingDB({"a": ([1.0, 0.0], 1), "a2": ([0.99, 0.1], 1), "a3": ([0.98, 0.15], 1),
+                          "b": ([0.0, 1.0], 1)})
+    db.get_revision_pairs = lambda: iter([{"mc_id": "a", "model_id": "b", "score": 0.97},
+                                          {"mc_id": "a", "model_id": "a2", "score": None}])
+    db.merge_revisions = MagicMock()
+    db.delete_revisions = MagicMock()
+    db.get_mc_families = lambda: iter([{"id": mc_id, "family_id": mc_id} for mc_id in db.embeddings])
+    db.set_families = MagicMock()
+
+    summary = reversion(db, threshold=0.95, block_size=2)
+    assert summary["inferred"] == 3
+    merged = db.merge_revisions.call_args[0][0]
+    assert sorted((edge["mc_id"], edge["model_id"]) for edge in merged) == [("a", "a2"), ("a", "a3"), ("a2", "a3")]
+    db.delete_revisions.assert_called_once_with([{"mc_id": "a", "model_id": "b", "score": 0.97}])
+    # families are recomputed from the edges read back from the graph
+    assert summary["families_updated"] == 2
+    db.set_families.assert_called_once_with([{"id": "a2", "family_id": "a"}, {"id": "b", "family_id": "a"}])
+
+    db.merge_revisions.reset_mock()
+    db.set_families.reset_mock()
+    reversion(db, threshold=0.95, dry_run=True)
+    db.merge_revisions.assert_not_called()
+    db.set_families.assert_not_called()
+
+
+def test_similarity_engine_all_pairs_below_half_threshold():
+    from ingester.similarity_engine import SimilarityEngine
+
+    engine = SimilarityEngine(FakeEmbeddingDB({}))
+    engine.upsert({"a": [1.0, 0.0], "b": [0.0, 1.0], "c": [-1.0, 0.0], "d": [0.6, 0.8]})
+    # scores on the (1 + cosine) / 2 scale: orthogonal cards score 0.5 and opposite ones 0
+    pairs = engine.all_pairs(0.4, block_size=2)
+    assert sorted(pairs) == [("a", "b"), ("a", "d"), ("b", "c"), ("b", "d")]
+    assert pairs[("a", "b")] == pytest.approx(0.5)
+
+
+class FakeBatchIngester:
+    def __init__(self):
+        self.batches = []
+
+    def add_mcs(self, model_cards):
+        self.batches.append(model_cards)
+        return [{"index": i, "status": "created", "model_card_id": mc["name"]} for i, mc in enumerate(model_cards)]
+
+
+def test_upload_model_card_async(client, monkeypatch, tmp_path):
+    from rest_server import server
+    from ingester.ingest_queue import IngestQueue
+    from ingester.neo4j_ingester import REQUIRED_MC_FIELDS
+
+    fake_ingester = FakeBatchIngester()
+    queue = IngestQueue(fake_ingester, str(tmp_path / "queue.db"), workers=1, poll_interval=0.05)
+    monkeypatch.setattr(server, "ingest_queue", queue)
+    model_card = {field: "async-mc" for field in REQUIRED_MC_FIELDS}
+    try:
+        response = client.post("/modelcard?async=true", json=model_card)
+        assert response.status_code == 202
+        job_id = response.get_json()["job_id"]
+        assert response.headers["Location"] == f"/jobs/{job_id}"
+
+        for _ in range(100):
+            job = client.get(f"/jobs/{job_id}").get_json()
+            if job["status"] == "done":
+                break
+            time.sleep(0.05)
+        assert job["status"] == "done"
+        assert job["model_card_id"] == "async-mc"
+        assert fake_ingester.batches == [[model_card]]
+    finally:
+        queue.stop()
+
+
+def wait_for_job(queue, job_id, status="done"):
+    for _ in range(100):
+        job = queue.get_job(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.05)
+    return job
+
+
+def test_ingest_queue_resumes_jobs_on_start(tmp_path):
+    from ingester.ingest_queue import IngestQueue
+
+    path = str(tmp_path / "queue.db")
+    stopped = IngestQueue(FakeBatchIngester(), path, workers=0)
+    job_id = stopped.enqueue({"name": "queued-before-restart"})
+    stopped.stop()
+
+    fake_ingester = FakeBatchIngester()
+    queue = IngestQueue(fake_ingester, path, workers=1, poll_interval=0.05)
+    queue.start()
+    try:
+        assert wait_for_job(queue, job_id)["status"] == "done"
+        assert fake_ingester.batches == [[{"name": "queued-before-restart"}]]
+    finally:
+        queue.stop()
+
+
+def test_ingest_queue_worker_survives_failed_finish(tmp_path):
+    from ingester.ingest_queue import IngestQueue
+
+    queue = IngestQueue(FakeBatchIngester(), str(tmp_path / "queue.db"), workers=1, batch_size=1,
+                        poll_interval=0.05)
+    finish = queue._finish
+    calls = []
+
+    def flaky_finish(updates):
+        calls.append(updates)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        finish(updates)
+
+    queue._finish = flaky_finish
+    try:
+        first = queue.enqueue({"name": "first"})
+        assert wait_for_job(queue, first, "running")["status"] == "running"
+        second = queue.enqueue({"name": "second"})
+        assert wait_for_job(queue, second)["status"] == "done"
+    finally:
+        queue.stop()
+
+
+def test_ingest_queue_leases_claimed_jobs(tmp_path):
+    from ingester.ingest_queue import IngestQueue
+
+    path = str(tmp_path / "queue.db")
+    first = IngestQueue(FakeBatchIngester(), path, workers=0, lease_seconds=0.2)
+    second = IngestQueue(FakeBatchIngester(), path, workers=0, lease_seconds=0.2)
+    try:
+        job_id = first.enqueue({"name": "leased"})
+        assert first._claim() == [(job_id, {"name": "leased"})]
+        # a second process sharing the queue neither re-queues nor claims the leased job
+        second.start()
+        assert second.get_job(job_id)["status"] == "running"
+        assert second._claim() == []
+
+        time.sleep(0.3)
+        assert second._claim() == [(job_id, {"name": "leased"})]
+        # the first queue lost the lease and no longer records the outcome
+        first._finish([("done", "mc-1", "created", None, job_id)])
+        assert second.get_job(job_id)["status"] == "running"
+        second._finish([("done", "mc-2", "created", None, job_id)])
+        assert second.get_job(job_id)["model_card_id"] == "mc-2"
+    finally:
+        first.stop()
+        second.stop()
+
+
+def test_upload_model_card_async_validates(client, monkeypatch, tmp_path):
+    from rest_server import server
+    from ingester.ingest_queue import IngestQueue
+
+    queue = IngestQueue(FakeBatchIngester(), str(tmp_path / "queue.db"), workers=1)
+    monkeypatch.setattr(server, "ingest_queue", queue)
+    try:
+        response = client.post("/modelcard?async=true", json={"name": "incomplete"})
+        assert response.status_code == 400
+        assert client.get("/jobs/unknown").status_code == 404
+    finally:
+        queue.stop()
+
+
+def fake_model_card_rows(limit, after):
+    ids = [f"mc-{i}" for i in range(5)]
+    return [{"mc_id": mc_id, "name": mc_id, "version": "1", "short_description": ""}
+            for mc_id in ids if mc_id > (after or "")][:limit]
+
+
+def test_list_models_keyset_pagination(client, monkeypatch):
+    monkeypatch.setattr("ingester.database.GraphDB.get_all_modelcards",
+                        lambda self, limit=1000, after=None: fake_model_card_rows(limit, after))
+    response = client.get("/modelcards?limit=2")
+    assert response.status_code == 200
+    page = response.get_json()
+    assert [mc["mc_id"] for mc in page["model_cards"]] == ["mc-0", "mc-1"]
+    assert page["next_cursor"] == "mc-1"
+    assert 'cursor=mc-1' in response.headers["Link"]
+
+    response = client.get("/modelcards?limit=2&cursor=mc-3")
+    assert response.get_json() == {"model_cards": [fake_model_card_rows(1, "mc-3")[0]], "next_cursor": None}
+    assert "Link" not in response.headers
+
+
+def test_list_models_without_paging_returns_list(client, monkeypatch):
+    monkeypatch.setattr("ingester.database.GraphDB.get_all_modelcards",
+                        lambda self, limit=1000, after=None: fake_model_card_rows(limit, after))
+    response = client.get("/modelcards")
+    assert [mc["mc_id"] for mc in response.get_json()] == ["mc-0", "mc-1", "mc-2", "mc-3", "mc-4"]
+
+
+def test_list_models_invalid_limit(client):
+    response = client.get("/modelcards?limit=0")
+    assert response.status_code == 400
+
+
+def test_list_models_ndjson_stream(client, monkeypatch):
+    monkeypatch.setattr("ingester.database.GraphDB.stream_modelcards",
+                        lambda self, after=None: iter(fake_model_card_rows(1000, after)))
+    response = client.get("/modelcards?format=ndjson&cursor=mc-2")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)["mc_id"] for line in lines] == ["mc-3", "mc-4"]
+
+
 def test_deployment_info(monkeypatch):
     model_id = "dummy_model_id-model"
     dummy = dummy_response(200, {"deployments": ["dep1", "dep2"]})